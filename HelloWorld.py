@@ -1,4 +1,11 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
 from qiskit import QuantumCircuit
+
+from qlab.render_cache import cached_draw
  
 # Create a new circuit with two qubits (first argument) and two classical
 # bits (second argument)
@@ -10,7 +17,9 @@ qc.h(0)
 # Perform a controlled-X gate on qubit 1, controlled by qubit 0
 qc.cx(0, 1)
 
+# Print a text drawing through the lab's drawing cache; it works outside a notebook too.
+print(cached_draw(qc))
+
 # Return a drawing of the circuit using MatPlotLib ("mpl"). This is the
 # last line of the cell, so the drawing appears in the cell output.
-# Remove the "mpl" argument to get a text drawing.
-qc.draw("mpl", style="clifford")
\ No newline at end of file
+qc.draw("mpl", style="clifford")
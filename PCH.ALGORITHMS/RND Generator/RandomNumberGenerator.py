@@ -1,12 +1,18 @@
-from qiskit import QuantumCircuit
-import qiskit
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
 
-qr = qiskit.QuantumRegister(1)
-cr = qiskit.ClassicalRegister(1)
-program = qiskit.QuantumCircuit(qr, cr)
+from qlab.qrng import QuantumRandom, hadamard_circuit, self_test
+from qlab.render_cache import cached_draw
 
-program.measure(qr,cr)
+# Each job measures a row of qubits in uniform superposition: every shot gives num_qubits random bits.
+# The generator keeps a buffer of them filled in the background, so reads do not wait for the simulator.
 
-job = qiskit.execute( program, qiskit.BasicAer.get_backend('qasm_simulator') )
+print(cached_draw(hadamard_circuit(8)))
 
-print( job.result().get_counts() )
+with QuantumRandom() as qrng:
+    print(qrng.read(16).hex())
+    print(qrng.randint(1, 7, size=10))
+    print(qrng.random())
+
+    print(self_test(qrng.read(125000)))
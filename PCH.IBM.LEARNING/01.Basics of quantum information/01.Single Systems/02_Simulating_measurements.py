@@ -1,8 +1,14 @@
 from qiskit.quantum_info import Statevector
 
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.state_sampler import state_sampler
+
 # Next we will see one way that measurements of quantum states can be simulated in Qiskit, 
 # using the measure method from the Statevector class.
     
 v = Statevector([(1 + 2.0j) / 3, -2 / 3])
 #v.draw("latex")
-print(v.measure())
\ No newline at end of file
+print(state_sampler(v).measure())
\ No newline at end of file
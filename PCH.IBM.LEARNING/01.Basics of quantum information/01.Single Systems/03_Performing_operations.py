@@ -1,7 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
 from qiskit.quantum_info import Operator
 from qiskit.quantum_info import Statevector
 from numpy import sqrt
 
+from qlab.operator_chain import OperatorChain
+
 X = Operator([[0, 1], [1, 0]])
 Y = Operator([[0, -1.0j], [1.0j, 0]])
 Z = Operator([[1, 0], [0, -1]])
@@ -11,10 +18,7 @@ T = Operator([[1, 0], [0, (1 + 1.0j) / sqrt(2)]])
 
 v = Statevector([1, 0])
 
-v = v.evolve(H)
-v = v.evolve(T)
-v = v.evolve(H)
-v = v.evolve(T)
-v = v.evolve(Z)
+# H, T, H, T, Z fused into one matrix and applied in a single step.
+v = OperatorChain([H, T, H, T, Z]).evolve(v)
 
 print(v)
\ No newline at end of file
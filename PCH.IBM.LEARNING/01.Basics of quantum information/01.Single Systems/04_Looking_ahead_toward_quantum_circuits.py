@@ -2,6 +2,11 @@ from qiskit import QuantumCircuit
 from qiskit.quantum_info import Statevector
  
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.runner import clear_screen
+from qlab.state_sampler import state_sampler
 
 circuit = QuantumCircuit(1)
 
@@ -17,9 +22,10 @@ v = ket0.evolve(circuit)
 
 #print(v)
 
-statistics = v.sample_counts(4000)
+# The sampler computes the probabilities once and keeps them for later calls on the same state.
+statistics = state_sampler(v).sample_counts(4000)
 
-os.system('cls')
+clear_screen()
 
 print("Value ZERO: " + str(statistics['0']))
 print("Value ONE:" + str(statistics['1']))
@@ -1,6 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
 from qiskit.quantum_info import Statevector, Operator
 from numpy import sqrt
 
+from qlab.lazy_tensor import LazyStatevector
+
 # ==========================================================================================================
 #      https://learning.quantum.ibm.com/course/basics-of-quantum-information/multiple-systems
 # ==========================================================================================================
@@ -13,3 +20,7 @@ zero.tensor(one).draw("latex")
 
 print(zero.tensor(one))
 
+# A lazy product keeps the factors apart; the 2**n vector is only built by to_statevector().
+
+lazy = LazyStatevector([zero, one])
+print(lazy, lazy.to_statevector())
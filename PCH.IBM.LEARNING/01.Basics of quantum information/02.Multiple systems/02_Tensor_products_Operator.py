@@ -1,6 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
 from qiskit.quantum_info import Statevector, Operator
 from numpy import sqrt
 
+from qlab.lazy_tensor import LazyOperator
+
 # The Operator class also has a tensor method. In the example below, we create the X and I gates and display their tensor product.
 
 X = Operator([[0, 1], [1, 0]])
@@ -10,3 +17,7 @@ X.tensor(I)
 
 print(X,I)
 
+# The lazy version keeps X and I apart; to_operator() builds the 4**n matrix on demand.
+
+lazy = LazyOperator([X, I])
+print(lazy, lazy.to_operator())
@@ -1,9 +1,14 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
-from qiskit.primitives import Sampler
-from qiskit.visualization import plot_histogram
 
 import os
-os.system('cls')
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.execution import get_context
+from qlab.render_cache import cached_draw
+from qlab.runner import clear_screen
+
+clear_screen()
 
 # ==========================================================================================================
 #      https://learning.quantum.ibm.com/course/basics-of-quantum-information/quantum-circuits
@@ -27,11 +32,11 @@ circuit.t(q1)
 
 circuit.measure(q1, measureQ1)
 
-print(circuit.draw())
+print(cached_draw(circuit))
 
-# The circuit can be simulated using the Sampler primitive.
+# The circuit can be simulated using the Sampler primitive, shared by all the lessons through the lab's execution context.
 #
-results = Sampler().run(circuit).result()
+results = get_context("reference_sampler").run(circuit)
 statistics = results.quasi_dists[0].binary_probabilities()
 
 print()
@@ -1,9 +1,17 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
-from qiskit.primitives import Sampler
-from qiskit.visualization import plot_histogram
+from qiskit_aer import AerSimulator
 
 import os
-os.system('cls')
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.execution import get_context
+from qlab.noise_sweep import noise_model
+from qlab.readout_mitigation import calibrate
+from qlab.render_cache import cached_draw
+from qlab.runner import clear_screen
+
+clear_screen()
 
 X = QuantumRegister(1, "X")
 Y = QuantumRegister(1, "Y")
@@ -17,11 +25,12 @@ circuit.measure(Y, B)
 circuit.measure(X, A)
 
 
-print(circuit.draw())
+print(cached_draw(circuit))
 
-# The circuit can be simulated using the Sampler primitive.
+# The circuit can be simulated using the Sampler primitive, shared by all the lessons through the lab's execution context.
+# It only uses Clifford gates, so it runs on the stabilizer simulator; shots=None returns exact probabilities.
 #
-results = Sampler().run(circuit).result()
+results = get_context("clifford_sampler", run_options={"shots": None}).run(circuit)
 statistics = results.quasi_dists[0].binary_probabilities()
 
 print()
@@ -36,4 +45,18 @@ print("Value 00: " + str(statistics['00']))
 print("Value 11:" + str(statistics['11']))
 
 print()
-print()
\ No newline at end of file
+print()
+
+# On a device, readout errors also give '01' and '10'. A simulator with 3% readout flips shows it; the
+# calibration of qubits 0 and 1 (cached for later runs) undoes it. Clbit i is read from qubit i here.
+# Undoing the errors can leave small negative quasi-probabilities; clip=True sets them to 0 and renormalizes.
+#
+noisy = AerSimulator(noise_model=noise_model(readout=0.03))
+counts = noisy.run(circuit, shots=8192, seed_simulator=1).result().get_counts()
+mitigated = calibrate(noisy, qubits=[0, 1]).mitigate(counts, clip=True).binary_probabilities()
+
+print("Noisy counts:", counts)
+print("Mitigated: ", {outcome: round(value, 3) for outcome, value in mitigated.items()})
+
+print()
+print()
@@ -1,6 +1,5 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit_aer import AerSimulator
-from qiskit.visualization import plot_histogram
 from qiskit.result import marginal_distribution
 from qiskit.circuit.library import UGate
 from numpy import pi, random
@@ -18,7 +17,13 @@ from numpy import pi, random
 #
 
 import os
-os.system('cls')
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.render_cache import cached_draw
+from qlab.runner import clear_screen
+
+clear_screen()
 
 qubit = QuantumRegister(1, "Q")
 ebit0 = QuantumRegister(1, "A")
@@ -49,7 +54,7 @@ with protocol.if_test((a, 1)):
 with protocol.if_test((b, 1)):
     protocol.z(ebit1)
 
-print(protocol.draw())
+print(cached_draw(protocol))
 
 print()
 print()
\ No newline at end of file
@@ -1,6 +1,4 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
-from qiskit_aer import AerSimulator
-from qiskit.visualization import plot_histogram
 from qiskit.result import marginal_distribution
 from qiskit.circuit.library import UGate
 from numpy import pi, random
@@ -18,7 +16,14 @@ from numpy import pi, random
 #
 
 import os
-os.system('cls')
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.execution import get_context
+from qlab.render_cache import cached_draw
+from qlab.runner import clear_screen
+
+clear_screen()
 
 random_gate = UGate(
     theta=random.random() * 2 * pi,
@@ -86,12 +91,12 @@ result = ClassicalRegister(1, "Result")
 test.add_register(result)
 test.measure(ebit1, result)
 
-print(test.draw())
+print(cached_draw(test))
 
 print()
 print()
 
-result = AerSimulator().run(test).result()
+result = get_context("simulator").run(test)
 statistics = result.get_counts()
 print(statistics)
 
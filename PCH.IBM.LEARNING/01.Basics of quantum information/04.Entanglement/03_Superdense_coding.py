@@ -1,7 +1,4 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
-from qiskit_aer.primitives import Sampler
-from qiskit_aer import AerSimulator
-from qiskit.visualization import plot_histogram
 
 # ==========================================================================================================
 #      https://learning.quantum.ibm.com/course/basics-of-quantum-information/entanglement-in-action
@@ -27,7 +24,14 @@ from qiskit.visualization import plot_histogram
 #
 
 import os
-os.system('cls')
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.execution import get_context
+from qlab.render_cache import cached_draw
+from qlab.runner import clear_screen
+
+clear_screen()
 
 # Here is a simple implementation of superdense coding where we specify the circuit itself depending on the bits to be transmitted. 
 # First let's specify the bits to be transmitted. (Try changing the bits to see that it works correctly.)
@@ -56,12 +60,13 @@ protocol.cx(0, 1)
 protocol.h(0)
 protocol.measure_all()
 
-print(protocol.draw())
+print(cached_draw(protocol))
 
 print()
 print()
 
-result = Sampler().run(protocol).result()
+# Only Clifford gates: the shared context routes the circuit to the stabilizer simulator.
+result = get_context("clifford_sampler").run(protocol)
 statistics = result.quasi_dists[0].binary_probabilities()
 
 for outcome, frequency in statistics.items():
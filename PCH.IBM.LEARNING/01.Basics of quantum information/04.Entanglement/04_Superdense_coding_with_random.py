@@ -1,7 +1,4 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
-from qiskit_aer.primitives import Sampler
-from qiskit_aer import AerSimulator
-from qiskit.visualization import plot_histogram
 
 # ==========================================================================================================
 #      https://learning.quantum.ibm.com/course/basics-of-quantum-information/entanglement-in-action
@@ -9,7 +6,14 @@ from qiskit.visualization import plot_histogram
 #
 
 import os
-os.system('cls')
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.execution import get_context
+from qlab.render_cache import cached_draw
+from qlab.runner import clear_screen
+
+clear_screen()
 
 
 rbg = QuantumRegister(1, "randomizer")
@@ -53,12 +57,12 @@ test.add_register(Bob_c)
 test.measure(ebit0, Bob_d)
 test.measure(ebit1, Bob_c)
 
-print(test.draw())
+print(cached_draw(test))
 
 print()
 print()
 
-result = AerSimulator().run(test).result()
+result = get_context("simulator").run(test)
 statistics = result.get_counts()
 
 print(statistics)
@@ -1,10 +1,19 @@
 
 
 from qiskit import QuantumCircuit
-from qiskit_aer.primitives import Sampler
+from qiskit_aer import AerSimulator
 from numpy import pi
 from numpy.random import randint
 
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+from qlab.execution import get_context
+from qlab.render_cache import cached_draw
+from qlab.runner import clear_screen
+from qlab.transpile_cache import cached_transpile, default_cache
+
 # 
 # When we speak of a game in this context, we're not talking about something that's meant to be played for fun or sport, but rather a mathematical abstraction in the sense of game theory. 
 # Mathematical abstractions of games are studied in economics and computer science, for instance, and have great utility.
@@ -93,30 +102,33 @@ def chsh_circuit(x, y):
 
 # Draw the four possible circuits
 
-import os
-os.system('cls')
+clear_screen()
 
 print("(x,y) = (0,0)")
-print(chsh_circuit(0, 0).draw())
+print(cached_draw(chsh_circuit(0, 0)))
 print()
 
 print("(x,y) = (0,1)")
-print(chsh_circuit(0, 1).draw())
+print(cached_draw(chsh_circuit(0, 1)))
 print()
 
 print("(x,y) = (1,0)")
-print(chsh_circuit(1, 0).draw())
+print(cached_draw(chsh_circuit(1, 0)))
 print()
 
 print("(x,y) = (1,1)")
-print(chsh_circuit(1, 1).draw())
+print(cached_draw(chsh_circuit(1, 1)))
 
 print()
 print()
 
 # Now we'll create a job using the Aer simulator that runs the circuit a single time for a given input pair (X,Y)
+#
+# The circuits are transpiled through the lab's cache, so the 1,000 rounds below (and later runs of this script)
+# reuse the four transpiled circuits instead of compiling a new one every round.
 
-sampler = Sampler()
+simulator = AerSimulator()
+sampler = get_context("sampler", skip_transpilation=True)
 
 def quantum_strategy(x, y):
     """Carry out the best strategy for the CHSH game.
@@ -127,7 +139,7 @@ def quantum_strategy(x, y):
         (int, int): Alice and Bob's answer bits (respectively)
     """
     # `shots=1` runs the circuit once
-    result = sampler.run(chsh_circuit(x, y), shots=1).result()
+    result = sampler.run(cached_transpile(chsh_circuit(x, y), simulator), shots=1)
     statistics = result.quasi_dists[0].binary_probabilities()
     bits = list(statistics.keys())[0]
     a, b = bits[0], bits[1]
@@ -145,6 +157,7 @@ print()
 print("STRATEGY 1")
 
 print("Fraction of games won:", TOTAL_SCORE / NUM_GAMES)
+print("Transpilation cache:", default_cache().stats())
 
 print()
 print()
@@ -188,3 +201,32 @@ print("Fraction of games won:", TOTAL_SCORE / NUM_GAMES)
 
 print()
 print()
+
+# Playing one round per simulator job is slow. Only four circuits can ever be asked for, so the batched engine in qlab/chsh.py
+# builds them once, gets their answer distributions from a single sampler call and plays all the rounds at once with NumPy.
+
+from qlab.chsh import BatchedCHSH, play_strategy
+from qlab.nonlocal_games import CHSH_GAME, circuit_win_probability, classical_win_probability
+
+NUM_GAMES = 1000000
+
+print()
+print("STRATEGY 1 (batched)")
+
+print("Fraction of games won:", BatchedCHSH(chsh_circuit).play(NUM_GAMES).win_rate)
+
+print()
+print("STRATEGY 2 (batched)")
+
+print("Fraction of games won:", play_strategy(classical_strategy, NUM_GAMES).win_rate)
+
+print()
+print()
+
+# The win probabilities can also be computed exactly from the Born probabilities of the four circuits, with no sampling at all.
+
+print("STRATEGY 1 (exact):", circuit_win_probability(CHSH_GAME, chsh_circuit))
+print("STRATEGY 2 (exact):", classical_win_probability(CHSH_GAME, classical_strategy))
+
+print()
+print()
@@ -1,9 +1,19 @@
-
 # LINK: https://cloud.ibm.com/docs/quantum-computing?topic=quantum-computing-example-sampler
 #
-from qiskit_ibm_runtime import QiskitRuntimeService, Session, Options, Sampler
+# Credentials come from the environment: QISKIT_IBM_TOKEN and QISKIT_IBM_INSTANCE. Without a token (or with
+# QLAB_OFFLINE=1) the script runs on the lab's local stand-in for Qiskit Runtime, qlab.fake_runtime.
+#
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-service = QiskitRuntimeService(channel="ibm_cloud", token="XfQy3yrTr1-Y54exSFPTHoIJwocJNbGhcoUzWXRi_YYC", instance="crn:v1:bluemix:public:quantum-computing:us-east:a/e6bb54879eac78ddeaf1d5d298c6dd1c:5c575744-4e31-4aae-9fde-d26398b25380::")
+if os.environ.get("QISKIT_IBM_TOKEN") and not os.environ.get("QLAB_OFFLINE"):
+    from qiskit_ibm_runtime import QiskitRuntimeService, Session, Options, Sampler
+else:
+    from qlab.fake_runtime import FakeRuntimeService as QiskitRuntimeService, Session, Options, Sampler
+
+service = QiskitRuntimeService(channel="ibm_cloud", token=os.environ.get("QISKIT_IBM_TOKEN"),
+                               instance=os.environ.get("QISKIT_IBM_INSTANCE"))
 options = Options(optimization_level=1)
 
 with Session(service=service, backend="ibmq_qasm_simulator"):
@@ -27,4 +37,4 @@ with Session(service=service, backend="ibmq_qasm_simulator"):
 
     # You can invoke run() multiple times.
     job = sampler.run(circuits=bell)
-    print(job.result())
\ No newline at end of file
+    print(job.result())
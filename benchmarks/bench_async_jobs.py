@@ -0,0 +1,55 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit import transpile
+from qiskit.providers.fake_provider import GenericBackendV2
+from qiskit_aer import AerSimulator
+
+from qlab.async_jobs import AsyncRunner
+from qlab.chsh import QUESTIONS, chsh_circuit
+
+# ==========================================================================================================
+#      Sequential job.result() calls vs. asyncio submission with many jobs in flight
+# ==========================================================================================================
+#
+
+JOBS = 200
+SHOTS = 1000
+
+circuits = [chsh_circuit(x, y) for x, y in QUESTIONS]
+fake_backend = GenericBackendV2(2, seed=1234)
+
+
+def sequential(target, batches):
+    start = time.perf_counter()
+    for circuit in batches:
+        target.run(circuit, shots=SHOTS).result()
+    return time.perf_counter() - start
+
+
+async def overlapped(target, batches, max_concurrency):
+    runner = AsyncRunner(target, max_concurrency=max_concurrency)
+    start = time.perf_counter()
+    await runner.gather(batches, shots=SHOTS)
+    runner.close()
+    return time.perf_counter() - start
+
+
+targets = (
+    ("AerSimulator", AerSimulator(), [circuits[i % 4] for i in range(JOBS)]),
+    ("fake backend", fake_backend, [transpile(circuits[i % 4], fake_backend) for i in range(JOBS)]),
+)
+
+for label, target, batches in targets:
+    elapsed = sequential(target, batches)
+    print(f"{label:<14} sequential         {JOBS} jobs  {elapsed:7.3f} s  {JOBS / elapsed:8.0f} jobs/s")
+    for max_concurrency in (4, 16, 64):
+        elapsed = asyncio.run(overlapped(target, batches, max_concurrency))
+        print(f"{label:<14} async, {max_concurrency:>2} in flight  {JOBS} jobs  {elapsed:7.3f} s  {JOBS / elapsed:8.0f} jobs/s")
+
+elapsed = asyncio.run(overlapped("sampler", [circuits[i % 4] for i in range(JOBS)], 64))
+print(f"{'shared sampler':<14} async, 64 in flight  {JOBS} jobs  {elapsed:7.3f} s  {JOBS / elapsed:8.0f} jobs/s")
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from numpy.random import randint
+from qiskit_aer.primitives import Sampler
+
+from qlab.chsh import BatchedCHSH, chsh_circuit, play_strategy
+
+# ==========================================================================================================
+#      Batched CHSH engine vs. the per-round loop of 05_CHSH_game.py
+# ==========================================================================================================
+#
+
+LOOP_GAMES = 1000
+BATCH_GAMES = (10**3, 10**6, 10**7, 10**8)
+
+
+def chsh_game(strategy):
+    # Same referee as the lesson.
+    x, y = randint(0, 2), randint(0, 2)
+    a, b = strategy(x, y)
+    if (a != b) == (x & y):
+        return 1
+    return 0
+
+
+sampler = Sampler()
+
+
+def quantum_strategy(x, y):
+    result = sampler.run(chsh_circuit(x, y), shots=1).result()
+    statistics = result.quasi_dists[0].binary_probabilities()
+    bits = list(statistics.keys())[0]
+    return bits[0], bits[1]
+
+
+def classical_strategy(x, y):
+    if x == 0:
+        a = 0
+    elif x == 1:
+        a = 1
+    if y == 0:
+        b = 1
+    elif y == 1:
+        b = 0
+    return a, b
+
+
+def vectorized_classical_strategy(x, y):
+    return x, 1 - y
+
+
+start = time.perf_counter()
+score = sum(chsh_game(quantum_strategy) for _ in range(LOOP_GAMES))
+loop_time = time.perf_counter() - start
+print(f"per-round loop    {LOOP_GAMES:>11,} games  {loop_time:9.3f} s  "
+      f"{LOOP_GAMES / loop_time:14,.0f} games/s  win rate {score / LOOP_GAMES:.4f}")
+
+engine = BatchedCHSH()
+start = time.perf_counter()
+engine.probabilities
+print(f"batched setup (one sampler call)        {time.perf_counter() - start:9.3f} s")
+
+for num_games in BATCH_GAMES:
+    start = time.perf_counter()
+    result = engine.play(num_games, seed=1234)
+    elapsed = time.perf_counter() - start
+    print(f"batched quantum   {num_games:>11,} games  {elapsed:9.3f} s  "
+          f"{num_games / elapsed:14,.0f} games/s  win rate {result.win_rate:.4f}")
+
+print()
+
+start = time.perf_counter()
+score = sum(chsh_game(classical_strategy) for _ in range(LOOP_GAMES))
+loop_time = time.perf_counter() - start
+print(f"per-round loop    {LOOP_GAMES:>11,} games  {loop_time:9.3f} s  "
+      f"{LOOP_GAMES / loop_time:14,.0f} games/s  win rate {score / LOOP_GAMES:.4f}")
+
+for label, strategy in (("tabulated", classical_strategy), ("vectorized", vectorized_classical_strategy)):
+    for num_games in BATCH_GAMES:
+        start = time.perf_counter()
+        result = play_strategy(strategy, num_games, seed=1234)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<17} {num_games:>11,} games  {elapsed:9.3f} s  "
+              f"{num_games / elapsed:14,.0f} games/s  win rate {result.win_rate:.4f}")
@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from qlab.chsh_sweep import OPTIMAL_ANGLES, CHSHSweep
+
+# ==========================================================================================================
+#      CHSH angle sweep: grid and cross-entropy search across a process pool
+# ==========================================================================================================
+#
+
+if __name__ == "__main__":
+    print("workers:", os.cpu_count())
+
+    with CHSHSweep() as sweep:
+        print("lesson angles:", OPTIMAL_ANGLES, "->", sweep.evaluate([OPTIMAL_ANGLES])[0])
+
+        for resolution in (8, 16):
+            start = time.perf_counter()
+            result = sweep.grid(resolution)
+            elapsed = time.perf_counter() - start
+            print(f"grid {resolution:>2}^4 = {resolution**4:>6} candidates  {elapsed:7.2f} s  "
+                  f"{resolution**4 / elapsed:9,.0f} candidates/s  best {result.best_win_rate:.6f} "
+                  f"at {np.round(result.best_angles, 4)}")
+
+        start = time.perf_counter()
+        result = sweep.optimize(seed=1234)
+        elapsed = time.perf_counter() - start
+        print(f"cross-entropy {len(result.win_rates):>6} candidates  {elapsed:7.2f} s  "
+              f"{len(result.win_rates) / elapsed:9,.0f} candidates/s  best {result.best_win_rate:.6f} "
+              f"at {np.round(result.best_angles, 4)}")
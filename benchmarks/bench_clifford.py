@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit_aer import AerSimulator
+
+from qlab.clifford import CliffordRouter, is_clifford
+from qlab.teleportation import parallel_teleportation_circuit
+
+# ==========================================================================================================
+#      Parallel teleportations: statevector vs. stabilizer routing, by qubit count
+# ==========================================================================================================
+#
+
+COPIES = [1, 2, 4, 6, 10, 33, 100, 333]
+SHOTS = 4
+
+# The statevector method stops here (3 * 6 = 18 qubits, every shot re-simulated after mid-circuit measurements).
+STATEVECTOR_COPIES = 6
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+router = CliffordRouter()
+statevector = AerSimulator(method="statevector")
+
+print(f"{'copies':>6}{'qubits':>8}{'statevector':>15}{'state memory':>15}{'stabilizer':>14}{'tableau':>12}  ok")
+for copies in COPIES:
+    circuit = parallel_teleportation_circuit(copies, seed=copies)
+    assert is_clifford(circuit)
+    n = circuit.num_qubits
+    row = f"{copies:>6}{n:>8}"
+
+    if copies <= STATEVECTOR_COPIES:
+        start = time.perf_counter()
+        statevector.run(circuit, shots=SHOTS).result()
+        elapsed = time.perf_counter() - start
+        row += f"{elapsed / SHOTS * 1000:11.1f} ms{16 * 2**n / 2**20:11.1f} MiB"
+    else:
+        row += f"{'-':>15}{'-':>15}"
+
+    start = time.perf_counter()
+    result = router.run(circuit, shots=SHOTS).result()
+    elapsed = time.perf_counter() - start
+    ok = all(key.split()[0] == "0" * copies for key in result.get_counts())
+    # Tableau: 2n rows of 2n + 1 bits.
+    row += f"{elapsed / SHOTS * 1000:10.1f} ms{2 * n * (2 * n + 1) / 8 / 2**10:8.1f} KiB  {ok}"
+    print(row, flush=True)
+
+print()
+print("routed:", router.routed, f"({SHOTS} shots per run, times per shot)")
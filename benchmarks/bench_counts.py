@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from qiskit.result import marginal_distribution
+
+from qlab.counts import CountsArray
+
+# ==========================================================================================================
+#      Marginals and merges: get_counts() dicts vs. CountsArray, by number of distinct outcomes
+# ==========================================================================================================
+#
+
+SIZES = [10**3, 10**5, 10**6, 10**7]
+NUM_BITS = 32
+REGISTERS = [("Alice c", 8), ("Bob d", 8), ("Result", 16)]
+KEEP = [0, 3, 8, 9, 16, 20, 31]
+
+# Dict baselines stop here; they need several GiB beyond it.
+DICT_SIZE = 10**6
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    value = function(*args)
+    return value, (time.perf_counter() - start) * 1000
+
+
+rng = np.random.default_rng(7)
+print(f"{'outcomes':>10}{'dict marginal':>16}{'array marginal':>17}{'register':>11}{'merge':>10}"
+      f"{'from dict':>12}{'to dict':>10}{'array MiB':>11}")
+for size in SIZES:
+    outcomes = rng.choice(2**NUM_BITS, size=size, replace=False).astype(np.uint64)
+    counts = CountsArray(outcomes, rng.integers(1, 100, size=size), registers=REGISTERS)
+    row = f"{size:>10}"
+
+    if size <= DICT_SIZE:
+        as_dict, to_ms = timed(counts.to_counts)
+        expected, dict_ms = timed(marginal_distribution, as_dict, KEEP)
+        row += f"{dict_ms:13.1f} ms"
+    else:
+        row += f"{'-':>16}"
+
+    marginal, array_ms = timed(counts.marginal, KEEP)
+    _, register_ms = timed(counts.__getitem__, ("Alice c", "Result"))
+    _, merge_ms = timed(counts.merge, counts)
+    row += f"{array_ms:14.1f} ms{register_ms:8.1f} ms{merge_ms:7.1f} ms"
+
+    if size <= DICT_SIZE:
+        parsed, from_ms = timed(CountsArray.from_dict, as_dict, REGISTERS)
+        assert np.array_equal(parsed.outcomes, counts.outcomes)
+        assert marginal.to_counts() == dict(expected)
+        row += f"{from_ms:9.1f} ms{to_ms:7.1f} ms"
+    else:
+        row += f"{'-':>12}{'-':>10}"
+    print(row + f"{counts.nbytes / 2**20:11.1f}", flush=True)
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit.result import marginal_distribution
+from qiskit_aer import AerSimulator
+
+from qlab.deferred_measurement import defer_measurements, is_dynamic
+from qlab.teleportation import teleportation_test_template
+
+# ==========================================================================================================
+#      Teleportation test: if_test feed-forward vs. deferred measurement, shots per second
+# ==========================================================================================================
+#
+
+SHOTS = [10**3, 10**4, 10**5, 10**6]
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+dynamic = teleportation_test_template().assign_parameters([0.4, 1.2, 2.2])
+deferred, report = defer_measurements(dynamic)
+print("rewritten:", report.rewritten)
+print("kept:     ", report.kept)
+print("dynamic:  ", is_dynamic(dynamic), "->", is_dynamic(deferred))
+print()
+
+simulator = AerSimulator()
+
+
+def shots_per_second(circuit, shots):
+    start = time.perf_counter()
+    result = simulator.run(circuit, shots=shots, seed_simulator=1).result()
+    elapsed = time.perf_counter() - start
+    fidelity = marginal_distribution(result.get_counts(), [2]).get("0", 0) / shots
+    return shots / elapsed, fidelity
+
+
+print(f"{'shots':>9}{'if_test shots/s':>18}{'deferred shots/s':>19}{'speedup':>10}{'fidelity':>10}")
+for shots in SHOTS:
+    before, fidelity_before = shots_per_second(dynamic, shots)
+    after, fidelity_after = shots_per_second(deferred, shots)
+    assert fidelity_before == fidelity_after == 1.0
+    print(f"{shots:>9}{before:18.0f}{after:19.0f}{after / before:9.1f}x{fidelity_after:10.3f}")
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit.circuit.random import random_circuit
+from qiskit.quantum_info import SparsePauliOp, Statevector
+
+from qlab.chsh import BatchedCHSH, chsh_value
+from qlab.estimator import pauli_expectations, sampled_expectations
+from qlab.teleportation import random_unitary_angles, run_teleportation_benchmark, teleportation_fidelities
+
+# ==========================================================================================================
+#      Expectation values: shots vs. exact estimator (CHSH S, many Paulis on one state, teleportation)
+# ==========================================================================================================
+#
+
+NUM_QUBITS = 12
+NUM_OBSERVABLES = 500
+NUM_UNITARIES = 2000
+BATCH = 20
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - start) * 1000, result
+
+
+# CHSH: S from 100k sampled games vs. exact.
+milliseconds, result = timed(lambda: BatchedCHSH().play(100000, seed=1))
+print(f"{'CHSH S from 100000 games':<46}{milliseconds:10.1f} ms   S = {8 * (result.win_rate - 0.5):.4f}")
+milliseconds, exact = timed(chsh_value)
+print(f"{'CHSH S exact':<46}{milliseconds:10.1f} ms   S = {exact:.4f}")
+print()
+
+# Many Pauli observables on one 12-qubit state, and on a batch of states: random Paulis, then Z strings (as for
+# measurement statistics or Ising energies), which share one X part.
+rng = np.random.default_rng(3)
+state = Statevector(random_circuit(NUM_QUBITS, 6, seed=3))
+batch = np.array([Statevector(random_circuit(NUM_QUBITS, 6, seed=seed)).data for seed in range(BATCH)])
+random_labels = ["".join(rng.choice(list("IXYZ"), NUM_QUBITS)) for _ in range(NUM_OBSERVABLES)]
+z_labels = ["".join(rng.choice(list("IZ"), NUM_QUBITS)) for _ in range(NUM_OBSERVABLES)]
+for name, labels in (("random Paulis", random_labels), ("Z strings", z_labels)):
+    milliseconds, reference = timed(lambda: np.array([state.expectation_value(SparsePauliOp(label)).real
+                                                      for label in labels]))
+    print(f"{str(NUM_OBSERVABLES) + ' ' + name + ', expectation_value':<46}{milliseconds:10.1f} ms")
+    milliseconds, values = timed(lambda: pauli_expectations(state, labels))
+    print(f"{str(NUM_OBSERVABLES) + ' ' + name + ', pauli_expectations':<46}{milliseconds:10.1f} ms"
+          f"   max error {np.abs(values - reference).max():.1e}")
+    milliseconds, _ = timed(lambda: pauli_expectations(batch, labels))
+    print(f"{'  on ' + str(BATCH) + ' states at once':<46}{milliseconds:10.1f} ms")
+circuit = random_circuit(6, 6, seed=4)
+local = ["".join(rng.choice(list("IXZ"), 6, p=[0.6, 0.2, 0.2])) for _ in range(100)]
+milliseconds, (sampled, errors, groups) = timed(lambda: sampled_expectations(circuit, local, shots=4096, seed=1))
+exact = pauli_expectations(Statevector(circuit), local)
+print(f"{'100 Paulis (6 qubits) from shots':<46}{milliseconds:10.1f} ms   {groups} groups,"
+      f" {np.mean(np.abs(sampled - exact) <= 3 * errors + 1e-9):.0%} within 3 sigma")
+print()
+
+# Teleportation fidelity of random unitaries.
+milliseconds, report = timed(lambda: run_teleportation_benchmark(NUM_UNITARIES, shots=64, seed=1, defer=True))
+print(f"{str(NUM_UNITARIES) + ' unitaries, 64 shots each':<46}{milliseconds:10.1f} ms"
+      f"   mean fidelity {report.fidelities.mean():.4f}")
+angles = random_unitary_angles(NUM_UNITARIES, np.random.default_rng(1))
+milliseconds, fidelities = timed(lambda: teleportation_fidelities(angles))
+print(f"{str(NUM_UNITARIES) + ' unitaries, exact':<46}{milliseconds:10.1f} ms"
+      f"   mean fidelity {fidelities.mean():.4f}")
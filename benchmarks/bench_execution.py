@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit_aer.primitives import Sampler
+
+from qlab.chsh import QUESTIONS, chsh_circuit
+from qlab.execution import get_context
+
+# ==========================================================================================================
+#      Fresh primitives per call vs. the shared execution context
+# ==========================================================================================================
+#
+
+JOBS = 200
+THREADS = 8
+
+circuits = [chsh_circuit(x, y) for x, y in QUESTIONS]
+
+start = time.perf_counter()
+for i in range(JOBS):
+    Sampler().run(circuits[i % 4], shots=100).result()
+elapsed = time.perf_counter() - start
+print(f"fresh Sampler() per job         {JOBS} jobs  {elapsed:7.3f} s  {elapsed / JOBS * 1000:7.2f} ms/job")
+
+context = get_context("sampler")
+start = time.perf_counter()
+for i in range(JOBS):
+    context.run(circuits[i % 4], shots=100)
+elapsed = time.perf_counter() - start
+print(f"shared context, sequential      {JOBS} jobs  {elapsed:7.3f} s  {elapsed / JOBS * 1000:7.2f} ms/job")
+
+start = time.perf_counter()
+with ThreadPoolExecutor(THREADS) as threads:
+    list(threads.map(lambda i: context.run(circuits[i % 4], shots=100), range(JOBS)))
+elapsed = time.perf_counter() - start
+print(f"shared context, {THREADS} threads      {JOBS} jobs  {elapsed:7.3f} s  {elapsed / JOBS * 1000:7.2f} ms/job")
+
+print()
+print(context.metrics())
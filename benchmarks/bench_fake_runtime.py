@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit import QuantumCircuit
+
+from qlab.fake_runtime import FakeRuntimeService, Options, Sampler, Session
+
+# ==========================================================================================================
+#      Runtime load test on the local stand-in: jobs without a session, in a session, batched in a session
+# ==========================================================================================================
+#
+# Modeled waits are scaled by TIME_SCALE; the default latency model queues ~1 s and runs ~0.3 s per job.
+
+JOBS = 40
+THREADS = 8
+SHOTS = 1000
+TIME_SCALE = 0.1
+
+bell = QuantumCircuit(2)
+bell.h(0)
+bell.cx(0, 1)
+bell.measure_all()
+
+service = FakeRuntimeService(time_scale=TIME_SCALE, seed=1)
+options = Options(optimization_level=1, execution={"shots": SHOTS})
+Sampler(backend=service.backend(), options=options).run(bell).result()  # first run pays transpilation and imports
+
+
+def report(label, elapsed, metrics=None):
+    executions = metrics["batches"] if metrics else JOBS
+    queued = metrics["queued_executions"] if metrics else JOBS
+    print(f"{label:<34}{elapsed:8.2f} s{elapsed / JOBS * 1000:10.1f} ms/job{executions:>8} executions{queued:>5} queued")
+
+
+start = time.perf_counter()
+for _ in range(JOBS):
+    Sampler(backend=service.backend(), options=options).run(bell).result()
+report("no session, one job at a time", time.perf_counter() - start)
+
+start = time.perf_counter()
+with Session(service=service, backend="ibmq_qasm_simulator") as session:
+    sampler = Sampler(options=options)
+    for _ in range(JOBS):
+        sampler.run(bell).result()
+report("session, one job at a time", time.perf_counter() - start, session.metrics())
+
+start = time.perf_counter()
+with Session(service=service, backend="ibmq_qasm_simulator") as session:
+    sampler = Sampler(options=options)
+    with ThreadPoolExecutor(THREADS) as threads:
+        list(threads.map(lambda _: sampler.run(bell).result(), range(JOBS)))
+report(f"session, {THREADS} client threads", time.perf_counter() - start, session.metrics())
+
+start = time.perf_counter()
+with Session(service=service, backend="ibmq_qasm_simulator") as session:
+    sampler = Sampler(options=options)
+    jobs = [sampler.run(bell) for _ in range(JOBS)]
+    [job.result() for job in jobs]
+report("session, all submitted up front", time.perf_counter() - start, session.metrics())
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit.quantum_info import Operator, Pauli, Statevector
+
+from qlab.lazy_tensor import LazyOperator, LazyStatevector
+
+# ==========================================================================================================
+#      Eager Statevector/Operator tensor products vs. lazy factors: peak memory and latency
+# ==========================================================================================================
+#
+
+# Eager products stop here: 2**22 amplitudes is 64 MiB, a 4**11 matrix 64 MiB.
+EAGER_STATE_QUBITS = 22
+EAGER_OPERATOR_QUBITS = 11
+
+plus = Statevector.from_label("+")
+X = Operator.from_label("X")
+I = Operator.from_label("I")
+H = Operator.from_label("H")
+
+
+def measure(task):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = task()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def eager_state(n):
+    state = plus
+    for _ in range(n - 1):
+        state = state.tensor(plus)
+    return state.evolve(H, qargs=[0]).expectation_value(Pauli("Z"), qargs=[0])
+
+
+def lazy_state(n):
+    state = LazyStatevector([plus] * n)
+    return state.evolve(H, qargs=[0]).expectation_value(Pauli("Z"), qargs=[0])
+
+
+def eager_operator(n):
+    operator = X
+    for _ in range(n - 1):
+        operator = operator.tensor(I)
+    return LazyStatevector([plus] * n).to_statevector().expectation_value(operator)
+
+
+def lazy_operator(n):
+    operator = LazyOperator([X] + [I] * (n - 1))
+    return LazyStatevector([plus] * n).expectation_value(operator)
+
+
+def report(label, n, eager, lazy, eager_limit):
+    row = f"{label:<10}{n:>6}"
+    if n <= eager_limit:
+        _, elapsed, peak = measure(lambda: eager(n))
+        row += f"{elapsed * 1000:12.2f} ms{peak / 2**20:10.1f} MiB"
+    else:
+        row += f"{'-':>15}{'-':>14}"
+    _, elapsed, peak = measure(lambda: lazy(n))
+    row += f"{elapsed * 1000:12.2f} ms{peak / 2**10:10.1f} KiB"
+    print(row)
+
+
+print(f"{'':<10}{'qubits':>6}{'eager':>15}{'eager peak':>14}{'lazy':>15}{'lazy peak':>14}")
+for n in [4, 10, 16, 22, 30, 100, 1000]:
+    report("state", n, eager_state, lazy_state, EAGER_STATE_QUBITS)
+for n in [4, 8, 11, 30, 100, 1000]:
+    report("operator", n, eager_operator, lazy_operator, EAGER_OPERATOR_QUBITS)
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from qiskit import transpile
+from qiskit_aer import AerSimulator
+
+from qlab.counts import CountsArray
+from qlab.noise_sweep import (NoiseSweep, chsh_protocol_sweep, noise_model, superdense_protocol_sweep,
+                              teleportation_protocol_sweep)
+
+# ==========================================================================================================
+#      100-point depolarizing sweeps: one hand-written AerSimulator().run per point vs. NoiseSweep
+# ==========================================================================================================
+#
+
+POINTS = 100
+SHOTS = 1024
+GRID = np.linspace(0, 0.1, POINTS)
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+def by_hand(circuits, metric):
+    # What a lesson would do: a new simulator, transpilation and run for every grid point.
+    values = []
+    for p in GRID:
+        simulator = AerSimulator(noise_model=noise_model(depolarizing=p))
+        result = simulator.run(transpile(circuits, simulator), shots=SHOTS).result()
+        values.append(metric([CountsArray.from_result(result, i) for i in range(len(circuits))]))
+    return np.array(values)
+
+
+if __name__ == "__main__":
+    protocols = {
+        "teleportation": teleportation_protocol_sweep(),
+        "CHSH": chsh_protocol_sweep(),
+        "superdense": superdense_protocol_sweep(),
+    }
+    workers = os.cpu_count() or 1
+
+    print(f"{'protocol':<15}{'by hand':>10}{'sweep x1':>11}{f'sweep x{workers}':>11}  metric at p = 0, 0.05, 0.1")
+    for name, (circuits, metric) in protocols.items():
+        start = time.perf_counter()
+        by_hand(circuits, metric)
+        hand = time.perf_counter() - start
+
+        with NoiseSweep(circuits, metric, prefix="barrier", shots=SHOTS, max_workers=1, seed=1) as sweep:
+            single = sweep.run(depolarizing=GRID)
+        with NoiseSweep(circuits, metric, prefix="barrier", shots=SHOTS, max_workers=workers, seed=1) as sweep:
+            pooled = sweep.run(depolarizing=GRID)
+        curve = pooled.values[[0, POINTS // 2, -1]]
+        print(f"{name:<15}{hand:8.2f} s{single.seconds:9.2f} s{pooled.seconds:9.2f} s  {np.round(curve, 3)}")
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from numpy import pi
+from qiskit import QuantumCircuit
+from qiskit.circuit.library import RYGate
+from qiskit.quantum_info import Operator, Statevector
+
+from qlab.chsh import BatchedCHSH, chsh_circuit
+from qlab.nonlocal_games import (
+    CHSH_GAME,
+    best_classical_strategy,
+    circuit_win_probability,
+    classical_win_probability,
+    quantum_win_probability,
+)
+
+# ==========================================================================================================
+#      Exact nonlocal-game evaluation vs. Monte Carlo estimates
+# ==========================================================================================================
+#
+
+REPEATS = 10000
+
+
+def classical_strategy(x, y):
+    return x, 1 - y
+
+
+def timed(label, function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        value = function()
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"{label:<40} {elapsed * 1e6:12.1f} us/eval   value {value:.6f}")
+
+
+print(f"{'exact CHSH value':<40} {'':>12}         value {(2 + np.sqrt(2)) / 4:.6f}")
+
+timed("Monte Carlo, 10^6 rounds (setup + play)", lambda: BatchedCHSH().play(10**6).win_rate, 5)
+timed("circuit family (Statevector)", lambda: circuit_win_probability(CHSH_GAME, chsh_circuit), 100)
+
+bell = QuantumCircuit(2)
+bell.h(0)
+bell.cx(0, 1)
+alice = [RYGate(0), RYGate(-pi / 2)]
+bob = [RYGate(-pi / 4), RYGate(pi / 4)]
+timed("shared state + gates", lambda: quantum_win_probability(CHSH_GAME, bell, alice, bob), 1000)
+
+state = Statevector(bell).data
+alice = np.stack([Operator(gate).data for gate in alice])
+bob = np.stack([Operator(gate).data for gate in bob])
+timed("shared state + unitary stacks", lambda: quantum_win_probability(CHSH_GAME, state, alice, bob), REPEATS)
+
+timed("classical strategy (enumerated)", lambda: classical_win_probability(CHSH_GAME, classical_strategy), REPEATS)
+timed("best classical strategy (all 16)", lambda: best_classical_strategy(CHSH_GAME)[0], 1000)
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from qiskit.quantum_info import Operator, Statevector
+
+from qlab.operator_chain import OperatorChain
+
+# ==========================================================================================================
+#      H, T, H, T, Z on a batch of states: one evolve per gate and state vs. one fused matrix multiply
+# ==========================================================================================================
+#
+
+BATCH_SIZES = [1, 10, 100, 1000, 10**4, 10**5, 10**6]
+
+# The per-state loop is slow; above this size its time is extrapolated from here.
+LOOP_LIMIT = 10**3
+
+H = Operator([[1 / np.sqrt(2), 1 / np.sqrt(2)], [1 / np.sqrt(2), -1 / np.sqrt(2)]])
+T = Operator([[1, 0], [0, (1 + 1.0j) / np.sqrt(2)]])
+Z = Operator([[1, 0], [0, -1]])
+gates = [H, T, H, T, Z]
+
+rng = np.random.default_rng(1)
+
+print(f"{'batch':>9}{'evolve loop':>16}{'fused chain':>16}{'per state':>14}{'speedup':>10}")
+for batch in BATCH_SIZES:
+    states = rng.normal(size=(batch, 2)) + 1j * rng.normal(size=(batch, 2))
+    states /= np.linalg.norm(states, axis=1, keepdims=True)
+
+    measured = min(batch, LOOP_LIMIT)
+    start = time.perf_counter()
+    for row in states[:measured]:
+        v = Statevector(row)
+        for gate in gates:
+            v = v.evolve(gate)
+    loop = (time.perf_counter() - start) * batch / measured
+
+    start = time.perf_counter()
+    out = OperatorChain(gates).apply(states)
+    fused = time.perf_counter() - start
+
+    assert np.allclose(out[measured - 1], v.data)
+    mark = "*" if measured < batch else " "
+    print(f"{batch:>9}{loop * 1000:13.3f} ms{mark}{fused * 1000:13.3f} ms{fused / batch * 1e9:11.1f} ns"
+          f"{loop / fused:9.0f}x")
+
+print("* extrapolated from the first", LOOP_LIMIT, "states")
@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from qlab.qrng import QuantumRandom, self_test
+
+# ==========================================================================================================
+#      Quantum random number generator: generation throughput and buffered read latency
+# ==========================================================================================================
+#
+
+TOTAL_BYTES = 2**20
+READS = 10000
+
+for num_qubits, shots in ((8, 8192), (32, 8192), (64, 4096)):
+    with QuantumRandom(num_qubits, shots, prefetch=False) as qrng:
+        start = time.perf_counter()
+        data = qrng.read(TOTAL_BYTES)
+        elapsed = time.perf_counter() - start
+        print(f"{num_qubits:>2} qubits x {shots} shots  {TOTAL_BYTES / elapsed / 1e6:6.3f} MB/s  "
+              f"self-test {self_test(data)}")
+
+with QuantumRandom() as qrng:
+    # Let the prefetch thread fill the buffer, then time reads served from it.
+    while qrng.available < qrng.bytes_per_job * 8:
+        time.sleep(0.05)
+    for label, read in (("read(16)", lambda: qrng.read(16)), ("randint", lambda: qrng.randint(1, 7)),
+                        ("random", qrng.random)):
+        latencies = []
+        for _ in range(READS):
+            start = time.perf_counter()
+            read()
+            latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies) * 1e6
+        print(f"{label:<9} p50 {np.percentile(latencies, 50):6.1f} us  p99 {np.percentile(latencies, 99):6.1f} us")
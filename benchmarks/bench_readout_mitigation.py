@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit_aer import AerSimulator
+
+from qlab.counts import CountsArray
+from qlab.noise_sweep import noise_model
+from qlab.readout_mitigation import DENSE_QUBITS, CalibrationCache, ReadoutCalibration, calibrate
+
+# ==========================================================================================================
+#      Readout mitigation: dense 2^n inverse vs. tensored inverse, batches, and calibration reuse
+# ==========================================================================================================
+#
+
+SHOTS = 4096
+BATCH = 200
+
+rng = np.random.default_rng(7)
+
+
+def random_calibration(num_qubits):
+    matrices = []
+    for _ in range(num_qubits):
+        flip0, flip1 = rng.uniform(0.01, 0.08, 2)
+        matrices.append([[1 - flip0, flip1], [flip0, 1 - flip1]])
+    return ReadoutCalibration(range(num_qubits), [[q] for q in range(num_qubits)], matrices)
+
+
+def random_counts(num_qubits):
+    return CountsArray.from_samples(rng.integers(0, 2**num_qubits, SHOTS, dtype=np.uint64), num_qubits)
+
+
+def timed(function, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats * 1000, result
+
+
+print(f"{'qubits':>6}{'dense inverse':>16}{'dense MiB':>11}{'tensored':>12}{'sparse':>12}")
+for num_qubits in (4, 8, 12, 16, 24, 40):
+    calibration = random_calibration(num_qubits)
+    counts = random_counts(num_qubits)
+    dense = "-"
+    memory = "-"
+    if num_qubits <= 12:
+        def full_inverse():
+            probabilities = np.zeros(2**num_qubits)
+            probabilities[counts.outcomes.astype(np.intp)] = counts.probabilities()
+            return np.linalg.solve(calibration.assignment_matrix(), probabilities)
+
+        milliseconds, _ = timed(full_inverse, 1)
+        dense = f"{milliseconds:10.1f} ms"
+        memory = f"{8 * 4**num_qubits / 2**20:9.1f}"
+    tensored = "-"
+    if num_qubits <= DENSE_QUBITS:
+        milliseconds, _ = timed(lambda: calibration.mitigate(counts))
+        tensored = f"{milliseconds:8.1f} ms"
+    milliseconds, _ = timed(lambda: calibration._sparse(counts.outcomes, counts.probabilities(), 1e-6))
+    print(f"{num_qubits:>6}{dense:>16}{memory:>11}{tensored:>12}{milliseconds:9.1f} ms")
+
+print()
+calibration = random_calibration(10)
+batch = [random_counts(10) for _ in range(BATCH)]
+one_by_one, _ = timed(lambda: [calibration.mitigate(counts) for counts in batch])
+batched, _ = timed(lambda: calibration.mitigate_many(batch))
+print(f"{BATCH} distributions of 10 qubits: {one_by_one:.1f} ms one by one, {batched:.1f} ms batched")
+
+print()
+simulator = AerSimulator(noise_model=noise_model(readout=0.03))
+with tempfile.TemporaryDirectory() as directory:
+    cache = CalibrationCache(directory)
+    first, _ = timed(lambda: calibrate(simulator, range(5), cache=cache), 1)
+    reused, _ = timed(lambda: calibrate(simulator, range(5), cache=cache), 10)
+    from_disk, _ = timed(lambda: calibrate(simulator, range(5), cache=CalibrationCache(directory)), 10)
+    print(f"calibration of 5 qubits: {first:.1f} ms run, {reused:.3f} ms from memory, {from_disk:.2f} ms from disk")
+    print("stats:", cache.stats())
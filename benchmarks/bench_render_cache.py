@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qlab.render_cache import RenderCache, lab_circuits, render
+
+# ==========================================================================================================
+#      Drawing the lab's circuits: draw() every time vs. the render cache (memory and disk)
+# ==========================================================================================================
+#
+
+REPEATS = 20
+
+
+def timed(function):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        function()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+circuits = lab_circuits()
+for circuit in circuits:
+    render(circuit)  # first draws pay the drawer's imports
+
+with tempfile.TemporaryDirectory() as directory:
+    cold = RenderCache(directory)
+    start = time.perf_counter()
+    cold.render_many(circuits, processes=1)
+    first = (time.perf_counter() - start) * 1000
+
+    print(f"{'text drawings of ' + str(len(circuits)) + ' lab circuits':<44}{'ms per pass':>12}")
+    print(f"{'draw() every time':<44}{timed(lambda: [render(c) for c in circuits]):12.2f}")
+    print(f"{'cache, first pass (render + write)':<44}{first:12.2f}")
+    print(f"{'cache, memory hits':<44}{timed(lambda: [cold.draw(c) for c in circuits]):12.2f}")
+    print(f"{'cache, disk hits (fresh process state)':<44}"
+          f"{timed(lambda: [RenderCache(directory, memory_entries=0).draw(c) for c in circuits]):12.2f}")
+    print()
+    print("stats:", cold.stats())
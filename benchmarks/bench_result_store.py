@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from qlab.counts import CountsArray
+from qlab.result_store import ResultStore
+
+# ==========================================================================================================
+#      Result store: append, reopen, filter and aggregate a shot archive without loading it
+# ==========================================================================================================
+#
+
+SAMPLE_RECORDS = 32
+SHOTS = 2**20
+NUM_BITS = 32
+COUNT_RECORDS = 20000
+REGISTERS = [("a", 1), ("b", 1), ("Result", 1)]
+
+
+def timed(label, function, *args, **kwargs):
+    start = time.perf_counter()
+    value = function(*args, **kwargs)
+    print(f"{label:<52}{(time.perf_counter() - start) * 1000:10.1f} ms")
+    return value
+
+
+def fill(directory):
+    rng = np.random.default_rng(1)
+    with ResultStore(directory) as store:
+        for job in range(SAMPLE_RECORDS):
+            # QRNG-like archive: one 32-bit outcome per shot.
+            samples = rng.integers(0, 2**NUM_BITS, size=SHOTS, dtype=np.uint64)
+            store.append(samples=samples, num_bits=NUM_BITS, seed=job, backend="aer", parameters={"job": job})
+        for i in range(COUNT_RECORDS):
+            # Teleportation-like archive: a few outcomes per unitary.
+            counts = CountsArray(np.arange(8), rng.multinomial(64, np.full(8, 1 / 8)), registers=REGISTERS)
+            store.append(counts, seed=i, backend="aer", parameters={"theta": float(rng.random() * 2 * np.pi)})
+
+
+with tempfile.TemporaryDirectory() as directory:
+    timed(f"append {SAMPLE_RECORDS} x {SHOTS} shots + {COUNT_RECORDS} counts", fill, directory)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"{'archive size':<52}{size / 2**20:10.1f} MiB")
+
+    store = timed("reopen (index only)", ResultStore, directory)
+    samples = store.select(kind="samples")
+    counts = timed("select theta < pi/4", store.select, where=lambda r: r.parameters.get("theta", 9) < np.pi / 4)
+    print(f"{'  selected':<52}{len(counts):10d} records")
+
+    tracemalloc.start()
+    timed("aggregate Result register over selection", store.aggregate, counts, registers=["Result"])
+    timed("first shot of every samples record (memmap view)", lambda: [store.samples(r)[0] for r in samples])
+    marginal = timed(f"8-bit marginal over {SAMPLE_RECORDS * SHOTS} archived shots", store.aggregate, samples,
+                     bits=range(8))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{'peak heap while reading':<52}{peak / 2**20:10.1f} MiB")
+    assert marginal.shots == SAMPLE_RECORDS * SHOTS
@@ -0,0 +1,41 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qlab.runner import discover, run_lessons, warm_up
+
+# ==========================================================================================================
+#      Lessons as separate scripts vs. one warmed interpreter
+# ==========================================================================================================
+#
+
+lessons = discover()
+
+print(f"{'lesson':<48}{'script':>11}{'runner':>11}{'  import+build':>15}")
+scripts = {}
+for lesson in lessons:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, lesson.path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    scripts[lesson] = time.perf_counter() - start
+
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    warm_up()
+warm = time.perf_counter() - start
+reports = run_lessons(lessons, capture=True)
+
+for report in reports:
+    name = os.path.basename(report.lesson.name)[:46]
+    total = report.import_seconds + report.build_seconds + report.run_seconds
+    overhead = report.import_seconds + report.build_seconds
+    print(f"{name:<48}{scripts[report.lesson] * 1000:8.0f} ms{total * 1000:8.0f} ms{overhead * 1000:12.1f} ms")
+
+script_total = sum(scripts.values())
+runner_total = warm + sum(r.import_seconds + r.build_seconds + r.run_seconds for r in reports)
+print()
+print(f"{'all lessons':<48}{script_total * 1000:8.0f} ms{runner_total * 1000:8.0f} ms   (warm-up {warm * 1000:.0f} ms)")
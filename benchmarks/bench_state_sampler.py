@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit.quantum_info import random_statevector
+
+from qlab.state_sampler import state_sampler
+from qlab.teleportation import max_rss_mb
+
+# ==========================================================================================================
+#      Sampling measurements of a state: Statevector methods vs. the cached alias-table sampler
+# ==========================================================================================================
+#
+
+SMALL_QUBITS = 16
+LARGE_QUBITS = 20
+REPEATS = 20
+BULK_SHOTS = 10**8
+
+
+def timed(function, repeats=1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats * 1000, result
+
+
+v = random_statevector(2**SMALL_QUBITS, seed=1)
+print(f"{SMALL_QUBITS}-qubit state, {REPEATS} calls each{'ms per call':>40}")
+print(f"{'  v.measure([0, 1])':<60}{timed(lambda: v.measure([0, 1]), REPEATS)[0]:10.2f}")
+print(f"{'  state_sampler(v).measure([0, 1])':<60}{timed(lambda: state_sampler(v).measure([0, 1]), REPEATS)[0]:10.2f}")
+print(f"{'  v.sample_counts(4000)':<60}{timed(lambda: v.sample_counts(4000), REPEATS)[0]:10.2f}")
+print(f"{'  state_sampler(v).sample_counts(4000)':<60}"
+      f"{timed(lambda: state_sampler(v).sample_counts(4000), REPEATS)[0]:10.2f}")
+print(f"{'  v.sample_memory(100000, qargs=[0, 5, 9])':<60}"
+      f"{timed(lambda: v.sample_memory(100000, qargs=[0, 5, 9]), 3)[0]:10.2f}")
+print(f"{'  state_sampler(v).sample_memory(100000, qargs=[0, 5, 9])':<60}"
+      f"{timed(lambda: state_sampler(v).sample_memory(100000, qargs=[0, 5, 9]), 3)[0]:10.2f}")
+print()
+
+w = random_statevector(2**LARGE_QUBITS, seed=2)
+print(f"{LARGE_QUBITS}-qubit state, {BULK_SHOTS:.0e} samples{'ms':>42}")
+milliseconds, sampler = timed(lambda: state_sampler(w))
+print(f"{'  probabilities':<60}{milliseconds:10.1f}")
+milliseconds, _ = timed(sampler.table)
+print(f"{'  alias table':<60}{milliseconds:10.1f}")
+milliseconds, _ = timed(lambda: sum(len(chunk) for chunk in sampler.sample_chunks(BULK_SHOTS, seed=1)))
+print(f"{'  integer outcomes, in chunks':<60}{milliseconds:10.1f}")
+milliseconds, counts = timed(lambda: sampler.sample_counts_array(BULK_SHOTS, seed=1))
+print(f"{'  counts':<60}{milliseconds:10.1f}")
+milliseconds, _ = timed(lambda: state_sampler(w).table())
+print(f"{'  state_sampler(w) again (cached table)':<60}{milliseconds:10.1f}")
+max_rss = max_rss_mb()
+print("max RSS", "n/a" if max_rss is None else f"{max_rss:.0f} MB")
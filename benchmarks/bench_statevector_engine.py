@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit import QuantumCircuit
+from qiskit.primitives import Sampler as ReferenceSampler
+from qiskit_aer.primitives import Sampler as AerSampler
+
+from qlab.chsh import chsh_circuit
+from qlab.statevector_engine import FastSampler
+from qlab.teleportation import teleportation_test_template
+
+# ==========================================================================================================
+#      Per-circuit latency: reference Sampler, Aer Sampler and the direct statevector engine
+# ==========================================================================================================
+#
+
+REPEATS = 200
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+hello = QuantumCircuit(1)
+hello.h(0)
+hello.measure_all()
+
+bell = QuantumCircuit(2)
+bell.h(0)
+bell.cx(0, 1)
+bell.measure_all()
+
+superdense = QuantumCircuit(2)
+superdense.h(0)
+superdense.cx(0, 1)
+superdense.z(0)
+superdense.x(0)
+superdense.cx(0, 1)
+superdense.h(0)
+superdense.measure_all()
+
+teleportation = teleportation_test_template().assign_parameters([0.3, 1.1, 2.0])
+
+circuits = {
+    "hello (1 qubit)": hello,
+    "bell": bell,
+    "superdense coding": superdense,
+    "chsh (x=1, y=1)": chsh_circuit(1, 1),
+    "teleportation test": teleportation,
+}
+
+samplers = {
+    "reference": ReferenceSampler(),
+    "aer": AerSampler(run_options={"shots": None}),
+    "fast": FastSampler(),
+}
+
+
+def latency(sampler, circuit):
+    sampler.run(circuit).result()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        sampler.run(circuit).result()
+    return (time.perf_counter() - start) / REPEATS * 1e6
+
+
+print(f"{'circuit':<22}" + "".join(f"{name:>14}" for name in samplers) + f"{'speedup':>10}")
+for label, circuit in circuits.items():
+    times = {}
+    for name, sampler in samplers.items():
+        try:
+            times[name] = latency(sampler, circuit)
+        except Exception:  # the reference sampler cannot run if_test
+            times[name] = float("nan")
+    baseline = min(t for name, t in times.items() if name != "fast" and t == t)
+    print(f"{label:<22}" + "".join(f"{t:11.1f} us" for t in times.values()) + f"{baseline / times['fast']:9.1f}x")
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+
+from qlab.streaming import MemmapSpill, RunningCounts, RunningHistogram, RunningMarginals, consume, hamming_weight, stream_shots
+from qlab.teleportation import max_rss_mb
+
+# ==========================================================================================================
+#      Streaming shots in constant memory vs. Statevector.sample_counts
+#
+#      python benchmarks/bench_streaming.py [shots]     (default 10^8; 10^9 takes a couple of minutes)
+# ==========================================================================================================
+#
+
+SHOTS = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**8
+
+
+def max_rss():
+    value = max_rss_mb()
+    return "n/a" if value is None else f"{value:.0f} MB"
+
+
+# The circuit of 04_Looking_ahead_toward_quantum_circuits.py
+circuit = QuantumCircuit(1)
+circuit.h(0)
+circuit.t(0)
+circuit.h(0)
+circuit.t(0)
+circuit.z(0)
+v = Statevector([1, 0]).evolve(circuit)
+
+for shots in (10**5, 10**6):
+    start = time.perf_counter()
+    v.sample_counts(shots)
+    elapsed = time.perf_counter() - start
+    print(f"sample_counts   {shots:>13,} shots  {elapsed:8.2f} s  {shots / elapsed:14,.0f} shots/s  max RSS {max_rss():>7}")
+
+counts, ones = RunningCounts(1), RunningMarginals(1)
+start = time.perf_counter()
+consume(stream_shots(v, SHOTS, seed=1), counts, ones)
+elapsed = time.perf_counter() - start
+print(f"stream + counts {SHOTS:>13,} shots  {elapsed:8.2f} s  {SHOTS / elapsed:14,.0f} shots/s  max RSS {max_rss():>7}")
+print("  ", counts.to_dict(), ones.probabilities())
+
+# A wider register: 16 qubits in uniform superposition, with a Hamming-weight histogram and a spill to disk.
+wide = QuantumCircuit(16)
+wide.h(range(16))
+shots = min(SHOTS, 10**7)
+counts, weights = RunningCounts(16), RunningHistogram(16, 17, (0, 17), hamming_weight)
+with tempfile.TemporaryDirectory() as directory:
+    spill = MemmapSpill(os.path.join(directory, "shots.bin"), 16, shots)
+    start = time.perf_counter()
+    consume(stream_shots(wide, shots, seed=1), counts, weights, spill)
+    elapsed = time.perf_counter() - start
+    del spill
+print(f"16 qubits+spill {shots:>13,} shots  {elapsed:8.2f} s  {shots / elapsed:14,.0f} shots/s  max RSS {max_rss():>7}")
+print("   Hamming weights:", weights.counts.tolist())
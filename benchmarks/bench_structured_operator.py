@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+from functools import reduce
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from qiskit.quantum_info import Operator
+
+from qlab.structured_operator import structured
+
+# ==========================================================================================================
+#      T ⊗ X ⊗ Z ⊗ S ⊗ ... on n qubits: dense Operator vs. compact monomial form
+# ==========================================================================================================
+#
+
+# Dense operators stop here: a 4**12 matrix is 256 MiB.
+DENSE_QUBITS = 12
+
+X = Operator([[0, 1], [1, 0]])
+Z = Operator([[1, 0], [0, -1]])
+S = Operator([[1, 0], [0, 1.0j]])
+T = Operator([[1, 0], [0, (1 + 1.0j) / np.sqrt(2)]])
+gates = [T, X, Z, S]
+
+rng = np.random.default_rng(1)
+
+print(f"{'qubits':>6}{'dense':>12}{'dense apply':>16}{'compact':>12}{'compact apply':>16}")
+for n in [4, 8, 12, 16, 20, 24]:
+    factors = [gates[i % len(gates)] for i in range(n)]
+    state = rng.normal(size=2**n) + 1j * rng.normal(size=2**n)
+
+    compact = reduce(lambda a, b: a.tensor(b), [structured(f) for f in factors])
+    start = time.perf_counter()
+    out = compact.apply(state)
+    compact_time = time.perf_counter() - start
+
+    row = f"{n:>6}"
+    if n <= DENSE_QUBITS:
+        dense = reduce(lambda a, b: a.tensor(b), factors)
+        start = time.perf_counter()
+        expected = dense.data @ state
+        dense_time = time.perf_counter() - start
+        assert np.allclose(out, expected)
+        row += f"{dense.data.nbytes / 2**20:9.1f} MiB{dense_time * 1000:13.3f} ms"
+    else:
+        row += f"{'-':>12}{'-':>16}"
+    row += f"{compact.nbytes:10d} B{compact_time * 1000:13.3f} ms"
+    print(row)
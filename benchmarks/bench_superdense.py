@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from qiskit_aer.noise import NoiseModel, depolarizing_error
+
+from qlab.superdense import SuperdenseChannel
+
+# ==========================================================================================================
+#      Superdense coding channel: throughput, symbol error rate and memory on growing payloads
+# ==========================================================================================================
+#
+
+PAYLOADS = [2**10, 2**16, 2**20, 2**24]
+
+noise = NoiseModel()
+noise.add_all_qubit_quantum_error(depolarizing_error(0.02, 2), ["cx"])
+noise.add_all_qubit_quantum_error(depolarizing_error(0.005, 1), ["h", "p", "rx"])
+
+rng = np.random.default_rng(1)
+channels = {"ideal": SuperdenseChannel(), "depolarizing": SuperdenseChannel(noise)}
+
+print(f"{'channel':<14}{'payload':>12}{'seconds':>10}{'Mbit/s':>10}{'SER':>10}{'BER':>10}{'max RSS':>12}")
+for name, channel in channels.items():
+    for size in PAYLOADS:
+        payload = rng.integers(0, 256, size=size, dtype=np.uint8).tobytes()
+        received, report = channel.transmit(payload, seed=size)
+        assert len(received) == size
+        max_rss = "n/a" if report.max_rss_mb is None else f"{report.max_rss_mb:.0f} MB"
+        print(f"{name:<14}{size:>10} B{report.seconds:10.3f}{report.bits_per_second / 1e6:10.1f}"
+              f"{report.symbol_error_rate:10.4f}{report.bit_error_rate:10.4f}{max_rss:>12}")
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from qiskit import ClassicalRegister, QuantumCircuit
+from qiskit.circuit.library import UGate
+from qiskit.result import marginal_distribution
+from qiskit_aer import AerSimulator
+
+from qlab.teleportation import random_unitary_angles, run_teleportation_benchmark, teleportation_protocol
+
+# ==========================================================================================================
+#      Teleportation fidelity over many random unitaries: per-gate circuits vs. one parameterized template
+# ==========================================================================================================
+#
+
+LOOP_UNITARIES = 200
+NUM_UNITARIES = 10**4
+SHOTS = 64
+
+if __name__ == "__main__":
+    # The lesson's way: a fresh circuit, compose and inverse for every gate.
+    simulator = AerSimulator()
+    protocol = teleportation_protocol()
+    qubit, ebit0, ebit1 = protocol.qregs
+
+    start = time.perf_counter()
+    fidelities = []
+    for theta, phi, lam in random_unitary_angles(LOOP_UNITARIES, np.random.default_rng(1)):
+        random_gate = UGate(theta=theta, phi=phi, lam=lam)
+        test = QuantumCircuit(*protocol.qregs, *protocol.cregs)
+        test.append(random_gate, qubit)
+        test.barrier()
+        test = test.compose(protocol)
+        test.barrier()
+        test.append(random_gate.inverse(), ebit1)
+        result = ClassicalRegister(1, "Result")
+        test.add_register(result)
+        test.measure(ebit1, result)
+
+        counts = simulator.run(test, shots=SHOTS).result().get_counts()
+        fidelities.append(marginal_distribution(counts, [2]).get("0", 0) / SHOTS)
+    elapsed = time.perf_counter() - start
+    print(f"per-gate circuits {LOOP_UNITARIES:>7,} unitaries  {elapsed:8.2f} s  "
+          f"{LOOP_UNITARIES / elapsed:9,.0f} unitaries/s  mean fidelity {np.mean(fidelities):.4f}")
+
+    report = run_teleportation_benchmark(NUM_UNITARIES, shots=SHOTS, seed=1)
+    max_rss = "n/a" if report.max_rss_mb is None else f"{report.max_rss_mb:.0f} MB"
+    print(f"template batches  {NUM_UNITARIES:>7,} unitaries  {report.seconds:8.2f} s  "
+          f"{report.unitaries_per_second:9,.0f} unitaries/s  mean fidelity {report.fidelities.mean():.4f}  "
+          f"max RSS {max_rss}")
+
+    print()
+    print("fidelity distribution:")
+    counts, edges = np.histogram(report.fidelities, bins=5, range=(0, 1))
+    for count, low, high in zip(counts, edges, edges[1:]):
+        closing = "]" if high == 1 else ")"
+        print(f"  [{low:.1f}, {high:.1f}{closing}  {count}")
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qiskit import QuantumCircuit
+from qiskit_aer import AerSimulator
+
+from qlab.chsh import QUESTIONS, chsh_circuit
+from qlab.chsh_sweep import chsh_template
+from qlab.teleportation import teleportation_protocol, teleportation_test_template
+from qlab.transpile_cache import TranspileCache
+
+# ==========================================================================================================
+#      Transpilation cache: cold compile vs. memory and disk hits on the lab circuits
+# ==========================================================================================================
+#
+
+ROUNDS = 1000
+
+
+def bell():
+    qc = QuantumCircuit(2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure_all()
+    return qc
+
+
+def lab_circuits():
+    circuits = [chsh_circuit(x, y) for x, y in QUESTIONS]
+    circuits += [bell(), teleportation_protocol(), teleportation_test_template(), chsh_template()]
+    return circuits
+
+
+simulator = AerSimulator()
+
+with tempfile.TemporaryDirectory() as directory:
+    cache = TranspileCache(directory)
+    start = time.perf_counter()
+    for circuit in lab_circuits():
+        cache.transpile(circuit, simulator)
+    print(f"cold run (every circuit compiled)       {time.perf_counter() - start:8.3f} s  {cache.stats()}")
+
+    # A new process would start with an empty memory layer.
+    cache = TranspileCache(directory)
+    start = time.perf_counter()
+    for circuit in lab_circuits():
+        cache.transpile(circuit, simulator)
+    print(f"warm run (read from disk)               {time.perf_counter() - start:8.3f} s  {cache.stats()}")
+
+    # The CHSH loop: one circuit per round.
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        cache.transpile(chsh_circuit(i % 2, (i // 2) % 2), simulator)
+    print(f"{ROUNDS} CHSH rounds (memory hits)         {time.perf_counter() - start:8.3f} s  {cache.stats()}")
+
+    uncached = TranspileCache(False)
+    start = time.perf_counter()
+    for i in range(20):
+        uncached.clear()
+        uncached.transpile(chsh_circuit(i % 2, (i // 2) % 2), simulator)
+    print(f"20 CHSH rounds, compiling every round   {time.perf_counter() - start:8.3f} s")
@@ -0,0 +1,9 @@
+"""Shared helpers for the Qiskit lab.
+
+The lessons under ``PCH.IBM.LEARNING`` stay small, self-contained scripts.
+The modules in this package hold the heavier machinery (batched engines,
+caches, benchmarks support) that several lessons can reuse.
+
+Submodules are imported explicitly (``from qlab.chsh import BatchedCHSH``)
+so that importing the package itself stays cheap.
+"""
@@ -0,0 +1,152 @@
+"""Asyncio front-end for sampler and simulator jobs.
+
+``Hello.py`` and the CHSH loop block on ``job.result()`` one job at a time,
+so job latencies add up. `AsyncRunner` turns jobs into awaitables so many
+can be in flight at once::
+
+    runner = AsyncRunner("sampler", max_concurrency=16)
+
+    async def main():
+        async for index, result in runner.as_completed(circuits, shots=100):
+            ...
+
+Targets can be a kind of the lab's execution context (``"sampler"``,
+``"simulator"``...), an `ExecutionContext`, or any object with a
+``run(circuits, **options)`` method returning a job with ``result()`` and
+``cancel()`` -- an Aer primitive, an ``AerSimulator``, a local fake backend
+or a runtime ``Sampler``. Nothing here needs the network.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from qlab.execution import ExecutionContext, get_context
+
+# Jobs in flight per runner.
+MAX_CONCURRENCY = 8
+
+
+def _cancel(job):
+    cancel = getattr(job, "cancel", None)
+    if cancel is not None:
+        try:
+            cancel()
+        except Exception:  # best effort: some jobs cannot be cancelled
+            pass
+
+
+class AsyncRunner:
+    """Runs jobs as awaitables with bounded concurrency and timeouts."""
+
+    def __init__(self, target="sampler", max_concurrency=MAX_CONCURRENCY, timeout=None):
+        """
+        Args:
+            target (str, ExecutionContext or object): Where jobs run; see the
+                module docstring.
+            max_concurrency (int): Most jobs in flight at once.
+            timeout (float): Default per-job timeout in seconds, or None.
+        """
+        if isinstance(target, str):
+            target = get_context(target)
+        self.target = target
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Created lazily: a semaphore belongs to the running event loop.
+        self._semaphore = None
+        self._loop = None
+        self._threads = None
+
+    def _limit(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, circuits, timeout=None, **run_options):
+        """Runs one job and awaits its result.
+        Args:
+            circuits (QuantumCircuit or list): Circuits of the job.
+            timeout (float): Overrides the runner's timeout.
+            **run_options: Passed to ``run`` (``shots``...).
+        Returns:
+            The job's result, as ``job.result()`` would return it.
+        Raises:
+            asyncio.TimeoutError: If the job takes longer than the timeout;
+                the job is cancelled.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self._limit():
+            return await asyncio.wait_for(self._run(circuits, run_options), timeout)
+
+    async def _run(self, circuits, run_options):
+        if isinstance(self.target, ExecutionContext):
+            # Cancelling the wrapper cancels the queued submission too.
+            return await asyncio.wrap_future(self.target.submit(circuits, **run_options))
+
+        loop = asyncio.get_running_loop()
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="qlab-async")
+        # A cancellation may arrive while run() is still submitting; whichever side comes second cancels the job.
+        lock = threading.Lock()
+        state = {"job": None, "cancelled": False}
+
+        def submit():
+            job = self.target.run(circuits, **run_options)
+            with lock:
+                if state["cancelled"]:
+                    _cancel(job)
+                else:
+                    state["job"] = job
+            return job
+
+        try:
+            job = await asyncio.shield(loop.run_in_executor(self._threads, submit))
+            return await loop.run_in_executor(self._threads, job.result)
+        except asyncio.CancelledError:
+            with lock:
+                state["cancelled"] = True
+                job = state["job"]
+            if job is not None:
+                _cancel(job)
+            raise
+
+    async def gather(self, circuit_batches, return_exceptions=False, **run_options):
+        """Runs one job per batch and returns the results in order.
+        Args:
+            circuit_batches (iterable): Each item is the circuits of one job.
+            return_exceptions (bool): As in ``asyncio.gather``.
+            **run_options: Passed to every job.
+        Returns:
+            list: Results in the order of ``circuit_batches``.
+        """
+        jobs = [self.run(circuits, **run_options) for circuits in circuit_batches]
+        return await asyncio.gather(*jobs, return_exceptions=return_exceptions)
+
+    async def as_completed(self, circuit_batches, **run_options):
+        """Yields ``(index, result)`` as jobs finish.
+
+        Leaving the ``async for`` early cancels the jobs still pending.
+
+        Args:
+            circuit_batches (iterable): Each item is the circuits of one job.
+            **run_options: Passed to every job.
+        """
+
+        async def indexed(index, circuits):
+            return index, await self.run(circuits, **run_options)
+
+        tasks = [asyncio.ensure_future(indexed(i, circuits)) for i, circuits in enumerate(circuit_batches)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self):
+        """Releases the runner's threads (the shared context stays up)."""
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+            self._threads = None
@@ -0,0 +1,338 @@
+"""Batched CHSH game engine.
+
+The lesson in ``05_CHSH_game.py`` plays one round per simulator job: every
+round builds a new ``chsh_circuit(x, y)`` and submits a ``shots=1`` job.
+Only four circuits can ever be asked for, so this module builds them once,
+asks the sampler for their answer distributions in a single call, and then
+plays any number of rounds with NumPy:
+
+* the referee's questions are drawn as a histogram over the four ``(x, y)``
+  pairs,
+* for each pair, Alice and Bob's answers are drawn from that circuit's
+  distribution with as many shots as the pair was asked,
+* all rounds are scored at once against the win table.
+
+Classical strategies (plain Python callables like ``classical_strategy``)
+are played the same way, see ``play_strategy``.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from numpy import pi
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import SparsePauliOp, Statevector
+
+from qlab.counts import CountsArray
+
+# The four question pairs the referee can ask, in histogram order
+# (index ``2 * x + y``).
+QUESTIONS = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+# Uniform referee, as in the lesson's ``randint(0, 2), randint(0, 2)``.
+UNIFORM_QUESTIONS = (0.25, 0.25, 0.25, 0.25)
+
+# Alice's answer is clbit 0, Bob's clbit 1.
+ANSWER_REGISTERS = [("Alice", 1), ("Bob", 1)]
+
+# Default number of rounds generated at a time by vectorized strategies.
+CHUNK_SIZE = 2**20
+
+# RY angles applied before measuring, indexed by Alice's question x and Bob's question y.
+ALICE_ANGLES = (0, -pi / 2)
+BOB_ANGLES = (-pi / 4, pi / 4)
+
+
+def chsh_circuit(x, y):
+    """Creates a `QuantumCircuit` that implements the best CHSH strategy.
+    Args:
+        x (int): Alice's bit (must be 0 or 1)
+        y (int): Bob's bit (must be 0 or 1)
+    Returns:
+        QuantumCircuit: Circuit that, when run, returns Alice and Bob's
+            answer bits.
+    """
+    qc = QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.barrier()
+
+    # Alice
+    qc.ry(ALICE_ANGLES[x], 0)
+    qc.measure(0, 0)
+
+    # Bob
+    qc.ry(BOB_ANGLES[y], 1)
+    qc.measure(1, 1)
+
+    return qc
+
+
+def chsh_win_table():
+    """Builds the CHSH win table.
+    Returns:
+        numpy.ndarray: ``(4, 4)`` boolean array ``win[q, o]`` where
+            ``q = 2 * x + y`` is the question pair and ``o = a + 2 * b`` is
+            the answer pair, i.e. the sampler's integer outcome with Alice's
+            bit on clbit 0 and Bob's bit on clbit 1.
+    """
+    table = np.zeros((4, 4), dtype=bool)
+    for q, (x, y) in enumerate(QUESTIONS):
+        for o in range(4):
+            a, b = o & 1, o >> 1
+            table[q, o] = (a != b) == (x & y)
+    return table
+
+
+WIN_TABLE = chsh_win_table()
+
+
+def _measured_observable(angle):
+    # RY(angle) then a Z measurement measures RY(angle)^dagger Z RY(angle).
+    return SparsePauliOp(["Z", "X"], [np.cos(angle), -np.sin(angle)])
+
+
+def chsh_observable(x, y):
+    """The observable ``A_x (x) B_y`` that `chsh_circuit` measures.
+    Args:
+        x (int): Alice's bit.
+        y (int): Bob's bit.
+    Returns:
+        SparsePauliOp: Two-qubit observable, Alice on qubit 0; its
+            expectation is ``P(a = b) - P(a != b)``.
+    """
+    return _measured_observable(BOB_ANGLES[y]).tensor(_measured_observable(ALICE_ANGLES[x]))
+
+
+def chsh_correlators(state=None):
+    """Exact correlators ``<A_x (x) B_y>`` of the four question pairs.
+    Args:
+        state (Statevector or DensityMatrix): Shared two-qubit state;
+            defaults to the Bell state prepared by `chsh_circuit`.
+    Returns:
+        numpy.ndarray: Four values, indexed by ``2 * x + y``.
+    """
+    from qlab.estimator import pauli_expectations
+
+    if state is None:
+        bell = QuantumCircuit(2)
+        bell.h(0)
+        bell.cx(0, 1)
+        state = Statevector(bell)
+    return pauli_expectations(state, [chsh_observable(x, y) for x, y in QUESTIONS])
+
+
+def chsh_value(state=None):
+    """Exact CHSH value ``S = E00 + E01 + E10 - E11``, with no shots.
+
+    The win rate under the uniform referee is ``1/2 + S/8``: ``2 sqrt(2)``
+    (``cos(pi/8)**2``) for the Bell state, at most 2 (3/4) classically.
+
+    Args:
+        state (Statevector or DensityMatrix): See `chsh_correlators`.
+    Returns:
+        float: S.
+    """
+    return float(np.dot([1, 1, 1, -1], chsh_correlators(state)))
+
+
+class CHSHResult(namedtuple("CHSHResult", ["num_games", "wins", "questions", "answers"])):
+    """Outcome of a batch of CHSH rounds.
+    Attributes:
+        num_games (int): Number of rounds played.
+        wins (int): Number of rounds won.
+        questions (numpy.ndarray): How often each ``(x, y)`` pair was asked,
+            indexed by ``2 * x + y``.
+        answers (numpy.ndarray): ``(4, 4)`` counts of answer pair
+            ``o = a + 2 * b`` for each question pair.
+    """
+
+    __slots__ = ()
+
+    @property
+    def win_rate(self):
+        """float: Fraction of games won."""
+        if self.num_games == 0:
+            return 0.0
+        return self.wins / self.num_games
+
+
+def referee_histogram(num_games, rng, probabilities=UNIFORM_QUESTIONS):
+    """Draws how often the referee asks each question pair.
+    Args:
+        num_games (int): Number of rounds.
+        rng (numpy.random.Generator): Source of randomness.
+        probabilities (sequence): Probability of each pair, indexed by
+            ``2 * x + y``.
+    Returns:
+        numpy.ndarray: Counts per question pair; they sum to ``num_games``.
+    """
+    return rng.multinomial(num_games, probabilities)
+
+
+def score(answers):
+    """Counts the winning rounds in an answer table.
+    Args:
+        answers (numpy.ndarray): ``(4, 4)`` counts as in `CHSHResult`.
+    Returns:
+        int: Number of rounds won.
+    """
+    return int(answers[WIN_TABLE].sum())
+
+
+class BatchedCHSH:
+    """Plays the CHSH game with a quantum strategy, many rounds per call.
+
+    The four circuits are built when the engine is created and the sampler
+    is called at most once, the first time answers are needed. Later calls
+    to `play` only draw random numbers.
+    """
+
+    def __init__(self, circuit_factory=chsh_circuit, sampler=None):
+        """
+        Args:
+            circuit_factory (callable): Takes ``(x, y)`` and returns a
+                two-clbit `QuantumCircuit` with Alice's answer on clbit 0
+                and Bob's answer on clbit 1.
+            sampler (BaseSampler): Sampler used to get the answer
+                distributions. Defaults to an Aer ``Sampler`` computing
+                exact probabilities.
+        """
+        self.circuits = [circuit_factory(x, y) for x, y in QUESTIONS]
+        self._sampler = sampler
+        self._probabilities = None
+
+    @property
+    def probabilities(self):
+        """numpy.ndarray: ``(4, 4)`` answer distribution per question pair."""
+        if self._probabilities is None:
+            self._probabilities = self._answer_probabilities()
+        return self._probabilities
+
+    def _answer_probabilities(self):
+        sampler = self._sampler
+        if sampler is None:
+            from qiskit_aer.primitives import Sampler
+
+            # ``shots=None`` makes Aer return the exact Born probabilities.
+            sampler = Sampler(run_options={"shots": None})
+
+        # One job for all four circuits.
+        quasi_dists = sampler.run(self.circuits).result().quasi_dists
+
+        probabilities = np.zeros((4, 4))
+        for q, dist in enumerate(quasi_dists):
+            for outcome, p in dist.items():
+                probabilities[q, outcome] = p
+        # Quasi-probabilities can dip slightly below zero.
+        np.clip(probabilities, 0, None, out=probabilities)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+
+    def play(self, num_games, seed=None, question_probabilities=UNIFORM_QUESTIONS, store=None):
+        """Plays ``num_games`` rounds.
+        Args:
+            num_games (int): Number of rounds.
+            seed (int or numpy.random.Generator): Seed for the referee and
+                for the answer draws.
+            question_probabilities (sequence): Referee's distribution over
+                the question pairs, indexed by ``2 * x + y``.
+            store (ResultStore): Archives the answer counts of each question
+                pair, with ``x`` and ``y`` as parameters and registers
+                ``Alice`` and ``Bob`` (see `qlab.result_store`).
+        Returns:
+            CHSHResult: Counts and win rate.
+        """
+        rng = np.random.default_rng(seed)
+        questions = referee_histogram(num_games, rng, question_probabilities)
+
+        # For each question pair, draw as many answers as it was asked.
+        answers = np.zeros((4, 4), dtype=np.int64)
+        for q, shots in enumerate(questions):
+            if shots:
+                answers[q] = rng.multinomial(shots, self.probabilities[q])
+
+        if store is not None:
+            for q, (x, y) in enumerate(QUESTIONS):
+                store.append(CountsArray(np.arange(4), answers[q], registers=ANSWER_REGISTERS), circuit=self.circuits[q],
+                             parameters={"x": x, "y": y}, seed=seed, num_games=num_games)
+            store.flush()
+        return CHSHResult(num_games, score(answers), questions, answers)
+
+
+def tabulate_strategy(strategy):
+    """Evaluates a deterministic strategy on every question pair.
+    Args:
+        strategy (callable): Takes two bits and returns two bits, like
+            ``classical_strategy`` in the lesson. Answers may be `int` or
+            ``"0"``/``"1"`` strings.
+    Returns:
+        numpy.ndarray: Answer index ``o = a + 2 * b`` for each question pair.
+    """
+    outcomes = np.zeros(4, dtype=np.int64)
+    for q, (x, y) in enumerate(QUESTIONS):
+        a, b = strategy(x, y)
+        outcomes[q] = int(a) + 2 * int(b)
+    return outcomes
+
+
+def is_vectorized(strategy):
+    """Checks whether a strategy accepts NumPy arrays of questions.
+    Args:
+        strategy (callable): Candidate strategy.
+    Returns:
+        bool: True if calling it with arrays returns arrays of answers.
+    """
+    x = np.array([0, 0, 1, 1], dtype=np.uint8)
+    y = np.array([0, 1, 0, 1], dtype=np.uint8)
+    try:
+        a, b = strategy(x, y)
+    except (TypeError, ValueError):
+        # e.g. ``if x == 0`` on an array is ambiguous.
+        return False
+    return np.shape(a) == (4,) and np.shape(b) == (4,)
+
+
+def play_strategy(strategy, num_games, seed=None, vectorized=None, chunk_size=CHUNK_SIZE):
+    """Plays ``num_games`` rounds of CHSH with a classical strategy.
+
+    Vectorized strategies are called with arrays of questions, ``chunk_size``
+    rounds at a time, so randomized strategies are supported. Any other
+    strategy is assumed to be deterministic: it is called once per question
+    pair and the rounds are scored from the referee's histogram.
+
+    Args:
+        strategy (callable): Takes ``(x, y)`` and returns ``(a, b)``.
+        num_games (int): Number of rounds.
+        seed (int or numpy.random.Generator): Seed for the referee (and for
+            nothing else; vectorized strategies bring their own randomness).
+        vectorized (bool): Force or skip the array mode. Detected with
+            `is_vectorized` when None.
+        chunk_size (int): Rounds per strategy call in array mode.
+    Returns:
+        CHSHResult: Counts and win rate.
+    """
+    rng = np.random.default_rng(seed)
+    if vectorized is None:
+        vectorized = is_vectorized(strategy)
+
+    if not vectorized:
+        questions = referee_histogram(num_games, rng)
+        answers = np.zeros((4, 4), dtype=np.int64)
+        answers[np.arange(4), tabulate_strategy(strategy)] = questions
+        return CHSHResult(num_games, score(answers), questions, answers)
+
+    table = np.zeros(16, dtype=np.int64)
+    remaining = num_games
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        x = rng.integers(0, 2, size, dtype=np.uint8)
+        y = rng.integers(0, 2, size, dtype=np.uint8)
+        a, b = strategy(x, y)
+        a = np.asarray(a, dtype=np.uint8)
+        b = np.asarray(b, dtype=np.uint8)
+        table += np.bincount(8 * x + 4 * y + a + 2 * b, minlength=16)
+        remaining -= size
+
+    answers = table.reshape(4, 4)
+    return CHSHResult(num_games, score(answers), answers.sum(axis=1), answers)
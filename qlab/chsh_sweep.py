@@ -0,0 +1,221 @@
+"""Parallel search over CHSH measurement angles.
+
+``chsh_circuit`` hard-codes Alice's angles ``ry(0)`` / ``ry(-pi/2)`` and
+Bob's ``ry(-pi/4)`` / ``ry(pi/4)``. Here the four angles are circuit
+parameters:
+
+    alpha[0], alpha[1]   Alice's rotation for x = 0, 1
+    beta[0],  beta[1]    Bob's rotation for y = 0, 1
+
+`chsh_template` lays out all four question pairs side by side (one Bell
+pair each) and saves their exact answer probabilities, so one simulator
+experiment scores one candidate. Each worker process transpiles that
+template once (through the transpilation cache) and then binds thousands
+of candidates per Aer job.
+"""
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy import pi
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterVector
+
+from qlab.chsh import QUESTIONS, WIN_TABLE
+from qlab.transpile_cache import cached_transpile
+
+# The angles of the lesson's ``chsh_circuit``: (alpha0, alpha1, beta0, beta1).
+OPTIMAL_ANGLES = (0.0, -pi / 2, -pi / 4, pi / 4)
+
+# Candidates per Aer job.
+CHUNK_SIZE = 2048
+
+
+def chsh_template():
+    """Builds the parameterized CHSH template.
+
+    Question pair ``q = 2 * x + y`` uses qubits ``2q`` (Alice) and ``2q + 1``
+    (Bob) and saves their probabilities under the label ``"q{q}"``.
+
+    Returns:
+        QuantumCircuit: Template with parameters ``alpha[0..1]`` and
+            ``beta[0..1]``.
+    """
+    alpha = ParameterVector("alpha", 2)
+    beta = ParameterVector("beta", 2)
+    qc = QuantumCircuit(2 * len(QUESTIONS))
+    for q, (x, y) in enumerate(QUESTIONS):
+        qc.h(2 * q)
+        qc.cx(2 * q, 2 * q + 1)
+        qc.ry(alpha[x], 2 * q)
+        qc.ry(beta[y], 2 * q + 1)
+        qc.save_probabilities([2 * q, 2 * q + 1], label=f"q{q}")
+    return qc
+
+
+class _Evaluator:
+    # One transpiled template and one simulator, reused for every chunk.
+
+    def __init__(self):
+        from qiskit_aer import AerSimulator
+
+        self.simulator = AerSimulator(method="statevector")
+        self.template = cached_transpile(chsh_template(), self.simulator)
+        # Parameter order of the bind dictionary: alpha[0], alpha[1], beta[0], beta[1].
+        by_name = {parameter.name: parameter for parameter in self.template.parameters}
+        self.parameters = [by_name[name] for name in ("alpha[0]", "alpha[1]", "beta[0]", "beta[1]")]
+
+    def __call__(self, angles):
+        angles = np.asarray(angles, dtype=float)
+        binds = {parameter: angles[:, i] for i, parameter in enumerate(self.parameters)}
+        result = self.simulator.run(self.template, parameter_binds=[binds]).result()
+
+        # probabilities[c, q, o] for candidate c, question pair q, answer o = a + 2b.
+        probabilities = np.empty((len(angles), len(QUESTIONS), 4))
+        for c in range(len(angles)):
+            data = result.data(c)
+            for q in range(len(QUESTIONS)):
+                probabilities[c, q] = data[f"q{q}"]
+        # Uniform referee.
+        return probabilities[:, WIN_TABLE].sum(axis=1) / len(QUESTIONS)
+
+
+_evaluator = None
+
+
+def _init_worker():
+    global _evaluator
+    _evaluator = _Evaluator()
+
+
+def _evaluate_chunk(angles):
+    return _evaluator(angles)
+
+
+SweepResult = namedtuple("SweepResult", ["best_angles", "best_win_rate", "angles", "win_rates"])
+SweepResult.__doc__ = """Outcome of a sweep.
+    Attributes:
+        best_angles (numpy.ndarray): ``(alpha0, alpha1, beta0, beta1)`` of
+            the best candidate.
+        best_win_rate (float): Its exact win probability.
+        angles (numpy.ndarray): Every candidate evaluated, shape ``(n, 4)``
+            (or the grid axes for `CHSHSweep.grid`).
+        win_rates (numpy.ndarray): Their win probabilities, the landscape.
+    """
+
+
+class CHSHSweep:
+    """Evaluates CHSH angle candidates across a process pool.
+
+    Use it as a context manager so the pool is shut down::
+
+        with CHSHSweep() as sweep:
+            result = sweep.grid(16)
+    """
+
+    def __init__(self, max_workers=None, chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            max_workers (int): Worker processes; defaults to the CPU count.
+                With 1 worker everything runs in this process.
+            chunk_size (int): Candidates per Aer job.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._local = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shuts the worker pool down."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def evaluate(self, angles):
+        """Exact win probabilities of many candidates.
+        Args:
+            angles (array_like): ``(n, 4)`` rows of
+                ``(alpha0, alpha1, beta0, beta1)``.
+        Returns:
+            numpy.ndarray: ``(n,)`` win probabilities.
+        """
+        angles = np.atleast_2d(np.asarray(angles, dtype=float))
+        chunks = [angles[i:i + self.chunk_size] for i in range(0, len(angles), self.chunk_size)]
+        if not chunks:
+            return np.empty(0)
+
+        if self.max_workers == 1:
+            if self._local is None:
+                self._local = _Evaluator()
+            return np.concatenate([self._local(chunk) for chunk in chunks])
+
+        if self._pool is None:
+            # Spawned, not forked: a fork after any Aer run in this process deadlocks the workers.
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker)
+        return np.concatenate(list(self._pool.map(_evaluate_chunk, chunks)))
+
+    def grid(self, resolution, low=-pi, high=pi):
+        """Evaluates every angle combination on a regular grid.
+        Args:
+            resolution (int): Points per angle; ``resolution ** 4``
+                candidates in total.
+            low (float): Smallest angle.
+            high (float): Largest angle (excluded, the grid is periodic).
+        Returns:
+            SweepResult: ``angles`` is the 1-D axis shared by the four
+                angles and ``win_rates`` has shape ``(resolution,) * 4``.
+        """
+        axis = np.linspace(low, high, resolution, endpoint=False)
+        mesh = np.stack(np.meshgrid(axis, axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 4)
+        win_rates = self.evaluate(mesh)
+        best = int(np.argmax(win_rates))
+        return SweepResult(mesh[best], float(win_rates[best]), axis, win_rates.reshape((resolution,) * 4))
+
+    def optimize(self, population=256, elite=32, generations=30, seed=None):
+        """Searches the angles with the cross-entropy method.
+
+        Each generation samples ``population`` candidates from a Gaussian,
+        evaluates them in bulk across the pool, and refits the Gaussian to
+        the ``elite`` best. No gradients are needed.
+
+        Args:
+            population (int): Candidates per generation.
+            elite (int): Candidates kept to refit the distribution.
+            generations (int): Number of generations.
+            seed (int or numpy.random.Generator): Makes the search
+                reproducible.
+        Returns:
+            SweepResult: ``angles``/``win_rates`` hold every candidate
+                evaluated, in order.
+        """
+        rng = np.random.default_rng(seed)
+        mean = rng.uniform(-pi, pi, 4)
+        std = np.full(4, pi)
+        history_angles = []
+        history_rates = []
+        for _ in range(generations):
+            candidates = rng.normal(mean, std, (population, 4))
+            rates = self.evaluate(candidates)
+            history_angles.append(candidates)
+            history_rates.append(rates)
+
+            elites = candidates[np.argsort(rates)[-elite:]]
+            mean = elites.mean(axis=0)
+            std = elites.std(axis=0) + 1e-3
+
+        angles = np.concatenate(history_angles)
+        win_rates = np.concatenate(history_rates)
+        best = int(np.argmax(win_rates))
+        # Report angles in (-pi, pi].
+        best_angles = -((-angles[best] + pi) % (2 * pi) - pi)
+        return SweepResult(best_angles, float(win_rates[best]), angles, win_rates)
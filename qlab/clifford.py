@@ -0,0 +1,116 @@
+"""Clifford detection and routing to Aer's stabilizer simulator.
+
+The Bell, superdense coding and teleportation circuits only use H, S, CX,
+Paulis, measurements and Paulis controlled by ``if_test``: they are
+Clifford circuits. A stabilizer tableau simulates them in polynomial time
+and memory, where a statevector needs ``2**n`` amplitudes, so the same
+protocols run on hundreds or thousands of qubits.
+
+`is_clifford` checks a circuit (recursing into control-flow bodies) and
+`CliffordRouter` sends each run to ``AerSimulator(method="stabilizer")`` or
+the Aer sampler on that method when every circuit qualifies, and to the
+default method otherwise. The execution context exposes it as the
+``"clifford_simulator"`` and ``"clifford_sampler"`` kinds::
+
+    result = get_context("clifford_simulator").run(circuit, shots=1000)
+"""
+
+import numpy as np
+
+# Gates the stabilizer method simulates natively.
+CLIFFORD_GATES = frozenset(["cx", "cy", "cz", "ecr", "h", "id", "pauli", "s", "sdg", "swap", "sx", "sxdg", "x",
+                            "y", "z"])
+
+# Non-unitary instructions that keep a stabilizer state a stabilizer state.
+CLIFFORD_INSTRUCTIONS = frozenset(["barrier", "delay", "measure", "reset"])
+
+# Rotations that are Clifford when the angle is a multiple of pi/2.
+_QUARTER_TURN_GATES = frozenset(["rz"])
+
+
+def _quarter_turn(angle):
+    try:
+        turns = float(angle) / (np.pi / 2)
+    except TypeError:  # unbound parameter
+        return False
+    return abs(turns - round(turns)) < 1e-9
+
+
+def is_clifford(circuit):
+    """Whether the stabilizer method can run a circuit.
+
+    Control flow (``if_test``, ``switch``, loops) counts as Clifford when
+    every body does, so classically controlled Paulis qualify.
+
+    Args:
+        circuit (QuantumCircuit): The circuit.
+    Returns:
+        bool: True if every instruction is Clifford.
+    """
+    for instruction in circuit.data:
+        operation = instruction.operation
+        name = operation.name
+        if name in CLIFFORD_GATES or name in CLIFFORD_INSTRUCTIONS:
+            continue
+        if name in _QUARTER_TURN_GATES and _quarter_turn(operation.params[0]):
+            continue
+        blocks = getattr(operation, "blocks", None)
+        if blocks and all(is_clifford(block) for block in blocks):
+            continue
+        return False
+    return True
+
+
+class CliffordRouter:
+    """Runs Clifford circuits on the stabilizer method, others on the default one.
+
+    Both simulators are built on first use and kept.
+    """
+
+    def __init__(self, target="simulator", **options):
+        """
+        Args:
+            target (str): ``"simulator"`` for ``AerSimulator`` (results are
+                ``qiskit.result.Result``) or ``"sampler"`` for the Aer
+                ``Sampler`` (``SamplerResult``).
+            **options: Passed to ``AerSimulator`` or ``Sampler``.
+        Raises:
+            ValueError: For an unknown target.
+        """
+        if target not in ("simulator", "sampler"):
+            raise ValueError(f"unknown target {target!r}")
+        self.target = target
+        self.options = options
+        self.routed = {"stabilizer": 0, "automatic": 0}
+        self._instances = {}
+
+    def _instance(self, method):
+        instance = self._instances.get(method)
+        if instance is None:
+            if self.target == "simulator":
+                from qiskit_aer import AerSimulator
+
+                instance = AerSimulator(method=method, **self.options)
+            else:
+                from qiskit_aer.primitives import Sampler
+
+                options = dict(self.options)
+                options["backend_options"] = {**options.get("backend_options", {}), "method": method}
+                instance = Sampler(**options)
+            self._instances[method] = instance
+        return instance
+
+    def method_for(self, circuits):
+        """``"stabilizer"`` if every circuit is Clifford, else ``"automatic"``."""
+        if not isinstance(circuits, (list, tuple)):
+            circuits = [circuits]
+        return "stabilizer" if all(is_clifford(circuit) for circuit in circuits) else "automatic"
+
+    def run(self, circuits, *args, **run_options):
+        """Runs circuits on the method `method_for` picks.
+
+        Takes the arguments of the target's ``run`` and returns its job.
+        """
+        method = self.method_for(circuits)
+        self.routed[method] += 1
+        return self._instance(method).run(circuits, *args, **run_options)
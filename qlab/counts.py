@@ -0,0 +1,300 @@
+"""Array-backed counts with vectorized marginals and named registers.
+
+Results are usually post-processed as string-keyed dictionaries
+(``get_counts()``, ``binary_probabilities()``, ``marginal_distribution``),
+which costs a Python object per outcome. `CountsArray` keeps two parallel
+arrays instead, sorted integer outcomes (clbit ``i`` is bit ``i``) and their
+counts, plus the classical registers' names and sizes::
+
+    counts = CountsArray.from_result(result)       # registers from the header
+    counts["Result"].to_counts()                   # {"0": 1024}
+    counts.marginal([0, 2])                        # like marginal_distribution
+    total = counts + more_counts                   # merge batches
+
+Counts may be integers (shots) or floats (quasi-probabilities). Parsing and
+formatting bitstrings is vectorized as well, so converting from and to the
+dict formats stays cheap.
+"""
+
+import numpy as np
+
+# Marginals up to this many bits are accumulated in a dense array.
+DENSE_BITS = 24
+
+
+def _default_registers(num_bits):
+    return [("c", num_bits)]
+
+
+def _parse_bitstrings(keys):
+    # Vectorized int(key.replace(" ", ""), 2) for equally formatted keys; returns outcomes and register sizes.
+    raw = np.array(keys, dtype=bytes)
+    chars = raw.view(np.uint8).reshape(len(keys), -1)
+    width = chars.shape[1]
+    spaces = np.flatnonzero(chars[0] == ord(" "))
+    # Register widths, first register (rightmost in the string) first.
+    edges = np.concatenate([[-1], spaces, [width]])
+    sizes = [int(b - a - 1) for a, b in zip(edges[:-1], edges[1:])][::-1]
+    bits = np.delete(chars, spaces, axis=1) == ord("1")
+    num_bits = bits.shape[1]
+    if num_bits > 64:
+        raise ValueError("outcomes wider than 64 bits are not supported")
+    weights = np.left_shift(np.uint64(1), np.arange(num_bits - 1, -1, -1, dtype=np.uint64))
+    outcomes = (bits.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64) if num_bits else np.zeros(
+        len(keys), dtype=np.uint64)
+    return outcomes, sizes
+
+
+def sum_duplicates(outcomes, counts):
+    """Sorts outcomes and sums the counts of equal ones.
+    Args:
+        outcomes (numpy.ndarray): Integer outcomes, possibly repeated.
+        counts (numpy.ndarray): Count (or quasi-probability) of each.
+    Returns:
+        tuple: ``(outcomes, counts)``, outcomes sorted and distinct.
+    """
+    if not len(outcomes):
+        return outcomes, counts
+    # A stable sort is linear on concatenated sorted batches.
+    order = np.argsort(outcomes, kind="stable")
+    outcomes = outcomes[order]
+    counts = counts[order]
+    starts = np.flatnonzero(np.concatenate([[True], outcomes[1:] != outcomes[:-1]]))
+    return outcomes[starts], np.add.reduceat(counts, starts)
+
+
+def _runs(bits):
+    # Splits bit indices into (source, destination, length) runs of consecutive bits.
+    runs = []
+    for destination, bit in enumerate(bits):
+        if runs and bit == runs[-1][0] + runs[-1][2]:
+            runs[-1][2] += 1
+        else:
+            runs.append([bit, destination, 1])
+    return runs
+
+
+def _gather_bits(outcomes, bits):
+    # Integer keys whose bit i is bit bits[i] of each outcome.
+    keys = np.zeros(len(outcomes), dtype=np.uint64)
+    scratch = np.empty_like(keys)
+    # One shift and mask per run of consecutive bits, e.g. a whole register.
+    for source, destination, length in _runs(bits):
+        np.right_shift(outcomes, np.uint64(source), out=scratch)
+        scratch &= np.uint64((1 << length) - 1)
+        scratch <<= np.uint64(destination)
+        keys |= scratch
+    return keys
+
+
+def _dense(num_bits, size):
+    # Whether a bincount over every outcome is cheaper than sorting size keys.
+    return num_bits <= DENSE_BITS and 2**num_bits <= 4 * size + 1024
+
+
+class CountsArray:
+    """Outcome counts as parallel NumPy arrays."""
+
+    def __init__(self, outcomes, counts, num_bits=None, registers=None):
+        """
+        Args:
+            outcomes (array_like): Integer outcomes; duplicates are summed.
+            counts (array_like): Count (or probability) of each outcome.
+            num_bits (int): Width of an outcome; defaults to the register
+                sizes or the widest outcome.
+            registers (list): ``(name, size)`` pairs, clbit 0 first; a single
+                register ``"c"`` by default.
+        """
+        outcomes = np.asarray(outcomes, dtype=np.uint64).ravel()
+        counts = np.asarray(counts).ravel()
+        if len(outcomes) != len(counts):
+            raise ValueError("outcomes and counts must have the same length")
+        if len(outcomes) and np.any(outcomes[1:] <= outcomes[:-1]):
+            outcomes, counts = sum_duplicates(outcomes, counts)
+        if registers is not None:
+            registers = [(str(name), int(size)) for name, size in registers]
+            if num_bits is None:
+                num_bits = sum(size for _, size in registers)
+        if num_bits is None:
+            num_bits = int(outcomes.max()).bit_length() if len(outcomes) else 0
+        self.outcomes = outcomes
+        self.counts = counts
+        self.num_bits = num_bits
+        self.registers = registers or _default_registers(num_bits)
+        if sum(size for _, size in self.registers) != num_bits:
+            raise ValueError("register sizes must add up to num_bits")
+
+    # -- constructors ------------------------------------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, data, registers=None, num_bits=None):
+        """Builds counts from ``get_counts()``, ``binary_probabilities()``,
+        hex-keyed memory counts or an integer-keyed quasi-distribution.
+        Args:
+            data (dict): The counts.
+            registers (list): ``(name, size)`` pairs, clbit 0 first. When
+                omitted, space-separated keys give unnamed registers
+                ``c0, c1...``.
+            num_bits (int): Outcome width for integer or hex keys.
+        Returns:
+            CountsArray: The counts.
+        """
+        keys = list(data)
+        values = np.fromiter(data.values(), dtype=float, count=len(keys))
+        if values.size and np.all(values == np.round(values)) and not isinstance(next(iter(data.values())), float):
+            values = values.astype(np.int64)
+        if not keys:
+            return cls([], values, num_bits or 0, registers)
+        first = keys[0]
+        if isinstance(first, (int, np.integer)):
+            return cls(np.array(keys, dtype=np.uint64), values, num_bits, registers)
+        if first.startswith("0x"):
+            return cls(np.array([int(k, 16) for k in keys], dtype=np.uint64), values, num_bits, registers)
+        outcomes, sizes = _parse_bitstrings(keys)
+        if registers is None:
+            registers = [(f"c{i}", size) for i, size in enumerate(sizes)] if len(sizes) > 1 else None
+        return cls(outcomes, values, sum(sizes), registers)
+
+    @classmethod
+    def from_result(cls, result, experiment=0):
+        """Builds counts from an Aer/Qiskit ``Result``, naming the registers
+        after the circuit's classical registers."""
+        header = result.results[experiment].header
+        registers = [(name, size) for name, size in getattr(header, "creg_sizes", [])] or None
+        return cls.from_dict(result.get_counts(experiment), registers=registers)
+
+    @classmethod
+    def from_samples(cls, samples, num_bits=None, registers=None):
+        """Counts the integer outcomes of individual shots."""
+        samples = np.asarray(samples, dtype=np.uint64).ravel()
+        if num_bits is not None and _dense(num_bits, len(samples)):
+            dense = np.bincount(samples.astype(np.intp), minlength=2**num_bits)
+            outcomes = np.flatnonzero(dense)
+            return cls(outcomes, dense[outcomes], num_bits, registers)
+        outcomes, counts = np.unique(samples, return_counts=True)
+        return cls(outcomes, counts, num_bits, registers)
+
+    # -- access ------------------------------------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def __repr__(self):
+        names = ", ".join(f"{name}[{size}]" for name, size in self.registers)
+        return f"CountsArray({len(self)} outcomes, {names})"
+
+    @property
+    def shots(self):
+        """Total of the counts."""
+        return self.counts.sum()
+
+    @property
+    def nbytes(self):
+        """int: Memory held by the arrays."""
+        return self.outcomes.nbytes + self.counts.nbytes
+
+    def get(self, outcome, default=0):
+        """Count of one outcome (int or bitstring)."""
+        if isinstance(outcome, str):
+            outcome = int(outcome.replace(" ", ""), 2)
+        index = np.searchsorted(self.outcomes, np.uint64(outcome))
+        if index < len(self.outcomes) and self.outcomes[index] == outcome:
+            return self.counts[index]
+        return default
+
+    def probabilities(self):
+        """Counts normalized to sum to 1."""
+        return self.counts / self.counts.sum()
+
+    def most_frequent(self):
+        """The outcome with the largest count."""
+        return int(self.outcomes[np.argmax(self.counts)])
+
+    # -- marginals ---------------------------------------------------------------------------------------------
+
+    def register_bits(self, name):
+        """Clbit indices of a register."""
+        offset = 0
+        for register, size in self.registers:
+            if register == name:
+                return list(range(offset, offset + size))
+            offset += size
+        raise KeyError(f"no register named {name!r}")
+
+    def marginal(self, bits, registers=None):
+        """Counts of a subset of the bits, like ``marginal_distribution``.
+        Args:
+            bits (list): Clbit indices; bit ``i`` of the result is
+                ``bits[i]``.
+            registers (list): Registers of the result; one register ``"c"``
+                by default.
+        Returns:
+            CountsArray: The marginal counts.
+        """
+        bits = list(bits)
+        keys = _gather_bits(self.outcomes, bits)
+        if _dense(len(bits), len(keys)):
+            dense = np.bincount(keys.astype(np.intp), weights=self.counts, minlength=2 ** len(bits))
+            outcomes = np.flatnonzero(dense)
+            return CountsArray(outcomes, dense[outcomes].astype(self.counts.dtype), len(bits), registers)
+        outcomes, counts = sum_duplicates(keys, self.counts)
+        return CountsArray(outcomes, counts, len(bits), registers)
+
+    def __getitem__(self, names):
+        """Marginal over one register or a tuple of registers, by name."""
+        if isinstance(names, str):
+            names = (names,)
+        bits = []
+        registers = []
+        for name in names:
+            register_bits = self.register_bits(name)
+            bits.extend(register_bits)
+            registers.append((name, len(register_bits)))
+        return self.marginal(bits, registers)
+
+    # -- merging -----------------------------------------------------------------------------------------------
+
+    def merge(self, *others):
+        """Sums counts of batches with the same bits."""
+        parts = [self, *others]
+        if any(part.num_bits != self.num_bits for part in others):
+            raise ValueError("cannot merge counts of different widths")
+        outcomes = np.concatenate([part.outcomes for part in parts])
+        counts = np.concatenate([part.counts for part in parts])
+        return CountsArray(outcomes, counts, self.num_bits, self.registers)
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    # -- conversion --------------------------------------------------------------------------------------------
+
+    def bitstrings(self, separate_registers=True):
+        """Outcomes formatted like ``get_counts()`` keys.
+        Args:
+            separate_registers (bool): Put a space between registers.
+        Returns:
+            list: One string per outcome.
+        """
+        n = self.num_bits
+        if not len(self.outcomes):
+            return []
+        shifts = np.arange(n - 1, -1, -1, dtype=np.uint64)
+        chars = (((self.outcomes[:, None] >> shifts) & np.uint64(1)).astype(np.uint8) + ord("0"))
+        if separate_registers and len(self.registers) > 1:
+            # Registers print last first; a space goes before each register but the last one printed.
+            positions = np.cumsum([size for _, size in reversed(self.registers)])[:-1]
+            chars = np.insert(chars, positions, ord(" "), axis=1)
+        width = chars.shape[1]
+        return np.ascontiguousarray(chars).view(f"S{width}").ravel().astype(str).tolist()
+
+    def to_counts(self):
+        """``get_counts()``-style dict, registers separated by spaces."""
+        return dict(zip(self.bitstrings(), self.counts.tolist()))
+
+    def binary_probabilities(self):
+        """``QuasiDistribution.binary_probabilities()``-style dict."""
+        return dict(zip(self.bitstrings(separate_registers=False), self.probabilities().tolist()))
+
+    def int_counts(self):
+        """Integer-keyed dict, as in ``quasi_dists`` or ``get_int_counts()``."""
+        return dict(zip(self.outcomes.tolist(), self.counts.tolist()))
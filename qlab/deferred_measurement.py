@@ -0,0 +1,208 @@
+"""Deferred measurement: ``if_test`` feed-forward turned into controlled gates.
+
+A mid-circuit ``measure`` followed by ``if_test`` makes Aer simulate every
+shot separately. By the deferred-measurement principle, when the measured
+qubit is left alone afterwards, ::
+
+    measure(q, c)                      cx(q, t)
+    with if_test((c, 1)):       ==>    ...
+        x(t)                           measure(q, c)   # at the end
+
+gives the same distribution, and with only terminal measurements Aer
+samples all shots from one final state.
+
+`defer_measurements` rewrites a circuit and reports what it changed;
+`DeferMeasurements` is the same rewrite as a transpiler pass, storing the
+report in ``property_set["deferred_measurements"]``. A measurement is only
+deferred when it is safe:
+
+* its qubit is not used again (barriers aside) except as the control of
+  the rewritten blocks,
+* its clbit is not written again and is only read by ``if_test`` blocks
+  conditioned on that single bit (``(clbit, v)`` or a 1-bit register),
+* those blocks hold only unitary gates, none of them on the measured qubit.
+
+Everything else is kept as is, with the reason in the report.
+"""
+
+from collections import namedtuple
+
+from qiskit.circuit import ClassicalRegister, Clbit, IfElseOp
+from qiskit.circuit.classical import expr
+from qiskit.converters import circuit_to_dag, dag_to_circuit
+from qiskit.transpiler import TransformationPass
+
+DeferralReport = namedtuple("DeferralReport", ["rewritten", "kept"])
+DeferralReport.__doc__ = """What `defer_measurements` changed.
+    Attributes:
+        rewritten (list): ``(index, qubit, clbit)`` of each ``if_test`` turned
+            into controlled gates (instruction index in the input circuit,
+            qubit and clbit indices of the deferred measurement).
+        kept (list): ``(index, reason)`` of each ``if_test`` left dynamic.
+    """
+
+
+def _condition_bit(circuit, operation):
+    # The single clbit index and value of an if_test condition, or None.
+    if isinstance(operation.condition, expr.Expr):
+        return None
+    target, value = operation.condition
+    if isinstance(target, Clbit):
+        return circuit.find_bit(target).index, int(value)
+    if isinstance(target, ClassicalRegister) and len(target) == 1:
+        return circuit.find_bit(target[0]).index, int(value)
+    return None
+
+
+def _unitary_body(block, qubit_indices, measured):
+    # Why a body cannot become controlled gates, or None if it can.
+    for instruction in block.data:
+        operation = instruction.operation
+        if operation.name == "barrier":
+            continue
+        if getattr(operation, "blocks", None) or operation.name in ("measure", "reset") or instruction.clbits:
+            return f"body contains '{operation.name}'"
+        if measured in (qubit_indices[block.find_bit(q).index] for q in instruction.qubits):
+            return "body acts on the measured qubit"
+    return None
+
+
+def _plan(circuit):
+    # Decides which measurements to defer. Returns {measure index: if_test indices}, kept list.
+    data = circuit.data
+    index_of = circuit.find_bit
+
+    # The measurement that last wrote each clbit before every if_test, and each if_test's condition bit.
+    last_write = {}
+    readers = {}
+    kept = []
+    blocked = set()
+    for i, instruction in enumerate(data):
+        operation = instruction.operation
+        if isinstance(operation, IfElseOp):
+            qubits = [index_of(q).index for q in instruction.qubits]
+            condition = _condition_bit(circuit, operation)
+            reason = None
+            if condition is None:
+                reason = "condition is not a single clbit"
+            else:
+                source = last_write.get(condition[0])
+                if source is None:
+                    reason = "condition bit is not set by a measurement"
+                else:
+                    measured = index_of(data[source].qubits[0]).index
+                    for block in operation.blocks:
+                        reason = reason or _unitary_body(block, qubits, measured)
+            if reason is None:
+                readers.setdefault(source, []).append(i)
+            else:
+                kept.append((i, reason))
+                if condition is not None and condition[0] in last_write:
+                    blocked.add(last_write[condition[0]])
+            continue
+        if operation.name == "measure":
+            last_write[index_of(instruction.clbits[0]).index] = i
+        elif any(index_of(c).index in last_write for c in instruction.clbits):
+            for c in instruction.clbits:
+                last_write.pop(index_of(c).index, None)
+
+    deferred = {}
+    for source, if_indices in readers.items():
+        measure = data[source]
+        qubit, clbit = measure.qubits[0], measure.clbits[0]
+        safe = source not in blocked
+        for j in range(source + 1, len(data)):
+            if not safe:
+                break
+            if j in if_indices:
+                continue
+            instruction = data[j]
+            if instruction.operation.name == "barrier":
+                continue
+            touches_qubit = qubit in instruction.qubits
+            touches_clbit = clbit in instruction.clbits or (
+                isinstance(instruction.operation, IfElseOp) and clbit in _condition_clbits(instruction.operation)
+            )
+            safe = not (touches_qubit or touches_clbit)
+        if safe:
+            deferred[source] = if_indices
+        else:
+            kept.extend((i, "measured qubit or clbit is used again") for i in if_indices)
+    return deferred, sorted(kept)
+
+
+def _condition_clbits(operation):
+    if isinstance(operation.condition, expr.Expr):
+        bits = []
+        for var in expr.iter_vars(operation.condition):
+            if isinstance(var.var, Clbit):
+                bits.append(var.var)
+            elif isinstance(var.var, ClassicalRegister):
+                bits.extend(var.var)
+        return bits
+    target = operation.condition[0]
+    return [target] if isinstance(target, Clbit) else list(target)
+
+
+def defer_measurements(circuit):
+    """Rewrites deferrable ``measure`` + ``if_test`` pairs into controlled gates.
+    Args:
+        circuit (QuantumCircuit): The circuit.
+    Returns:
+        tuple: ``(new circuit, DeferralReport)``. The new circuit has the same
+            registers; deferred measurements move to the end, in order.
+    """
+    deferred, kept = _plan(circuit)
+    controlled = {i: source for source, if_indices in deferred.items() for i in if_indices}
+
+    out = circuit.copy_empty_like()
+    rewritten = []
+    for i, instruction in enumerate(circuit.data):
+        if i in deferred:
+            continue
+        if i not in controlled:
+            out.append(instruction)
+            continue
+
+        control = circuit.data[controlled[i]].qubits[0]
+        operation = instruction.operation
+        _, value = _condition_bit(circuit, operation)
+        for block, state in zip(operation.blocks, (value, 1 - value)):
+            for inner in block.data:
+                if inner.operation.name == "barrier":
+                    continue
+                qubits = [instruction.qubits[block.find_bit(q).index] for q in inner.qubits]
+                out.append(inner.operation.control(1, ctrl_state=state), [control, *qubits])
+        measure = circuit.data[controlled[i]]
+        rewritten.append((i, circuit.find_bit(control).index, circuit.find_bit(measure.clbits[0]).index))
+
+    for source in sorted(deferred):
+        out.append(circuit.data[source])
+    return out, DeferralReport(rewritten, kept)
+
+
+class DeferMeasurements(TransformationPass):
+    """Transpiler pass form of `defer_measurements`.
+
+    The report is stored in ``property_set["deferred_measurements"]``.
+    """
+
+    def run(self, dag):
+        circuit, report = defer_measurements(dag_to_circuit(dag))
+        self.property_set["deferred_measurements"] = report
+        return circuit_to_dag(circuit)
+
+
+def is_dynamic(circuit):
+    """Whether a circuit still has mid-circuit measurements or control flow."""
+    seen_measure = set()
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if getattr(operation, "blocks", None):
+            return True
+        if operation.name == "measure":
+            seen_measure.add(instruction.qubits[0])
+        elif operation.name != "barrier" and seen_measure.intersection(instruction.qubits):
+            return True
+    return False
+
@@ -0,0 +1,316 @@
+"""Pauli expectation values, exact from the state or estimated from shots.
+
+The lab only samples bitstrings, so a correlator like ``<A (x) B>`` of the
+CHSH game needs thousands of shots of ``chsh_circuit``. Here:
+
+* `pauli_expectations` computes many observables (Pauli labels, ``Pauli``
+  or ``SparsePauliOp``) on one state, or on a batch of states (rows of a
+  2-D array), exactly. Every distinct Pauli is evaluated once: those
+  sharing an X part share one ``conj(psi[k]) * psi[k ^ x]`` product, and
+  their Z parts are read off its Walsh-Hadamard transform (or summed with
+  parity signs when there are few of them). Density matrices work too.
+* `ExactEstimator` is an Estimator for circuits: it simulates each circuit
+  once (measurements and ``if_test`` feed-forward deferred, final
+  measurements dropped), keeps the states in a small cache and evaluates
+  all the observables of a circuit in one pass.
+* `sampled_expectations` estimates the same values from shots: the Paulis
+  are grouped into qubit-wise commuting sets, each set is measured with
+  one basis-change circuit, and all the sets run in one Aer job.
+
+`qlab.chsh.chsh_value` and `qlab.teleportation.teleportation_fidelities`
+use it for the exact CHSH value ``S`` and teleportation fidelities::
+
+    values = pauli_expectations(Statevector(bell), ["ZZ", "XX", "YY", "ZI"])
+"""
+
+import contextlib
+from collections import OrderedDict
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import DensityMatrix, PauliList, SparsePauliOp, Statevector
+
+from qlab.counts import CountsArray
+from qlab.statevector_engine import _DoneJob
+from qlab.transpile_cache import cached_transpile, structural_hash
+
+# Above this many Z parts per X part (times the qubit count), a Walsh-Hadamard transform beats direct sums.
+WHT_RATIO = 1.0
+
+# Simulated states kept by an `ExactEstimator`.
+STATE_CACHE_SIZE = 64
+
+# Shots per measured group in `sampled_expectations`.
+SHOTS = 4096
+
+
+def _masks(bits):
+    # Boolean (num_paulis, num_qubits) table -> one integer mask per Pauli, qubit i in bit i.
+    return (bits.astype(np.uint64) << np.arange(bits.shape[1], dtype=np.uint64)).sum(axis=1, dtype=np.uint64)
+
+
+def _parity(values):
+    return np.bitwise_count(values) & 1
+
+
+def pauli_table(observables, num_qubits=None):
+    """Flattens observables into their distinct Paulis.
+    Args:
+        observables (list): Pauli labels, ``Pauli`` or ``SparsePauliOp``.
+        num_qubits (int): Checked against the observables when given.
+    Returns:
+        tuple: ``(x, z, coefficients)``: X and Z masks of each distinct
+            Pauli (qubit ``i`` in bit ``i``) and a complex matrix mapping
+            their expectations to the observables' (one row per
+            observable), with label phases folded in.
+    """
+    # Plain labels are parsed together, which is much faster than one SparsePauliOp each.
+    labels = [i for i, observable in enumerate(observables) if isinstance(observable, str)]
+    parts = []
+    if labels:
+        paulis = PauliList([observables[i] for i in labels])
+        parts.append((np.array(labels, dtype=np.intp), paulis, np.ones(len(labels))))
+    for i, observable in enumerate(observables):
+        if not isinstance(observable, str):
+            op = SparsePauliOp(observable)
+            parts.append((np.full(op.size, i, dtype=np.intp), op.paulis, op.coeffs))
+    owners = np.concatenate([owner for owner, _, _ in parts])
+    paulis = PauliList.from_symplectic(np.concatenate([p.z for _, p, _ in parts]),
+                                       np.concatenate([p.x for _, p, _ in parts]),
+                                       np.concatenate([p.phase for _, p, _ in parts]))
+    if num_qubits is not None and paulis.num_qubits != num_qubits:
+        raise ValueError(f"observables must act on {num_qubits} qubits")
+
+    # Each term is coeff * (-i)^(phase + number of Ys) * Z^z X^x.
+    factors = (-1j) ** ((paulis.phase + np.sum(paulis.x & paulis.z, axis=1)) % 4)
+    factors = factors * np.concatenate([coeffs for _, _, coeffs in parts])
+    keys, inverse = np.unique(np.stack([_masks(paulis.x), _masks(paulis.z)], axis=1), axis=0, return_inverse=True)
+    coefficients = np.zeros((len(observables), len(keys)), dtype=complex)
+    np.add.at(coefficients, (owners, inverse.ravel()), factors)
+    return keys[:, 0], keys[:, 1], coefficients
+
+
+def _walsh_hadamard(values, num_qubits):
+    # H[..., z] = sum_k (-1)^popcount(k & z) values[..., k], in num_qubits butterfly passes.
+    out = values.copy()
+    batch = out.shape[:-1]
+    for i in range(num_qubits):
+        view = out.reshape(batch + (2 ** (num_qubits - 1 - i), 2, 2**i))
+        low = view[..., 0, :].copy()
+        view[..., 0, :] += view[..., 1, :]
+        view[..., 1, :] = low - view[..., 1, :]
+    return out
+
+
+def _products(data, density, indices, x):
+    # conj(psi[k]) psi[k ^ x] (or rho[k ^ x, k]): the terms of <Z^z X^x> before the Z signs.
+    shifted = (indices ^ x).astype(np.intp)
+    if density:
+        return data[shifted, indices.astype(np.intp)]
+    return np.conj(data) * data[..., shifted]
+
+
+def pauli_expectations(states, observables):
+    """Exact expectation values of many observables.
+    Args:
+        states (Statevector, DensityMatrix or array): One state, or a
+            batch of statevectors as the rows of a 2-D array.
+        observables (list): Pauli labels, ``Pauli`` or ``SparsePauliOp``.
+    Returns:
+        numpy.ndarray: Real values, shape ``(len(observables),)`` for one
+            state or ``(batch, len(observables))`` for a batch.
+    """
+    density = isinstance(states, DensityMatrix)
+    data = np.asarray(states.data if isinstance(states, (Statevector, DensityMatrix)) else states)
+    dim = data.shape[-1]
+    num_qubits = dim.bit_length() - 1
+    x, z, coefficients = pauli_table(observables, num_qubits)
+
+    indices = np.arange(dim, dtype=np.uint64)
+    batch = () if density or data.ndim == 1 else data.shape[:-1]
+    values = np.empty(batch + (len(x),), dtype=complex)
+
+    for mask in np.unique(x):
+        columns = np.flatnonzero(x == mask)
+        products = _products(data, density, indices, mask)
+        zs = z[columns]
+        if len(zs) > WHT_RATIO * num_qubits:
+            values[..., columns] = _walsh_hadamard(products, num_qubits)[..., zs.astype(np.intp)]
+        else:
+            signs = 1 - 2 * _parity(indices[None, :] & zs[:, None]).astype(np.int8)
+            values[..., columns] = products @ signs.T
+    return (values @ coefficients.T).real
+
+
+def circuit_state(circuit):
+    """Simulates a circuit without its final measurements.
+
+    Mid-circuit measurements with ``if_test`` feed-forward are deferred
+    first (`qlab.deferred_measurement.defer_measurements`); any that cannot
+    be deferred raise ``ValueError``.
+
+    Args:
+        circuit (QuantumCircuit): A bound circuit.
+    Returns:
+        Statevector: The final state.
+    """
+    from qlab.deferred_measurement import defer_measurements
+
+    if any(instruction.operation.name == "if_else" for instruction in circuit.data):
+        circuit, report = defer_measurements(circuit)
+        if report.kept:
+            raise ValueError("circuit has feed-forward that cannot be deferred")
+    circuit = circuit.remove_final_measurements(inplace=False)
+    if any(instruction.operation.name in ("measure", "reset") for instruction in circuit.data):
+        raise ValueError("circuit measures before its end; the state is mixed")
+    return Statevector(circuit)
+
+
+class ExactEstimator:
+    """Estimator computing Pauli expectation values exactly.
+
+    ``ExactEstimator().run(circuits, observables).result().values`` matches
+    ``qiskit.primitives.Estimator``, with each circuit simulated once and
+    all its observables evaluated in one pass.
+    """
+
+    def __init__(self, cache_size=STATE_CACHE_SIZE):
+        """
+        Args:
+            cache_size (int): Simulated states kept for reuse.
+        """
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._states = OrderedDict()
+
+    def state(self, circuit):
+        """Returns the circuit's state (see `circuit_state`), cached."""
+        key = structural_hash(circuit)
+        state = self._states.get(key)
+        if state is not None:
+            self._states.move_to_end(key)
+            self.hits += 1
+            return state
+        self.misses += 1
+        state = self._states[key] = circuit_state(circuit)
+        while len(self._states) > self.cache_size:
+            self._states.popitem(last=False)
+        return state
+
+    def expectations(self, circuit, observables):
+        """Expectation values of many observables on one circuit's state."""
+        return pauli_expectations(self.state(circuit), observables)
+
+    def run(self, circuits, observables, parameter_values=None):
+        """Evaluates ``observables[i]`` on ``circuits[i]``.
+        Args:
+            circuits (QuantumCircuit or list): Circuits, repeated as needed.
+            observables (list): Observables, one per circuit.
+            parameter_values (list): Values to bind, one sequence per circuit.
+        Returns:
+            object: Job whose ``result()`` is an ``EstimatorResult``.
+        """
+        from qiskit.primitives import EstimatorResult
+
+        if isinstance(circuits, QuantumCircuit):
+            circuits = [circuits]
+            observables = [observables] if not isinstance(observables, (list, tuple)) else observables
+            circuits = circuits * len(observables)
+            if parameter_values is not None and np.ndim(parameter_values) == 1:
+                parameter_values = [parameter_values] * len(observables)
+        # Group the observables by circuit, so each state is evaluated once for all of them.
+        groups = OrderedDict()
+        for i, circuit in enumerate(circuits):
+            if parameter_values is not None and len(parameter_values[i]):
+                circuit = circuit.assign_parameters(parameter_values[i])
+            groups.setdefault(structural_hash(circuit), (circuit, []))[1].append(i)
+        values = np.empty(len(circuits))
+        for circuit, positions in groups.values():
+            values[positions] = self.expectations(circuit, [observables[i] for i in positions])
+        return _DoneJob(EstimatorResult(values, [{} for _ in circuits]))
+
+
+def commuting_groups(x, z):
+    """Greedy qubit-wise commuting groups of Paulis.
+    Args:
+        x (numpy.ndarray): X masks, see `pauli_table`.
+        z (numpy.ndarray): Z masks.
+    Returns:
+        list: Lists of Pauli indices; within a group, every qubit is
+            acted on by at most one of X, Y, Z.
+    """
+    groups = []
+    bases = []  # per group: X, Z and support masks of the measured basis
+    # Widest Paulis first, so narrow ones fill in around them.
+    for i in sorted(range(len(x)), key=lambda i: -int(np.bitwise_count(x[i] | z[i]))):
+        support = x[i] | z[i]
+        for g, (gx, gz, gsupport) in enumerate(bases):
+            common = support & gsupport
+            if (x[i] & common) == (gx & common) and (z[i] & common) == (gz & common):
+                groups[g].append(i)
+                bases[g] = (gx | x[i], gz | z[i], gsupport | support)
+                break
+        else:
+            groups.append([i])
+            bases.append((x[i], z[i], support))
+    return groups
+
+
+def _basis_circuit(circuit, x, z):
+    # The circuit without final measurements, rotated so every qubit's basis (X, Y or Z) is read as Z.
+    qc = circuit.remove_final_measurements(inplace=False)
+    qc = QuantumCircuit(qc.num_qubits, qc.num_qubits).compose(qc)
+    for qubit in range(qc.num_qubits):
+        if x >> qubit & 1:
+            if z >> qubit & 1:
+                qc.sdg(qubit)
+            qc.h(qubit)
+    qc.measure(range(qc.num_qubits), range(qc.num_qubits))
+    return qc
+
+
+def sampled_expectations(circuit, observables, shots=SHOTS, seed=None, simulator=None):
+    """Estimates expectation values from shots, one job for all observables.
+    Args:
+        circuit (QuantumCircuit): State preparation (final measurements are
+            dropped).
+        observables (list): Pauli labels, ``Pauli`` or ``SparsePauliOp``.
+        shots (int): Shots per qubit-wise commuting group.
+        seed (int): Simulator seed.
+        simulator (Backend): Defaults to an ``AerSimulator`` leased from
+            the shared ``"simulator"`` execution context.
+    Returns:
+        tuple: ``(values, standard_errors, num_groups)``; errors ignore the
+            covariance of Paulis measured in the same group.
+    """
+    x, z, coefficients = pauli_table(observables, circuit.num_qubits)
+    groups = commuting_groups(x, z)
+    circuits = []
+    for group in groups:
+        gx = np.bitwise_or.reduce(x[group])
+        gz = np.bitwise_or.reduce(z[group])
+        circuits.append(_basis_circuit(circuit, int(gx), int(gz)))
+
+    run_options = {"shots": shots} if seed is None else {"shots": shots, "seed_simulator": seed}
+    with contextlib.ExitStack() as stack:
+        if simulator is None:
+            from qlab.execution import get_context
+
+            simulator = stack.enter_context(get_context("simulator").lease())
+        compiled = [cached_transpile(circuit, simulator) for circuit in circuits]
+        result = simulator.run(compiled, **run_options).result()
+
+    means = np.empty(len(x))
+    variances = np.empty(len(x))
+    for i, group in enumerate(groups):
+        counts = CountsArray.from_dict(result.get_counts(i), num_bits=circuit.num_qubits)
+        probabilities = counts.probabilities()
+        for j in group:
+            signs = 1 - 2 * _parity(counts.outcomes & (x[j] | z[j])).astype(np.int8)
+            means[j] = probabilities @ signs
+            variances[j] = (1 - means[j] ** 2) / shots
+    # The table's Paulis are Z^z X^x = i^(number of Ys) times the Hermitian Pauli that was measured.
+    values = (coefficients @ (means * 1j ** np.bitwise_count(x & z))).real
+    errors = np.sqrt(np.abs(coefficients) ** 2 @ variances)
+    return values, errors, len(groups)
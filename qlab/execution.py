@@ -0,0 +1,390 @@
+"""Lab-wide execution context: a shared pool of samplers and simulators.
+
+The lessons used to build a fresh ``Sampler()`` or ``AerSimulator()`` for
+every run. An `ExecutionContext` owns a small pool of long-lived, warmed
+instances of one kind and runs every submission on them:
+
+* ``submit`` queues circuits and returns a ``concurrent.futures.Future``;
+  ``run`` waits for it.
+* Submissions that arrive while every instance is busy are coalesced into a
+  single ``run`` call (when their run options match; per-circuit options
+  such as ``parameter_values`` are concatenated) and the result is split
+  back per submission, so batching costs no added latency.
+* Per-job latency, batch sizes and queue depth are recorded, see
+  `ExecutionContext.metrics`.
+
+Scripts share contexts through `get_context`::
+
+    from qlab.execution import get_context
+
+    result = get_context("reference_sampler").run(circuit)
+
+New kinds of executor (a fake runtime, say) are added with `register_kind`.
+"""
+
+import copy
+import itertools
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+# Latencies kept for the metrics.
+METRICS_WINDOW = 10000
+
+# Submissions merged into one run call at most.
+MAX_BATCH = 64
+
+# Run options with one entry per circuit; merged submissions get them concatenated.
+PER_CIRCUIT_OPTIONS = ("parameter_values", "parameter_binds")
+
+ExecutorKind = namedtuple("ExecutorKind", ["factory", "execute", "split"])
+ExecutorKind.__doc__ = """How to build, run and split results for one kind of executor.
+    Attributes:
+        factory (callable): Takes the instance options and returns a new
+            sampler/simulator.
+        execute (callable): Takes ``(instance, circuits, run_options)`` and
+            returns the finished result for all circuits.
+        split (callable): Takes ``(result, slice)`` and returns the result
+            of just those circuits.
+    """
+
+
+def _primitive_execute(instance, circuits, run_options):
+    return instance.run(circuits, **run_options).result()
+
+
+def _primitive_split(result, part):
+    return type(result)(result.quasi_dists[part], result.metadata[part])
+
+
+def _backend_execute(instance, circuits, run_options):
+    return instance.run(circuits, **run_options).result()
+
+
+def _backend_split(result, part):
+    sliced = copy.copy(result)
+    sliced.results = result.results[part]
+    return sliced
+
+
+def _aer_sampler(**options):
+    from qiskit_aer.primitives import Sampler
+
+    return Sampler(**options)
+
+
+def _reference_sampler(**options):
+    from qiskit.primitives import Sampler
+
+    return Sampler(**options)
+
+
+def _fast_sampler(**options):
+    from qlab.statevector_engine import FastSampler
+
+    return FastSampler(**options)
+
+
+def _aer_simulator(**options):
+    from qiskit_aer import AerSimulator
+
+    return AerSimulator(**options)
+
+
+def _clifford_simulator(**options):
+    from qlab.clifford import CliffordRouter
+
+    return CliffordRouter("simulator", **options)
+
+
+def _clifford_sampler(**options):
+    from qlab.clifford import CliffordRouter
+
+    return CliffordRouter("sampler", **options)
+
+
+KINDS = {
+    # ``qiskit_aer.primitives.Sampler``, as in the entanglement lessons.
+    "sampler": ExecutorKind(_aer_sampler, _primitive_execute, _primitive_split),
+    # ``qiskit.primitives.Sampler``, as in the quantum circuits lessons.
+    "reference_sampler": ExecutorKind(_reference_sampler, _primitive_execute, _primitive_split),
+    # `qlab.statevector_engine.FastSampler`, for circuits of a few qubits.
+    "fast_sampler": ExecutorKind(_fast_sampler, _primitive_execute, _primitive_split),
+    # ``qiskit_aer.AerSimulator``; results are ``qiskit.result.Result``.
+    "simulator": ExecutorKind(_aer_simulator, _backend_execute, _backend_split),
+    # `qlab.clifford.CliffordRouter`: the stabilizer method for Clifford circuits, the default one otherwise.
+    "clifford_simulator": ExecutorKind(_clifford_simulator, _backend_execute, _backend_split),
+    "clifford_sampler": ExecutorKind(_clifford_sampler, _primitive_execute, _primitive_split),
+}
+
+
+def register_kind(name, factory, execute, split):
+    """Adds a kind of executor usable by `ExecutionContext`.
+
+    See `ExecutorKind` for the three callables.
+    """
+    KINDS[name] = ExecutorKind(factory, execute, split)
+
+
+_Request = namedtuple("_Request", ["circuits", "run_options", "options_key", "future", "submitted"])
+
+_STOP = object()
+
+
+def _options_key(circuits, run_options, future):
+    # Submissions with equal keys are merged. Per-circuit options are concatenated, so only their names count,
+    # unless they are not one entry per circuit: such a submission runs on its own.
+    shared = sorted((name, value) for name, value in run_options.items() if name not in PER_CIRCUIT_OPTIONS)
+    per_circuit = sorted(name for name in run_options if name in PER_CIRCUIT_OPTIONS)
+    for name in per_circuit:
+        values = run_options[name]
+        if not isinstance(values, (list, tuple)) or len(values) != len(circuits) or any(
+            np.isscalar(value) for value in values
+        ):
+            return ("alone", id(future))
+    return repr((shared, per_circuit))
+
+
+class ExecutionContext:
+    """Thread-safe pool of warmed executor instances of one kind."""
+
+    def __init__(self, kind="sampler", pool_size=2, warm=True, max_batch=MAX_BATCH, **instance_options):
+        """
+        Args:
+            kind (str): Key of `KINDS`.
+            pool_size (int): Number of instances, i.e. batches run at once.
+            warm (bool): Build every instance now rather than on first use.
+            max_batch (int): Most submissions merged into one run call.
+            **instance_options: Passed to the kind's factory.
+        Raises:
+            KeyError: If ``kind`` is not registered.
+        """
+        self.kind = kind
+        self._kind = KINDS[kind]
+        self.pool_size = pool_size
+        self.max_batch = max_batch
+        self.instance_options = instance_options
+
+        self._instances = queue.LifoQueue()
+        self._created = 0
+        self._create_lock = threading.Lock()
+        self._slots = threading.Semaphore(pool_size)
+
+        self._pending = queue.Queue()
+        self._workers = ThreadPoolExecutor(pool_size, thread_name_prefix=f"qlab-{kind}")
+        self._dispatcher = threading.Thread(target=self._dispatch, name=f"qlab-{kind}-dispatch", daemon=True)
+        self._closed = False
+        self._submit_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=METRICS_WINDOW)
+        self._jobs = 0
+        self._batches = 0
+        self._batched_jobs = 0
+        self._max_queue_depth = 0
+
+        if warm:
+            for _ in range(pool_size):
+                self._instances.put(self._new_instance())
+        self._dispatcher.start()
+
+    def _new_instance(self):
+        with self._create_lock:
+            self._created += 1
+        return self._kind.factory(**self.instance_options)
+
+    def _take_instance(self):
+        try:
+            return self._instances.get_nowait()
+        except queue.Empty:
+            return self._new_instance()
+
+    @contextmanager
+    def lease(self):
+        """Borrows one instance for direct use.
+
+        The instance is not used by queued submissions while it is leased::
+
+            with context.lease() as sampler:
+                sampler.run(circuit).result()
+        """
+        self._slots.acquire()
+        instance = self._take_instance()
+        try:
+            yield instance
+        finally:
+            self._instances.put(instance)
+            self._slots.release()
+
+    def submit(self, circuits, **run_options):
+        """Queues circuits for execution.
+        Args:
+            circuits (QuantumCircuit or list): Circuits to run.
+            **run_options: Passed to the instance's ``run`` (``shots``...).
+        Returns:
+            concurrent.futures.Future: Resolves to the result of exactly
+                these circuits, as the instance's ``run().result()`` would.
+                Cancelling it before it starts keeps it from running.
+        Raises:
+            RuntimeError: If the context was shut down.
+        """
+        if not isinstance(circuits, (list, tuple)):
+            circuits = [circuits]
+        future = Future()
+        options_key = _options_key(circuits, run_options, future)
+        # Checked and queued under one lock, so a submission racing shutdown never lands after _STOP.
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("execution context is shut down")
+            self._pending.put(_Request(list(circuits), run_options, options_key, future, time.perf_counter()))
+        with self._metrics_lock:
+            self._max_queue_depth = max(self._max_queue_depth, self._pending.qsize())
+        return future
+
+    def run(self, circuits, **run_options):
+        """Runs circuits and waits for the result. See `submit`."""
+        return self.submit(circuits, **run_options).result()
+
+    def _dispatch(self):
+        while True:
+            first = self._pending.get()
+            if first is _STOP:
+                return
+            # Wait for a free instance; whatever queues up meanwhile joins the batch.
+            self._slots.acquire()
+            batch = [first]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stop = True
+                    break
+                batch.append(request)
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.options_key, []).append(request)
+            for i, group in enumerate(groups.values()):
+                if i:
+                    self._slots.acquire()
+                self._workers.submit(self._run_batch, group)
+            if stop:
+                return
+
+    def _run_batch(self, group):
+        # Submissions cancelled while queued are dropped, not run.
+        group = [request for request in group if request.future.set_running_or_notify_cancel()]
+        if not group:
+            self._slots.release()
+            return
+
+        instance = None
+        try:
+            instance = self._take_instance()
+            circuits = list(itertools.chain.from_iterable(request.circuits for request in group))
+            run_options = dict(group[0].run_options)
+            for name in PER_CIRCUIT_OPTIONS:
+                if name in run_options:
+                    run_options[name] = list(itertools.chain.from_iterable(r.run_options[name] for r in group))
+            result = self._kind.execute(instance, circuits, run_options)
+
+            done = time.perf_counter()
+            offset = 0
+            for request in group:
+                part = slice(offset, offset + len(request.circuits))
+                offset = part.stop
+                request.future.set_result(result if len(group) == 1 else self._kind.split(result, part))
+
+            with self._metrics_lock:
+                self._batches += 1
+                self._jobs += len(group)
+                if len(group) > 1:
+                    self._batched_jobs += len(group)
+                self._latencies.extend(done - request.submitted for request in group)
+        except Exception as error:  # hand the failure to every waiter still pending
+            for request in group:
+                if not request.future.done():
+                    request.future.set_exception(error)
+        finally:
+            if instance is not None:
+                self._instances.put(instance)
+            self._slots.release()
+
+    def metrics(self):
+        """Latency and batching statistics.
+        Returns:
+            dict: ``jobs``, ``batches``, ``batched_jobs`` (jobs that shared a
+                run call), ``instances``, ``queue_depth`` (now),
+                ``max_queue_depth`` and latency percentiles in
+                milliseconds over the last ``METRICS_WINDOW`` jobs.
+        """
+        with self._metrics_lock:
+            latencies = np.array(self._latencies) * 1000
+            metrics = {
+                "jobs": self._jobs,
+                "batches": self._batches,
+                "batched_jobs": self._batched_jobs,
+                "instances": self._created,
+                "queue_depth": self._pending.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+            }
+        if len(latencies):
+            metrics["latency_ms_mean"] = float(latencies.mean())
+            metrics["latency_ms_p50"] = float(np.percentile(latencies, 50))
+            metrics["latency_ms_p95"] = float(np.percentile(latencies, 95))
+        return metrics
+
+    def shutdown(self, wait=True):
+        """Stops the dispatcher; queued submissions still complete."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.put(_STOP)
+        if wait:
+            self._dispatcher.join()
+        self._workers.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def get_context(kind="sampler", **instance_options):
+    """Returns the process-wide context for a kind, creating it on first use.
+    Args:
+        kind (str): Key of `KINDS`.
+        **instance_options: Passed to the kind's factory; each distinct set
+            of options gets its own context.
+    Returns:
+        ExecutionContext: The shared context.
+    """
+    key = (kind, repr(sorted(instance_options.items())))
+    with _contexts_lock:
+        context = _contexts.get(key)
+        if context is None:
+            context = _contexts[key] = ExecutionContext(kind, **instance_options)
+        return context
+
+
+def shutdown_all():
+    """Shuts down every shared context."""
+    with _contexts_lock:
+        contexts = list(_contexts.values())
+        _contexts.clear()
+    for context in contexts:
+        context.shutdown()
@@ -0,0 +1,409 @@
+"""Offline stand-in for Qiskit Runtime: service, sessions and a batching Sampler.
+
+``PCH.TestLab/Hello.py`` talks to ``qiskit_ibm_runtime``: a
+``QiskitRuntimeService``, a ``Session`` per block of work, ``Options`` and a
+``Sampler``. This module implements that surface on local Aer simulation,
+so the script runs without an account and the session behavior can be
+load-tested:
+
+* `FakeRuntimeService` hands out backends by name: ``*simulator*`` names
+  are ideal (``simulator_stabilizer`` uses the stabilizer method), anything
+  else is a noisy `DEVICE_QUBITS`-qubit generic device.
+* Every job waits in the backend's queue (`LatencyModel.queue_seconds`,
+  exponentially distributed) and then runs for a modeled time (overhead,
+  per circuit, per shot), never less than the simulation itself. A backend
+  runs one job at a time, across sessions.
+* Inside a `Session` only the first job queues; later jobs start straight
+  away until the session sits idle for ``interactive_timeout``.
+* Each session runs its jobs through an `qlab.execution.ExecutionContext`
+  of kind ``"runtime"`` with a single instance, so ``sampler.run`` calls
+  made while a job is queued or running are coalesced into one execution
+  (per set of run options) and their results split back.
+  `Session.metrics` reports jobs, executions and latencies.
+
+``time_scale`` scales every modeled wait (0 runs as fast as the simulator)::
+
+    from qlab.fake_runtime import FakeRuntimeService, Options, Sampler, Session
+
+    service = FakeRuntimeService(time_scale=0.1)
+    with Session(service=service, backend="ibmq_qasm_simulator") as session:
+        sampler = Sampler(options=Options(optimization_level=1))
+        jobs = [sampler.run(bell) for _ in range(20)]   # a few executions
+        results = [job.result() for job in jobs]
+        print(session.metrics())
+"""
+
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+from types import SimpleNamespace
+
+import numpy as np
+
+from qlab.execution import ExecutionContext, register_kind
+
+# Qubits of the emulated (non-simulator) devices.
+DEVICE_QUBITS = 27
+
+# Backend names listed by `FakeRuntimeService.backends`.
+BACKENDS = ("ibmq_qasm_simulator", "simulator_stabilizer", "ibm_fake_device")
+
+# Seconds a session may sit idle and keep its place on the backend.
+INTERACTIVE_TIMEOUT = 60.0
+
+# Environment variables read for credentials, as ``qiskit_ibm_runtime`` does.
+TOKEN_ENV = "QISKIT_IBM_TOKEN"
+INSTANCE_ENV = "QISKIT_IBM_INSTANCE"
+
+LatencyModel = namedtuple("LatencyModel", ["queue_seconds", "job_overhead", "circuit_seconds", "shot_seconds",
+                                           "jitter"], defaults=(1.0, 0.25, 0.01, 2e-5, 0.1))
+LatencyModel.__doc__ = """Modeled timings of a runtime job, in seconds.
+    Attributes:
+        queue_seconds (float): Mean wait in the backend queue (exponential).
+        job_overhead (float): Fixed cost of an execution.
+        circuit_seconds (float): Cost per circuit.
+        shot_seconds (float): Cost per shot of each circuit.
+        jitter (float): Relative spread of the execution time.
+    """
+
+
+class Options:
+    """Runtime options, as ``qiskit_ibm_runtime.Options`` (version 1).
+    Attributes:
+        optimization_level (int): Transpiler optimization level.
+        resilience_level (int): Accepted for compatibility; not modeled.
+        execution (SimpleNamespace): ``shots``.
+        simulator (SimpleNamespace): ``seed_simulator``.
+    """
+
+    def __init__(self, optimization_level=3, resilience_level=1, execution=None, simulator=None, **_):
+        self.optimization_level = optimization_level
+        self.resilience_level = resilience_level
+        self.execution = SimpleNamespace(**{"shots": 4000, **(execution or {})})
+        self.simulator = SimpleNamespace(**{"seed_simulator": None, **(simulator or {})})
+
+    def __repr__(self):
+        return (f"Options(optimization_level={self.optimization_level}, resilience_level={self.resilience_level}, "
+                f"execution={vars(self.execution)}, simulator={vars(self.simulator)})")
+
+
+class FakeBackend:
+    """A named backend of `FakeRuntimeService`, simulated by Aer.
+    Attributes:
+        name (str): Backend name.
+        service (FakeRuntimeService): Owning service.
+    """
+
+    def __init__(self, name, service):
+        self.name = name
+        self.service = service
+        self._simulator = None
+        self._lock = threading.Lock()
+        # Held while a job executes: the backend runs one job at a time.
+        self.busy = threading.Lock()
+
+    @property
+    def simulator(self):
+        """AerSimulator: The simulator behind the backend, built on first use."""
+        with self._lock:
+            if self._simulator is None:
+                from qiskit_aer import AerSimulator
+
+                if "simulator" not in self.name:
+                    from qiskit.providers.fake_provider import GenericBackendV2
+
+                    device = GenericBackendV2(DEVICE_QUBITS, seed=sum(self.name.encode()))
+                    self._simulator = AerSimulator.from_backend(device)
+                elif "stabilizer" in self.name:
+                    self._simulator = AerSimulator(method="stabilizer")
+                else:
+                    self._simulator = AerSimulator()
+            return self._simulator
+
+    def __repr__(self):
+        return f"<FakeBackend('{self.name}')>"
+
+
+class FakeRuntimeService:
+    """Local ``QiskitRuntimeService``."""
+
+    def __init__(self, channel=None, token=None, instance=None, latency=LatencyModel(), time_scale=1.0, seed=None,
+                 **_):
+        """
+        Args:
+            channel (str): Accepted for compatibility.
+            token (str): Accepted for compatibility; nothing is sent
+                anywhere. Defaults to ``$QISKIT_IBM_TOKEN``.
+            instance (str): Defaults to ``$QISKIT_IBM_INSTANCE``.
+            latency (LatencyModel): Modeled queue and execution times.
+            time_scale (float): Factor applied to every modeled wait.
+            seed (int): Seed of the modeled queue waits and jitter.
+        """
+        self.channel = channel
+        self.instance = instance or os.environ.get(INSTANCE_ENV)
+        self.authenticated = bool(token or os.environ.get(TOKEN_ENV))
+        self.latency = latency
+        self.time_scale = time_scale
+        self._rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def backend(self, name="ibmq_qasm_simulator"):
+        """Returns the backend called ``name``, creating it on first use."""
+        with self._lock:
+            backend = self._backends.get(name)
+            if backend is None:
+                backend = self._backends[name] = FakeBackend(name, self)
+            return backend
+
+    def backends(self, name=None, **_):
+        """list: Backends of `BACKENDS` (and any used since), optionally by name."""
+        names = dict.fromkeys(BACKENDS + tuple(self._backends))
+        return [self.backend(n) for n in names if name is None or n == name]
+
+    def least_busy(self, **_):
+        """Returns a backend that is not executing, the default simulator if all are."""
+        for backend in self.backends():
+            if not backend.busy.locked():
+                return backend
+        return self.backend()
+
+    def _queue_wait(self):
+        with self._rng_lock:
+            return self._rng.exponential(self.latency.queue_seconds) * self.time_scale
+
+    def _execution_time(self, circuits, shots):
+        latency = self.latency
+        seconds = latency.job_overhead + circuits * (latency.circuit_seconds + shots * latency.shot_seconds)
+        with self._rng_lock:
+            seconds *= max(0.0, 1 + latency.jitter * self._rng.standard_normal())
+        return seconds * self.time_scale
+
+
+class _SessionExecutor:
+    # The single "runtime" executor instance of a session.
+
+    def __init__(self, session):
+        self.session = session
+
+    def execute(self, circuits, run_options):
+        from qiskit.primitives import SamplerResult
+        from qiskit.result import QuasiDistribution
+
+        from qlab.transpile_cache import cached_transpile
+
+        session = self.session
+        service = session.service
+        backend = session.backend
+        shots = run_options["shots"]
+
+        queued = 0.0
+        if session._needs_queue():
+            queued = service._queue_wait()
+            time.sleep(queued)
+        with backend.busy:
+            start = time.perf_counter()
+            compiled = [cached_transpile(circuit, backend.simulator, run_options["optimization_level"])
+                        for circuit in circuits]
+            result = backend.simulator.run(compiled, shots=shots, seed_simulator=run_options["seed"]).result()
+            remaining = service._execution_time(len(circuits), shots) - (time.perf_counter() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+            executed = time.perf_counter() - start
+        session._executed(len(circuits), queued, executed)
+
+        quasi_dists = []
+        metadata = []
+        for i in range(len(circuits)):
+            counts = result.data(i).get("counts", {})
+            quasi_dists.append(QuasiDistribution({int(key, 16): value / shots for key, value in counts.items()},
+                                                 shots=shots))
+            metadata.append({"shots": shots, "backend": backend.name, "queue_seconds": queued,
+                             "execution_seconds": executed, "batch_circuits": len(circuits)})
+        return SamplerResult(quasi_dists, metadata)
+
+
+def _runtime_executor(session):
+    return _SessionExecutor(session)
+
+
+def _runtime_execute(instance, circuits, run_options):
+    return instance.execute(circuits, run_options)
+
+
+def _runtime_split(result, part):
+    return type(result)(result.quasi_dists[part], result.metadata[part])
+
+
+register_kind("runtime", _runtime_executor, _runtime_execute, _runtime_split)
+
+_active = threading.local()
+
+
+class Session:
+    """A runtime session: jobs after the first skip the queue and are batched."""
+
+    def __init__(self, service=None, backend=None, max_time=None, interactive_timeout=INTERACTIVE_TIMEOUT):
+        """
+        Args:
+            service (FakeRuntimeService): Defaults to a new service.
+            backend (str or FakeBackend): Backend, by name or object.
+            max_time (float): Seconds after which the session refuses jobs.
+            interactive_timeout (float): Idle seconds after which the next
+                job queues again; 0 makes every job queue.
+        """
+        if isinstance(backend, FakeBackend):
+            service = service or backend.service
+        self.service = service or FakeRuntimeService()
+        self.backend = backend if isinstance(backend, FakeBackend) else self.service.backend(backend or BACKENDS[0])
+        self.session_id = uuid.uuid4().hex
+        self.max_time = max_time
+        self.interactive_timeout = interactive_timeout
+        self._started = time.monotonic()
+        self._last = None
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._circuits = 0
+        self._queued_executions = 0
+        self._queue_seconds = 0.0
+        self._execution_seconds = 0.0
+        self._context = ExecutionContext("runtime", pool_size=1, session=self)
+
+    def _needs_queue(self):
+        with self._lock:
+            return self._last is None or time.monotonic() - self._last > self.interactive_timeout
+
+    def _executed(self, circuits, queued, executed):
+        with self._lock:
+            self._last = time.monotonic()
+            self._executions += 1
+            self._circuits += circuits
+            self._queued_executions += queued > 0
+            self._queue_seconds += queued
+            self._execution_seconds += executed
+
+    def submit(self, circuits, **run_options):
+        """Queues circuits on the session's backend; see
+        `qlab.execution.ExecutionContext.submit`."""
+        if self.max_time is not None and time.monotonic() - self._started > self.max_time:
+            raise RuntimeError(f"session {self.session_id} exceeded max_time ({self.max_time} s)")
+        return self._context.submit(circuits, **run_options)
+
+    def metrics(self):
+        """dict: The execution context's metrics (``jobs``, ``batches``,
+        latencies...) plus ``circuits``, ``queued_executions``,
+        ``queue_seconds`` and ``execution_seconds``."""
+        metrics = self._context.metrics()
+        with self._lock:
+            metrics.update(circuits=self._circuits, queued_executions=self._queued_executions,
+                           queue_seconds=self._queue_seconds, execution_seconds=self._execution_seconds)
+        return metrics
+
+    def close(self, wait=True):
+        """Closes the session; submitted jobs still complete.
+        Args:
+            wait (bool): Wait for them.
+        """
+        self._context.shutdown(wait=wait)
+
+    def __enter__(self):
+        stack = getattr(_active, "sessions", None)
+        if stack is None:
+            stack = _active.sessions = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.sessions.remove(self)
+        self.close()
+
+
+def _current_session():
+    stack = getattr(_active, "sessions", None)
+    return stack[-1] if stack else None
+
+
+_job_ids = itertools.count()
+
+
+class RuntimeJob:
+    """Handle of a submitted sampler job."""
+
+    def __init__(self, future, session):
+        self._future = future
+        self.session = session
+        self._job_id = f"fake-{session.session_id[:8]}-{next(_job_ids)}"
+
+    def job_id(self):
+        """str: Job identifier."""
+        return self._job_id
+
+    def result(self, timeout=None):
+        """Waits for and returns the ``SamplerResult``."""
+        return self._future.result(timeout)
+
+    def status(self):
+        """str: ``"QUEUED"``, ``"RUNNING"``, ``"DONE"``, ``"ERROR"`` or ``"CANCELLED"``."""
+        if self._future.cancelled():
+            return "CANCELLED"
+        if self._future.done():
+            return "ERROR" if self._future.exception() is not None else "DONE"
+        return "RUNNING" if self._future.running() else "QUEUED"
+
+    def done(self):
+        """bool: Whether the job finished."""
+        return self._future.done()
+
+    def cancel(self):
+        """Cancels the job if it has not started."""
+        return self._future.cancel()
+
+
+class Sampler:
+    """Runtime ``Sampler`` (version 1 interface) on a `Session`."""
+
+    def __init__(self, session=None, backend=None, options=None):
+        """
+        Args:
+            session (Session): Defaults to the innermost ``with Session``
+                block. Without one, every job runs in a session of its own
+                on ``backend``, in which it queues, closed when it is done.
+            backend (str or FakeBackend): Backend used without a session.
+            options (Options or dict): Defaults to ``Options()``.
+        """
+        self.session = session or _current_session()
+        self.backend = backend
+        self.options = Options(**options) if isinstance(options, dict) else options or Options()
+
+    def run(self, circuits, parameter_values=None, **kwargs):
+        """Submits circuits.
+        Args:
+            circuits (QuantumCircuit or list): Measured circuits.
+            parameter_values (list): One list of values per circuit.
+            **kwargs: ``shots`` or ``seed_simulator`` overriding the options.
+        Returns:
+            RuntimeJob: The job; its ``result()`` is a ``SamplerResult``.
+        """
+        if not isinstance(circuits, (list, tuple)):
+            circuits = [circuits]
+        if parameter_values is not None:
+            if len(circuits) == 1 and parameter_values and np.ndim(parameter_values[0]) == 0:
+                parameter_values = [parameter_values]
+            circuits = [circuit.assign_parameters(values) if len(values) else circuit
+                        for circuit, values in zip(circuits, parameter_values)]
+        run_options = {
+            "shots": kwargs.get("shots", self.options.execution.shots),
+            "optimization_level": self.options.optimization_level,
+            "seed": kwargs.get("seed_simulator", self.options.simulator.seed_simulator),
+        }
+        if self.session is not None:
+            return RuntimeJob(self.session.submit(list(circuits), **run_options), self.session)
+        session = Session(backend=self.backend, interactive_timeout=0)
+        future = session.submit(list(circuits), **run_options)
+        # Called from the session's own worker thread, so the close must not wait for it.
+        future.add_done_callback(lambda _: session.close(wait=False))
+        return RuntimeJob(future, session)
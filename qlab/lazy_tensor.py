@@ -0,0 +1,289 @@
+"""Lazy tensor products of states and operators.
+
+``zero.tensor(one)`` and ``X.tensor(I)`` build the full ``2**n`` vector or
+``4**n`` matrix at once. `LazyStatevector` and `LazyOperator` keep the
+factors apart instead:
+
+* ``tensor``/``expand`` only concatenate factor lists,
+* ``evolve`` by a local operator touches just the factors under its qubits
+  (merging them if it straddles several), and a `LazyOperator` is applied
+  factor by factor,
+* expectation values of local operators, Paulis, ``SparsePauliOp`` sums and
+  `LazyOperator` products are products of small factor-wise values,
+* ``to_statevector``/``to_operator`` materialize the dense object on demand.
+
+A product of 30 single-qubit states takes a few kilobytes rather than
+16 GiB. Factors are listed in tensor order, as written:
+``LazyStatevector([a, b])`` is ``a.tensor(b)``, so the last factor holds
+qubit 0. All factors must be made of qubits.
+"""
+
+from functools import reduce
+
+import numpy as np
+from qiskit.quantum_info import Operator, Pauli, SparsePauliOp, Statevector
+
+
+def _num_qubits(dim):
+    n = int(dim).bit_length() - 1
+    if 2**n != dim:
+        raise ValueError("lazy tensor factors must be made of qubits")
+    return n
+
+
+def _starts(sizes):
+    # First qubit of each factor; factors are in tensor order, so the last one starts at 0.
+    starts = []
+    qubit = 0
+    for size in reversed(sizes):
+        starts.append(qubit)
+        qubit += size
+    return starts[::-1]
+
+
+def _common_blocks(sizes_a, sizes_b):
+    # Finest partition of the qubits into contiguous blocks that are unions of factors of both lists. Returns
+    # one ``(count_a, count_b)`` pair per block (numbers of factors taken from each list), in tensor order.
+    if sum(sizes_a) != sum(sizes_b):
+        raise ValueError("the two products act on different numbers of qubits")
+    blocks = []
+    i = j = 0
+    while i < len(sizes_a):
+        start_i, start_j = i, j
+        total_a, total_b = sizes_a[i], sizes_b[j]
+        i += 1
+        j += 1
+        while total_a != total_b:
+            if total_a < total_b:
+                total_a += sizes_a[i]
+                i += 1
+            else:
+                total_b += sizes_b[j]
+                j += 1
+        blocks.append((i - start_i, j - start_j))
+    return blocks
+
+
+class LazyStatevector:
+    """Tensor product of statevectors kept as separate factors."""
+
+    def __init__(self, factors):
+        """
+        Args:
+            factors (list): ``Statevector`` objects or arrays, in tensor order.
+        """
+        self.factors = [f if isinstance(f, Statevector) else Statevector(f) for f in factors]
+        if not self.factors:
+            raise ValueError("a lazy statevector needs at least one factor")
+        self._sizes = [_num_qubits(f.dim) for f in self.factors]
+
+    @classmethod
+    def from_label(cls, label):
+        """Product state of single-qubit labels (``"0"``, ``"+"``, ``"r"``...)."""
+        return cls([Statevector.from_label(c) for c in label])
+
+    @property
+    def num_qubits(self):
+        """int: Number of qubits."""
+        return sum(self._sizes)
+
+    @property
+    def nbytes(self):
+        """int: Memory held by the factors' amplitudes."""
+        return sum(f.data.nbytes for f in self.factors)
+
+    def __repr__(self):
+        return f"LazyStatevector({self.num_qubits} qubits, {len(self.factors)} factors)"
+
+    def tensor(self, other):
+        """``self ⊗ other`` without computing it."""
+        other = other if isinstance(other, LazyStatevector) else LazyStatevector([other])
+        return LazyStatevector(self.factors + other.factors)
+
+    def expand(self, other):
+        """``other ⊗ self`` without computing it."""
+        other = other if isinstance(other, LazyStatevector) else LazyStatevector([other])
+        return other.tensor(self)
+
+    def to_statevector(self):
+        """Materializes the dense ``Statevector``."""
+        return reduce(lambda a, b: a.tensor(b), self.factors)
+
+    def _locate(self, qargs):
+        # Merges the factors covering ``qargs`` into one. Returns its index, its first qubit and the new factors.
+        starts = _starts(self._sizes)
+        owners = [i for i, (start, size) in enumerate(zip(starts, self._sizes))
+                  if any(start <= q < start + size for q in qargs)]
+        if any(q < 0 or q >= self.num_qubits for q in qargs):
+            raise ValueError("qargs out of range")
+        first, last = min(owners), max(owners)
+        factors = list(self.factors)
+        if first != last:
+            merged = reduce(lambda a, b: a.tensor(b), factors[first:last + 1])
+            factors[first:last + 1] = [merged]
+        return first, starts[last], factors
+
+    def evolve(self, operator, qargs=None):
+        """Applies an operator, touching only the factors it acts on.
+        Args:
+            operator (Operator, LazyOperator, gate or array): The operator.
+            qargs (list): Qubits it acts on; all qubits when None.
+        Returns:
+            LazyStatevector: The evolved state.
+        """
+        if isinstance(operator, LazyOperator):
+            if qargs is not None:
+                raise ValueError("a LazyOperator acts on every qubit")
+            state = self
+            for start, size, factor in zip(_starts(operator._sizes), operator._sizes, operator.factors):
+                if not operator._is_identity(factor):
+                    state = state.evolve(factor, qargs=list(range(start, start + size)))
+            return state
+
+        operator = operator if isinstance(operator, Operator) else Operator(operator)
+        if qargs is None:
+            qargs = list(range(operator.num_qubits))
+        index, start, factors = self._locate(qargs)
+        factors[index] = factors[index].evolve(operator, qargs=[q - start for q in qargs])
+        return LazyStatevector(factors)
+
+    def _pauli_expectation(self, pauli):
+        value = (-1j) ** pauli.phase
+        for start, size, factor in zip(_starts(self._sizes), self._sizes, self.factors):
+            qubits = list(range(start, start + size))
+            z, x = pauli.z[qubits], pauli.x[qubits]
+            if z.any() or x.any():
+                value *= factor.expectation_value(Pauli((z, x)))
+            else:
+                value *= factor.inner(factor)
+        return value
+
+    def expectation_value(self, oper, qargs=None):
+        """Expectation value, computed factor by factor where possible.
+        Args:
+            oper (Pauli, SparsePauliOp, LazyOperator or Operator): Observable.
+            qargs (list): Qubits a local observable acts on.
+        Returns:
+            complex: The expectation value.
+        """
+        if isinstance(oper, LazyOperator):
+            value = 1.0
+            i = j = 0
+            for count_state, count_oper in _common_blocks(self._sizes, oper._sizes):
+                state = reduce(lambda a, b: a.tensor(b), self.factors[i:i + count_state])
+                local = reduce(lambda a, b: a.tensor(b), oper.factors[j:j + count_oper])
+                if not oper._is_identity(local):
+                    value *= state.expectation_value(local)
+                else:
+                    value *= state.inner(state)
+                i += count_state
+                j += count_oper
+            return value
+
+        if isinstance(oper, str):
+            oper = Pauli(oper)
+        if isinstance(oper, (Pauli, SparsePauliOp)) and qargs is not None:
+            full = SparsePauliOp(oper).apply_layout(list(qargs), self.num_qubits)
+            return self.expectation_value(full)
+        if isinstance(oper, Pauli):
+            return self._pauli_expectation(oper)
+        if isinstance(oper, SparsePauliOp):
+            return sum(coeff * self._pauli_expectation(pauli) for pauli, coeff in zip(oper.paulis, oper.coeffs))
+
+        oper = oper if isinstance(oper, Operator) else Operator(oper)
+        if qargs is None:
+            qargs = list(range(oper.num_qubits))
+        index, start, factors = self._locate(qargs)
+        value = factors[index].expectation_value(oper, qargs=[q - start for q in qargs])
+        for i, factor in enumerate(factors):
+            if i != index:
+                value *= factor.inner(factor)
+        return value
+
+    def probabilities(self, qargs=None):
+        """Outcome probabilities (materializes the measured factors only).
+        Args:
+            qargs (list): Qubits to read; all qubits when None.
+        Returns:
+            numpy.ndarray: Probabilities, little-endian over ``qargs``.
+        """
+        if qargs is None:
+            qargs = list(range(self.num_qubits))
+        index, start, factors = self._locate(qargs)
+        return factors[index].probabilities([q - start for q in qargs])
+
+
+class LazyOperator:
+    """Tensor product of operators kept as separate factors."""
+
+    def __init__(self, factors):
+        """
+        Args:
+            factors (list): ``Operator`` objects, gates or arrays, in tensor
+                order.
+        """
+        self.factors = [f if isinstance(f, Operator) else Operator(f) for f in factors]
+        if not self.factors:
+            raise ValueError("a lazy operator needs at least one factor")
+        self._sizes = []
+        for factor in self.factors:
+            if factor.input_dims() != factor.output_dims():
+                raise ValueError("lazy operator factors must be square")
+            self._sizes.append(factor.num_qubits)
+
+    @classmethod
+    def from_label(cls, label):
+        """Product of single-qubit operator labels (``"XIZ"``, ``"H"``...)."""
+        return cls([Operator.from_label(c) for c in label])
+
+    @property
+    def num_qubits(self):
+        """int: Number of qubits."""
+        return sum(self._sizes)
+
+    @property
+    def nbytes(self):
+        """int: Memory held by the factors' matrices."""
+        return sum(f.data.nbytes for f in self.factors)
+
+    def __repr__(self):
+        return f"LazyOperator({self.num_qubits} qubits, {len(self.factors)} factors)"
+
+    @staticmethod
+    def _is_identity(factor):
+        data = factor.data
+        return np.array_equal(data, np.eye(len(data)))
+
+    def tensor(self, other):
+        """``self ⊗ other`` without computing it."""
+        other = other if isinstance(other, LazyOperator) else LazyOperator([other])
+        return LazyOperator(self.factors + other.factors)
+
+    def expand(self, other):
+        """``other ⊗ self`` without computing it."""
+        other = other if isinstance(other, LazyOperator) else LazyOperator([other])
+        return other.tensor(self)
+
+    def compose(self, other):
+        """``other`` applied after ``self`` (``Operator.compose`` order).
+
+        Factor boundaries that differ between the two are merged first.
+        """
+        other = other if isinstance(other, LazyOperator) else LazyOperator([other])
+        factors = []
+        i = j = 0
+        for count_self, count_other in _common_blocks(self._sizes, other._sizes):
+            mine = reduce(lambda a, b: a.tensor(b), self.factors[i:i + count_self])
+            theirs = reduce(lambda a, b: a.tensor(b), other.factors[j:j + count_other])
+            factors.append(mine.compose(theirs))
+            i += count_self
+            j += count_other
+        return LazyOperator(factors)
+
+    def adjoint(self):
+        """Factor-wise adjoint."""
+        return LazyOperator([f.adjoint() for f in self.factors])
+
+    def to_operator(self):
+        """Materializes the dense ``Operator``."""
+        return reduce(lambda a, b: a.tensor(b), self.factors)
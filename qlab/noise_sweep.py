@@ -0,0 +1,390 @@
+"""Noise sweeps: how the entanglement protocols degrade under noise.
+
+The lessons run teleportation, superdense coding and CHSH on ideal
+simulators only. `NoiseSweep` runs a protocol over a grid of noise
+parameters:
+
+    depolarizing   error probability of every 1-qubit gate (k-qubit gates
+                   get ``k * p``, capped to a valid channel),
+    readout        probability that a measured bit is flipped,
+    t1, t2         thermal relaxation times, in microseconds, applied over
+                   `GATE_TIMES`,
+
+and reduces each grid point's counts to one number with a metric (the
+teleportation fidelity, the CHSH win rate...). Grid points are spread over
+a process pool; each worker transpiles the protocol once. The simulation
+method is chosen by size: density matrices up to `DENSITY_MATRIX_QUBITS`
+qubits, noisy statevector trajectories beyond.
+
+Leading noiseless instructions (``prefix``), e.g. preparing the e-bit, are
+simulated once: the state is cached by the prefix's structural hash and the
+noisy part of every grid point starts from it (Aer ``set_statevector`` /
+``set_density_matrix``)::
+
+    sweep = NoiseSweep(*teleportation_protocol_sweep(), prefix="barrier")
+    curves = sweep.run(depolarizing=np.linspace(0, 0.1, 100))
+    curves.save("teleportation_depolarizing.npz")
+"""
+
+import itertools
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+
+from qlab.counts import CountsArray
+from qlab.transpile_cache import cached_transpile, structural_hash
+
+# Largest circuit simulated with density matrices; wider ones use trajectories.
+DENSITY_MATRIX_QUBITS = 10
+
+# Shots per grid point.
+SHOTS = 1024
+
+# Gate durations in microseconds, for thermal relaxation; 3 stands for every gate on 3 or more qubits (a Toffoli is
+# about six CX deep).
+GATE_TIMES = {1: 0.05, 2: 0.3, 3: 1.8, "measure": 1.0}
+
+# Noise parameters a grid can sweep, with their noiseless values.
+NOISE_PARAMETERS = {"depolarizing": 0.0, "readout": 0.0, "t1": np.inf, "t2": np.inf}
+
+# States of noiseless prefixes, by structural hash of the prefix.
+_prefix_states = {}
+
+
+class SweepCurves(namedtuple("SweepCurves", ["axes", "values", "method", "shots", "seconds"])):
+    """Outcome of `NoiseSweep.run`.
+    Attributes:
+        axes (dict): Swept parameter name -> 1-D array of its values, in
+            grid order.
+        values (numpy.ndarray): Metric at every grid point, one dimension
+            per axis.
+        method (str): Aer simulation method used.
+        shots (int): Shots per grid point.
+        seconds (float): Wall time of the sweep.
+    """
+
+    __slots__ = ()
+
+    def save(self, path):
+        """Writes the curves to a ``.npz`` file: ``values``, ``method``,
+        ``shots`` and one ``axis_<name>`` array per axis."""
+        np.savez(path, values=self.values, method=self.method, shots=self.shots,
+                 **{f"axis_{name}": values for name, values in self.axes.items()})
+
+
+def noise_model(depolarizing=0.0, readout=0.0, t1=np.inf, t2=np.inf, gates_1q=("u", "h", "x", "z"),
+                gates_2q=("cx",), gates_wide=None):
+    """Builds the Aer noise model of one grid point.
+    Args:
+        depolarizing (float): 1-qubit depolarizing probability; k-qubit
+            gates get k times as much (at most ``1 - 4**-k``).
+        readout (float): Symmetric readout flip probability.
+        t1 (float): Relaxation time in microseconds.
+        t2 (float): Dephasing time in microseconds; at most ``2 * t1``.
+        gates_1q (list): Names of the 1-qubit gates to make noisy.
+        gates_2q (list): Names of the 2-qubit gates to make noisy.
+        gates_wide (dict): Number of qubits (3 or more) -> names of the
+            gates of that size to make noisy, e.g. ``{3: ["ccx"]}``.
+    Returns:
+        NoiseModel: The model, or None when every parameter is noiseless.
+    """
+    from qiskit_aer.noise import NoiseModel, ReadoutError, depolarizing_error, thermal_relaxation_error
+
+    thermal = np.isfinite(t1) or np.isfinite(t2)
+    if not (depolarizing or readout or thermal):
+        return None
+    t1 = float(t1)
+    t2 = float(min(t2, 2 * t1))
+
+    model = NoiseModel()
+    for num_qubits, gates in ((1, gates_1q), (2, gates_2q), *sorted((gates_wide or {}).items())):
+        if not gates:
+            continue
+        error = None
+        if depolarizing:
+            error = depolarizing_error(min(depolarizing * num_qubits, 1 - 4.0**-num_qubits), num_qubits)
+        if thermal:
+            single = thermal_relaxation_error(t1, t2, GATE_TIMES[min(num_qubits, 3)])
+            relaxation = single
+            for _ in range(num_qubits - 1):
+                relaxation = relaxation.expand(single)
+            error = relaxation if error is None else error.compose(relaxation)
+        if error is not None:
+            model.add_all_qubit_quantum_error(error, list(gates))
+    if thermal:
+        model.add_all_qubit_quantum_error(thermal_relaxation_error(t1, t2, GATE_TIMES["measure"]), ["measure"])
+    if readout:
+        model.add_all_qubit_readout_error(ReadoutError([[1 - readout, readout], [readout, 1 - readout]]))
+    return model
+
+
+def _gate_names(circuit, names=None):
+    # Gate names by number of qubits, control-flow blocks included.
+    names = names if names is not None else {1: set(), 2: set()}
+    for instruction in circuit.data:
+        operation = instruction.operation
+        for block in getattr(operation, "blocks", ()):
+            _gate_names(block, names)
+        if getattr(operation, "blocks", None) or not instruction.qubits or instruction.clbits:
+            continue
+        if operation.name in ("barrier", "measure", "reset") or operation.name.startswith(("save_", "set_")):
+            continue
+        names.setdefault(len(instruction.qubits), set()).add(operation.name)
+    return names
+
+
+def _split_prefix(circuit, prefix):
+    # Number of leading instructions simulated without noise.
+    if prefix is None:
+        return 0
+    if prefix == "barrier":
+        for i, instruction in enumerate(circuit.data):
+            if instruction.operation.name == "barrier":
+                return i
+        return 0
+    return int(prefix)
+
+
+def prefix_state(circuit, length):
+    """The state after the first ``length`` instructions, cached.
+    Args:
+        circuit (QuantumCircuit): Protocol circuit.
+        length (int): Leading instructions to simulate; they must be
+            unitary (no measurement, reset or control flow).
+    Returns:
+        numpy.ndarray: Statevector of all the circuit's qubits.
+    """
+    prefix = QuantumCircuit(*circuit.qregs)
+    for instruction in circuit.data[:length]:
+        if instruction.clbits or getattr(instruction.operation, "blocks", None):
+            raise ValueError(f"noiseless prefix contains '{instruction.operation.name}'")
+        prefix.append(instruction.operation, instruction.qubits)
+    key = structural_hash(prefix)
+    state = _prefix_states.get(key)
+    if state is None:
+        state = _prefix_states[key] = Statevector(prefix).data
+    return state
+
+
+def _with_initial_state(circuit, length, state, method):
+    # The circuit without its prefix, starting from a saved state instead.
+    from qiskit_aer.library import SetDensityMatrix, SetStatevector
+
+    suffix = circuit.copy_empty_like()
+    if method == "density_matrix":
+        suffix.append(SetDensityMatrix(np.outer(state, state.conj())), suffix.qubits)
+    else:
+        suffix.append(SetStatevector(state), suffix.qubits)
+    for instruction in circuit.data[length:]:
+        suffix.append(instruction)
+    return suffix
+
+
+class _Worker:
+    # Transpiled circuits and gate names, reused for every grid point.
+
+    def __init__(self, circuits, method, shots, seed):
+        from qiskit_aer import AerSimulator
+
+        self.simulator = AerSimulator(method=method, max_parallel_threads=1)
+        self.circuits = [cached_transpile(circuit, self.simulator) for circuit in circuits]
+        names = {1: set(), 2: set()}
+        for circuit in self.circuits:
+            _gate_names(circuit, names)
+        self.gates = (sorted(names[1]), sorted(names[2]), {k: sorted(v) for k, v in names.items() if k > 2})
+        self.method = method
+        self.shots = shots
+        self.seed = seed
+
+    def __call__(self, point):
+        index, parameters = point
+        model = noise_model(**parameters, gates_1q=self.gates[0], gates_2q=self.gates[1], gates_wide=self.gates[2])
+        seed = None if self.seed is None else self.seed + index
+        result = self.simulator.run(self.circuits, shots=self.shots, noise_model=model, seed_simulator=seed).result()
+        return [CountsArray.from_result(result, i) for i in range(len(self.circuits))]
+
+
+_worker = None
+
+
+def _init_worker(circuits, method, shots, seed):
+    global _worker
+    _worker = _Worker(circuits, method, shots, seed)
+
+
+def _run_point(point):
+    return _worker(point)
+
+
+class NoiseSweep:
+    """Runs a protocol over a grid of noise parameters.
+
+    Use it as a context manager so the worker pool is shut down.
+    """
+
+    def __init__(self, circuits, metric, prefix=None, method="auto", shots=SHOTS, max_workers=None, seed=None):
+        """
+        Args:
+            circuits (QuantumCircuit or list): Bound protocol circuit(s), all
+                run at every grid point.
+            metric (callable): Takes the list of `CountsArray` (one per
+                circuit) of a grid point and returns a float.
+            prefix (int or str): Leading instructions of every circuit to
+                simulate without noise, or ``"barrier"`` for everything
+                before the first barrier. None keeps every instruction noisy.
+            method (str): ``"density_matrix"``, ``"statevector"``
+                (trajectories) or ``"auto"`` (by qubit count).
+            shots (int): Shots per grid point.
+            max_workers (int): Worker processes; defaults to the CPU count.
+                With 1 everything runs in this process.
+            seed (int): Seeds the simulator; grid point ``i`` uses
+                ``seed + i``.
+        """
+        circuits = [circuits] if isinstance(circuits, QuantumCircuit) else list(circuits)
+        if method == "auto":
+            width = max(circuit.num_qubits for circuit in circuits)
+            method = "density_matrix" if width <= DENSITY_MATRIX_QUBITS else "statevector"
+        self.method = method
+        self.metric = metric
+        self.shots = shots
+        self.seed = seed
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        self.circuits = []
+        for circuit in circuits:
+            length = _split_prefix(circuit, prefix)
+            if length:
+                circuit = _with_initial_state(circuit, length, prefix_state(circuit, length), method)
+            self.circuits.append(circuit)
+        self._pool = None
+        self._local = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shuts the worker pool down."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _counts(self, points):
+        args = (self.circuits, self.method, self.shots, self.seed)
+        if self.max_workers == 1 or len(points) == 1:
+            if self._local is None:
+                self._local = _Worker(*args)
+            return [self._local(point) for point in points]
+        if self._pool is None:
+            # Forked workers inherit Aer's thread state and hang once this process has run Aer; spawn them.
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=args)
+        return list(self._pool.map(_run_point, points))
+
+    def run(self, **grid):
+        """Evaluates the metric on every combination of the given values.
+        Args:
+            **grid: Parameter name (see `NOISE_PARAMETERS`) -> values.
+                Parameters left out keep their noiseless value.
+        Returns:
+            SweepCurves: Metric values shaped by the grid.
+        """
+        unknown = set(grid) - set(NOISE_PARAMETERS)
+        if unknown:
+            raise ValueError(f"unknown noise parameters {sorted(unknown)}; expected {sorted(NOISE_PARAMETERS)}")
+        start = time.perf_counter()
+        axes = {name: np.atleast_1d(np.asarray(values, dtype=float)) for name, values in grid.items()}
+        names = list(axes)
+        points = [(i, dict(zip(names, combination))) for i, combination in
+                  enumerate(itertools.product(*axes.values()))]
+        values = np.array([self.metric(counts) for counts in self._counts(points)])
+        shape = tuple(len(axis) for axis in axes.values())
+        return SweepCurves(axes, values.reshape(shape), self.method, self.shots, time.perf_counter() - start)
+
+
+# -- protocols ---------------------------------------------------------------------------------------------------
+
+
+def bit_probability(register, value=0):
+    """Metric: probability that a register of the first circuit reads
+    ``value``, e.g. ``bit_probability("Result")`` for teleportation."""
+
+    def metric(counts):
+        marginal = counts[0][register]
+        return float(marginal.get(value) / marginal.shots)
+
+    return metric
+
+
+def teleportation_protocol_sweep(theta=1.0, phi=0.5, lam=0.25):
+    """The random-gate teleportation test, for `NoiseSweep`.
+    Args:
+        theta (float): ``U`` angle.
+        phi (float): ``U`` angle.
+        lam (float): ``U`` angle.
+    Returns:
+        tuple: ``(circuits, metric)``; the metric is the fidelity, the
+            probability that ``Result`` reads 0.
+    """
+    from qlab.teleportation import teleportation_test_template
+
+    template = teleportation_test_template()
+    values = {"theta": theta, "phi": phi, "lam": lam}
+    circuit = template.assign_parameters({p: values[p.name] for p in template.parameters})
+    return [circuit], bit_probability("Result")
+
+
+def chsh_protocol_sweep():
+    """The four CHSH circuits, for `NoiseSweep`.
+    Returns:
+        tuple: ``(circuits, metric)``; the metric is the win rate against a
+            uniform referee.
+    """
+    from qlab.chsh import QUESTIONS, WIN_TABLE, chsh_circuit
+
+    def win_rate(counts):
+        rates = []
+        for q, answers in enumerate(counts):
+            wins = sum(answers.get(o) for o in np.flatnonzero(WIN_TABLE[q]))
+            rates.append(wins / answers.shots)
+        return float(np.mean(rates))
+
+    return [chsh_circuit(x, y) for x, y in QUESTIONS], win_rate
+
+
+def superdense_protocol_sweep():
+    """Superdense coding of the four 2-bit messages, for `NoiseSweep`.
+    Returns:
+        tuple: ``(circuits, metric)``; the metric is the fraction of
+            messages decoded correctly.
+    """
+    circuits = []
+    for c in (0, 1):
+        for d in (0, 1):
+            qc = QuantumCircuit(2, 2)
+            qc.h(0)
+            qc.cx(0, 1)
+            qc.barrier()
+            if d:
+                qc.z(0)
+            if c:
+                qc.x(0)
+            qc.barrier()
+            qc.cx(0, 1)
+            qc.h(0)
+            # Bob reads d on clbit 0 and c on clbit 1: outcome 2c + d.
+            qc.measure([0, 1], [0, 1])
+            circuits.append(qc)
+
+    def success(counts):
+        return float(np.mean([answers.get(symbol) / answers.shots for symbol, answers in enumerate(counts)]))
+
+    return circuits, success
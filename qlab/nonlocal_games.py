@@ -0,0 +1,248 @@
+"""Exact win probabilities for nonlocal games.
+
+``chsh_game`` in the lesson estimates a win rate by playing random rounds.
+For a finite game the win probability is a finite sum:
+
+    P(win) = sum_{x,y,a,b} p(x, y) V(x, y, a, b) P(a, b | x, y)
+
+where ``p`` is the referee's question distribution, ``V`` the predicate
+table (1 when the answers win) and ``P(a, b | x, y)`` the strategy's answer
+distribution. For quantum strategies the latter are Born probabilities, so
+everything here is computed from statevectors, without sampling.
+
+Answers are integers. When they come from measuring qubits, an answer is
+the measured register read as an integer (qubit 0 of the player is bit 0).
+"""
+
+import itertools
+
+import numpy as np
+from qiskit.quantum_info import Operator, Statevector
+
+
+class NonlocalGame:
+    """A two-player nonlocal game.
+    Attributes:
+        question_probabilities (numpy.ndarray): ``p[x, y]``, sums to 1.
+        predicate (numpy.ndarray): ``V[x, y, a, b]``, 1.0 for a win.
+    """
+
+    def __init__(self, question_probabilities, predicate):
+        """
+        Args:
+            question_probabilities (array_like): ``(nx, ny)`` referee
+                distribution.
+            predicate (array_like): ``(nx, ny, na, nb)`` win table.
+        Raises:
+            ValueError: If the shapes do not match or ``p`` is not a
+                distribution.
+        """
+        self.question_probabilities = np.asarray(question_probabilities, dtype=float)
+        self.predicate = np.asarray(predicate, dtype=float)
+        if self.predicate.ndim != 4 or self.predicate.shape[:2] != self.question_probabilities.shape:
+            raise ValueError("predicate must have shape (nx, ny, na, nb) matching the questions")
+        if not np.isclose(self.question_probabilities.sum(), 1):
+            raise ValueError("question probabilities must sum to 1")
+
+    @classmethod
+    def from_rule(cls, rule, num_questions=(2, 2), num_answers=(2, 2), question_probabilities=None):
+        """Builds a game from a Python predicate.
+        Args:
+            rule (callable): Takes ``(x, y, a, b)`` and returns True when
+                Alice and Bob win.
+            num_questions (tuple): ``(nx, ny)``.
+            num_answers (tuple): ``(na, nb)``.
+            question_probabilities (array_like): Defaults to uniform.
+        Returns:
+            NonlocalGame: The tabulated game.
+        """
+        nx, ny = num_questions
+        na, nb = num_answers
+        if question_probabilities is None:
+            question_probabilities = np.full((nx, ny), 1 / (nx * ny))
+        predicate = np.zeros((nx, ny, na, nb))
+        for x, y, a, b in itertools.product(range(nx), range(ny), range(na), range(nb)):
+            predicate[x, y, a, b] = bool(rule(x, y, a, b))
+        return cls(question_probabilities, predicate)
+
+    @property
+    def num_questions(self):
+        """tuple: ``(nx, ny)``."""
+        return self.predicate.shape[:2]
+
+    @property
+    def num_answers(self):
+        """tuple: ``(na, nb)``."""
+        return self.predicate.shape[2:]
+
+    def win_probability(self, answer_probabilities):
+        """Scores an answer distribution.
+        Args:
+            answer_probabilities (numpy.ndarray): ``P[x, y, a, b]``.
+        Returns:
+            float: Probability of winning.
+        """
+        return float(np.einsum("xy,xyab,xyab->", self.question_probabilities, self.predicate, answer_probabilities))
+
+
+CHSH_GAME = NonlocalGame.from_rule(lambda x, y, a, b: (a != b) == (x & y))
+
+
+def _unitaries(measurements):
+    # Accepts Operators, circuits or raw matrices; returns an (n, d, d) stack.
+    # A ready-made stack is used as is, which keeps sweeps cheap.
+    if isinstance(measurements, np.ndarray) and measurements.ndim == 3:
+        return measurements
+    return np.stack([Operator(m).data for m in measurements])
+
+
+def _amplitudes(state):
+    if isinstance(state, np.ndarray):
+        return state
+    return np.asarray(Statevector(state).data)
+
+
+def quantum_answer_probabilities(state, alice, bob):
+    """Born probabilities of a measurement strategy on a shared state.
+
+    Alice owns the low qubits of ``state`` and Bob the high ones. On question
+    ``x`` Alice applies ``alice[x]`` to her qubits and measures them in the
+    standard basis; Bob does the same with ``bob[y]``.
+
+    Args:
+        state (Statevector or array_like): Shared state.
+        alice (sequence): Unitaries (``Operator``, ``QuantumCircuit`` or
+            matrix) indexed by Alice's question, or an ``(nx, d, d)`` array.
+        bob (sequence): Unitaries indexed by Bob's question, same forms.
+    Returns:
+        numpy.ndarray: ``P[x, y, a, b]``.
+    """
+    alice = _unitaries(alice)
+    bob = _unitaries(bob)
+    psi = _amplitudes(state)
+    dim_a, dim_b = alice.shape[1], bob.shape[1]
+    if psi.size != dim_a * dim_b:
+        raise ValueError("state dimension does not match Alice's and Bob's measurements")
+
+    # Little-endian layout: index = b * dim_a + a, so psi[b, a].
+    amplitudes = np.einsum("ybj,ji,xai->xyab", bob, psi.reshape(dim_b, dim_a), alice)
+    return np.abs(amplitudes) ** 2
+
+
+def circuit_answer_probabilities(circuit_factory, num_questions=(2, 2), alice_clbits=(0,), bob_clbits=(1,)):
+    """Born probabilities of a family of measurement circuits.
+
+    Works with any factory shaped like ``chsh_circuit``: it takes ``(x, y)``
+    and returns a circuit whose final measurements write Alice's answer to
+    ``alice_clbits`` and Bob's to ``bob_clbits``.
+
+    Args:
+        circuit_factory (callable): Takes ``(x, y)`` and returns a
+            `QuantumCircuit` ending in measurements.
+        num_questions (tuple): ``(nx, ny)``.
+        alice_clbits (sequence): Clbit indices of Alice's answer, low bit
+            first.
+        bob_clbits (sequence): Clbit indices of Bob's answer, low bit first.
+    Returns:
+        numpy.ndarray: ``P[x, y, a, b]``.
+    """
+    nx, ny = num_questions
+    na, nb = 2 ** len(alice_clbits), 2 ** len(bob_clbits)
+    probabilities = np.zeros((nx, ny, na, nb))
+    for x, y in itertools.product(range(nx), range(ny)):
+        circuit = circuit_factory(x, y)
+
+        # Which qubit feeds each clbit.
+        measured = {}
+        for instruction in circuit.data:
+            if instruction.operation.name == "measure":
+                clbit = circuit.find_bit(instruction.clbits[0]).index
+                measured[clbit] = circuit.find_bit(instruction.qubits[0]).index
+        qargs = [measured[c] for c in alice_clbits] + [measured[c] for c in bob_clbits]
+
+        state = Statevector(circuit.remove_final_measurements(inplace=False))
+        # Bits of the outcome index follow ``qargs``: Alice's low, Bob's high.
+        probabilities[x, y] = state.probabilities(qargs).reshape(nb, na).T
+    return probabilities
+
+
+def deterministic_answers(strategy, num_questions=(2, 2)):
+    """Tabulates a deterministic classical strategy.
+    Args:
+        strategy (callable): Takes ``(x, y)`` and returns ``(a, b)``; answers
+            may be `int` or digit strings.
+        num_questions (tuple): ``(nx, ny)``.
+    Returns:
+        numpy.ndarray: ``(nx, ny, 2)`` integer answers.
+    """
+    nx, ny = num_questions
+    answers = np.zeros((nx, ny, 2), dtype=np.int64)
+    for x, y in itertools.product(range(nx), range(ny)):
+        a, b = strategy(x, y)
+        answers[x, y] = int(a), int(b)
+    return answers
+
+
+def classical_win_probability(game, strategy):
+    """Exact win probability of a deterministic classical strategy.
+    Args:
+        game (NonlocalGame): The game.
+        strategy (callable): Takes ``(x, y)`` and returns ``(a, b)``.
+    Returns:
+        float: Probability of winning.
+    """
+    nx, ny = game.num_questions
+    answers = deterministic_answers(strategy, game.num_questions)
+    x, y = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+    wins = game.predicate[x, y, answers[..., 0], answers[..., 1]]
+    return float((game.question_probabilities * wins).sum())
+
+
+def quantum_win_probability(game, state, alice, bob):
+    """Exact win probability of a measurement strategy on a shared state.
+
+    See `quantum_answer_probabilities` for the arguments.
+
+    Returns:
+        float: Probability of winning.
+    """
+    return game.win_probability(quantum_answer_probabilities(state, alice, bob))
+
+
+def circuit_win_probability(game, circuit_factory, alice_clbits=(0,), bob_clbits=(1,)):
+    """Exact win probability of a family of measurement circuits.
+
+    See `circuit_answer_probabilities` for the arguments.
+
+    Returns:
+        float: Probability of winning.
+    """
+    probabilities = circuit_answer_probabilities(circuit_factory, game.num_questions, alice_clbits, bob_clbits)
+    return game.win_probability(probabilities)
+
+
+def best_classical_strategy(game):
+    """Finds the best deterministic classical strategy by enumeration.
+
+    Every pair of functions ``x -> a`` and ``y -> b`` is scored at once, so
+    this is practical while ``na ** nx * nb ** ny`` stays in the millions.
+
+    Args:
+        game (NonlocalGame): The game.
+    Returns:
+        tuple: ``(win probability, alice answers, bob answers)`` where the
+            answers are indexed by question.
+    """
+    nx, ny = game.num_questions
+    na, nb = game.num_answers
+    alice = np.array(list(itertools.product(range(na), repeat=nx)))
+    bob = np.array(list(itertools.product(range(nb), repeat=ny)))
+
+    # values[i, j] is the win probability of Alice's i-th and Bob's j-th
+    # strategy, accumulated one question pair at a time.
+    values = np.zeros((len(alice), len(bob)))
+    for x, y in itertools.product(range(nx), range(ny)):
+        weights = game.question_probabilities[x, y] * game.predicate[x, y]
+        values += weights[alice[:, x][:, None], bob[:, y][None, :]]
+    i, j = np.unravel_index(np.argmax(values), values.shape)
+    return float(values[i, j]), tuple(alice[i].tolist()), tuple(bob[j].tolist())
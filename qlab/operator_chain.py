@@ -0,0 +1,134 @@
+"""Fused operator chains applied to batches of states.
+
+``v = v.evolve(H); v = v.evolve(T); ...`` builds a ``Statevector`` per step
+and validates every operator again. An `OperatorChain` collects the
+operators, fuses them into one matrix (cached per sequence of operators)
+and applies that matrix to a whole batch of states, stored as the rows of a
+2-D array, with one matrix multiply::
+
+    chain = OperatorChain([H, T, H, T, Z])
+    v = chain.evolve(Statevector([1, 0]))        # same as the five evolves
+    out = chain.apply(states)                    # states: (batch, 2) array
+"""
+
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+from qiskit.quantum_info import Operator, Statevector
+
+# Fused chains kept by `fuse`.
+CACHE_SIZE = 256
+
+_fused = OrderedDict()
+
+
+def as_matrix(operator):
+    """Dense matrix of an ``Operator``, gate, circuit or array."""
+    if isinstance(operator, Operator):
+        return operator.data
+    if isinstance(operator, np.ndarray):
+        return operator
+    return Operator(operator).data
+
+
+def _fingerprint(matrix):
+    return matrix.shape, matrix.dtype.str, matrix.tobytes()
+
+
+def fuse(operators):
+    """Product of a sequence of operators, in order of application.
+
+    ``fuse([A, B, C])`` is ``C @ B @ A``, the operator of
+    ``v.evolve(A).evolve(B).evolve(C)``. Results are cached by the
+    operators' contents.
+
+    Args:
+        operators (list): Operators, gates or square arrays of one size.
+    Returns:
+        numpy.ndarray: The fused matrix (do not modify it, it is shared).
+    Raises:
+        ValueError: If the chain is empty or the sizes differ.
+    """
+    matrices = [np.asarray(as_matrix(op), dtype=complex) for op in operators]
+    if not matrices:
+        raise ValueError("cannot fuse an empty chain")
+    dim = matrices[0].shape[0]
+    if any(m.shape != (dim, dim) for m in matrices):
+        raise ValueError("operators in a chain must be square and of the same size")
+
+    key = tuple(_fingerprint(m) for m in matrices)
+    matrix = _fused.get(key)
+    if matrix is not None:
+        _fused.move_to_end(key)
+        return matrix
+    # A one-operator chain would otherwise return (and freeze) the caller's own array.
+    matrix = reduce(lambda product, m: m @ product, matrices[1:], np.array(matrices[0], copy=True))
+    matrix.flags.writeable = False
+    _fused[key] = matrix
+    if len(_fused) > CACHE_SIZE:
+        _fused.popitem(last=False)
+    return matrix
+
+
+def clear_cache():
+    """Drops every fused chain."""
+    _fused.clear()
+
+
+class OperatorChain:
+    """A sequence of operators applied as one fused matrix."""
+
+    def __init__(self, operators=()):
+        """
+        Args:
+            operators (iterable): Operators in order of application.
+        """
+        self.operators = list(operators)
+        self._matrix = None
+
+    def append(self, operator):
+        """Adds an operator at the end of the chain.
+        Returns:
+            OperatorChain: The chain itself, so calls can be chained.
+        """
+        self.operators.append(operator)
+        self._matrix = None
+        return self
+
+    def __len__(self):
+        return len(self.operators)
+
+    @property
+    def matrix(self):
+        """numpy.ndarray: The fused matrix of the chain."""
+        if self._matrix is None:
+            self._matrix = fuse(self.operators)
+        return self._matrix
+
+    def to_operator(self):
+        """The fused chain as an ``Operator``."""
+        return Operator(self.matrix)
+
+    def apply(self, states):
+        """Applies the chain to a batch of states.
+        Args:
+            states (numpy.ndarray): One state per row, ``(batch, dim)``, or a
+                single state of shape ``(dim,)``.
+        Returns:
+            numpy.ndarray: The evolved states, same shape as ``states``.
+        """
+        states = np.asarray(states)
+        # Rows are states: (M @ s) for every row s is S @ M^T.
+        return states @ self.matrix.T
+
+    def evolve(self, state):
+        """Applies the chain to one state, like successive ``evolve`` calls.
+        Args:
+            state (Statevector or array_like): Input state.
+        Returns:
+            Statevector: The evolved state.
+        """
+        if isinstance(state, Statevector):
+            return Statevector(self.apply(state.data), dims=state.dims())
+        return Statevector(self.apply(state))
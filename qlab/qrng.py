@@ -0,0 +1,289 @@
+"""Quantum random number generator with a prefetching ring buffer.
+
+``RandomNumberGenerator.py`` got one bit per ``execute`` call on a 1-qubit
+circuit. Here each job runs a wide Hadamard circuit (``num_qubits`` qubits,
+``shots`` shots), so a job yields ``num_qubits * shots / 8`` bytes, taken
+straight from the sampler's packed bit array. A background thread keeps a
+ring buffer full, so `QuantumRandom.read`, `QuantumRandom.randint` and
+`QuantumRandom.random` are served from memory.
+
+`self_test` runs the NIST SP 800-22 frequency (monobit) and runs tests on
+a sample of the output.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+from qiskit import QuantumCircuit
+
+# Defaults: 32 random bits per shot, 8192 shots (32 KiB) per job, 1 MiB buffer.
+NUM_QUBITS = 32
+SHOTS = 8192
+BUFFER_SIZE = 2**20
+
+# Significance level of the self-test.
+ALPHA = 0.01
+
+
+def hadamard_circuit(num_qubits):
+    """Builds the wide Hadamard circuit.
+    Args:
+        num_qubits (int): Random bits per shot.
+    Returns:
+        QuantumCircuit: ``H`` on every qubit, then ``measure_all``.
+    """
+    qc = QuantumCircuit(num_qubits)
+    qc.h(range(num_qubits))
+    qc.measure_all()
+    return qc
+
+
+class QuantumRandom:
+    """Buffered source of quantum random bytes.
+
+    Use it as a context manager so the prefetch thread stops::
+
+        with QuantumRandom() as qrng:
+            qrng.read(16)
+            qrng.randint(1, 7, size=10)
+    """
+
+    def __init__(self, num_qubits=NUM_QUBITS, shots=SHOTS, buffer_size=BUFFER_SIZE, prefetch=True, seed=None,
+                 sampler=None, store=None):
+        """
+        Args:
+            num_qubits (int): Width of the Hadamard circuit; a multiple of 8
+                so every byte of the packed output is random.
+            shots (int): Shots per job.
+            buffer_size (int): Ring buffer capacity in bytes; at least one
+                job's worth.
+            prefetch (bool): Refill the buffer from a background thread.
+                Without it, reads run jobs when the buffer runs dry.
+            seed (int): Seeds the simulator (job ``k`` uses ``seed + k``)
+                for reproducible output. Leave None for fresh randomness.
+                Runs on Aer ``SamplerV2`` instances, so it cannot be
+                combined with ``sampler``.
+            sampler (BaseSamplerV2): Sampler to run the jobs on. Defaults to
+                an Aer ``SamplerV2``.
+            store (ResultStore): Archives every job's shots (see
+                `qlab.result_store`); outcomes are stored as 64-bit
+                integers, so ``num_qubits`` is at most 64.
+        Raises:
+            ValueError: If the sizes are inconsistent, or both ``seed`` and
+                ``sampler`` are given.
+        """
+        if num_qubits % 8:
+            raise ValueError("num_qubits must be a multiple of 8")
+        if seed is not None and sampler is not None:
+            raise ValueError("seed cannot be applied to a given sampler; seed that sampler instead")
+        if store is not None and num_qubits > 64:
+            raise ValueError("a store keeps outcomes of at most 64 bits; use num_qubits <= 64")
+        self.num_qubits = num_qubits
+        self.shots = shots
+        self.bytes_per_job = num_qubits // 8 * shots
+        if buffer_size < self.bytes_per_job:
+            raise ValueError("buffer_size must hold at least one job")
+
+        self.circuit = hadamard_circuit(num_qubits)
+        self.seed = seed
+        self.jobs = 0
+        self._sampler = sampler
+        self.store = store
+
+        self._buffer = np.empty(buffer_size, dtype=np.uint8)
+        self._start = 0
+        self._size = 0
+        self._condition = threading.Condition()
+        self._error = None
+        self._closed = False
+        self._thread = None
+        if prefetch:
+            self._thread = threading.Thread(target=self._prefetch, name="qlab-qrng", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the prefetch thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def available(self):
+        """int: Bytes ready in the buffer."""
+        with self._condition:
+            return self._size
+
+    def _run_job(self):
+        sampler = self._sampler
+        seed = None
+        if sampler is None:
+            from qiskit_aer.primitives import SamplerV2
+
+            seed = None if self.seed is None else self.seed + self.jobs
+            sampler = SamplerV2(default_shots=self.shots, seed=seed)
+            if self.seed is None:
+                self._sampler = sampler
+        start = time.perf_counter()
+        result = sampler.run([self.circuit], shots=self.shots).result()
+        self.jobs += 1
+        meas = result[0].data.meas
+        if self.store is not None:
+            self.store.append(samples=meas, circuit=self.circuit, seed=seed, backend=sampler,
+                              timings={"run": time.perf_counter() - start}, job=self.jobs - 1)
+        # Packed (shots, num_qubits / 8) uint8, every bit random.
+        return meas.array.ravel()
+
+    def _push(self, data):
+        # Caller holds the condition and has checked the space.
+        capacity = len(self._buffer)
+        end = (self._start + self._size) % capacity
+        first = min(len(data), capacity - end)
+        self._buffer[end:end + first] = data[:first]
+        self._buffer[:len(data) - first] = data[first:]
+        self._size += len(data)
+
+    def _pop(self, n):
+        capacity = len(self._buffer)
+        first = min(n, capacity - self._start)
+        out = np.concatenate([self._buffer[self._start:self._start + first], self._buffer[:n - first]])
+        self._start = (self._start + n) % capacity
+        self._size -= n
+        return out
+
+    def _prefetch(self):
+        while True:
+            with self._condition:
+                while not self._closed and len(self._buffer) - self._size < self.bytes_per_job:
+                    self._condition.wait()
+                if self._closed:
+                    return
+            try:
+                data = self._run_job()
+            except Exception as error:  # surfaced by the next read
+                with self._condition:
+                    self._error = error
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._push(data)
+                self._condition.notify_all()
+
+    def _take(self, n):
+        # Returns n bytes as a uint8 array, waiting for (or running) jobs.
+        chunks = []
+        while n > 0:
+            with self._condition:
+                if self._thread is None and self._size == 0:
+                    self._push(self._run_job())
+                while self._size == 0:
+                    if self._error is not None:
+                        raise RuntimeError("quantum random source failed") from self._error
+                    if self._closed:
+                        raise RuntimeError("quantum random source is closed")
+                    self._condition.wait()
+                size = min(n, self._size)
+                chunks.append(self._pop(size))
+                self._condition.notify_all()
+            n -= size
+        return np.concatenate(chunks) if len(chunks) != 1 else chunks[0]
+
+    def read(self, n_bytes):
+        """Reads random bytes.
+        Args:
+            n_bytes (int): Number of bytes.
+        Returns:
+            bytes: ``n_bytes`` random bytes.
+        """
+        return self._take(n_bytes).tobytes()
+
+    def read_array(self, n_bytes):
+        """Like `read`, as a ``numpy.uint8`` array."""
+        return self._take(n_bytes)
+
+    def _uint64(self, count):
+        return self._take(8 * count).view(np.uint64)
+
+    def randint(self, low, high=None, size=None):
+        """Uniform integers in ``[low, high)``, like ``numpy.random.randint``.
+
+        Values are drawn by rejection, so there is no modulo bias.
+
+        Args:
+            low (int): Lowest value (or ``high`` if ``high`` is None, with
+                ``low = 0``).
+            high (int): One past the highest value.
+            size (int or tuple): Output shape; a Python ``int`` when None.
+        Returns:
+            int or numpy.ndarray: Random integers.
+        """
+        if high is None:
+            low, high = 0, low
+        span = high - low
+        if span <= 0:
+            raise ValueError("high must be greater than low")
+        if span > 2**63:
+            raise ValueError("range must fit in 63 bits")
+        count = 1 if size is None else int(np.prod(size))
+        mask = np.uint64((1 << (span - 1).bit_length()) - 1)
+
+        values = np.empty(0, dtype=np.uint64)
+        while len(values) < count:
+            # At least half of the masked draws are accepted.
+            draws = self._uint64(2 * (count - len(values)) + 8) & mask
+            values = np.concatenate([values, draws[draws < np.uint64(span)]])
+        values = values[:count].astype(np.int64) + low
+        if size is None:
+            return int(values[0])
+        return values.reshape(size)
+
+    def random(self, size=None):
+        """Uniform floats in ``[0, 1)`` with 53 random bits each.
+        Args:
+            size (int or tuple): Output shape; a Python ``float`` when None.
+        Returns:
+            float or numpy.ndarray: Random floats.
+        """
+        count = 1 if size is None else int(np.prod(size))
+        values = (self._uint64(count) >> np.uint64(11)) * (1.0 / 2**53)
+        if size is None:
+            return float(values[0])
+        return values.reshape(size)
+
+
+def self_test(data, alpha=ALPHA):
+    """NIST SP 800-22 frequency (monobit) and runs tests.
+    Args:
+        data (bytes or numpy.ndarray): Sample to test; 100 bits or more.
+        alpha (float): Significance level.
+    Returns:
+        dict: ``{"frequency": p, "runs": p, "passed": bool}``.
+    """
+    bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8)).astype(np.int64)
+    n = len(bits)
+    if n < 100:
+        raise ValueError("the tests need at least 100 bits")
+
+    # Frequency test: are ones and zeros balanced?
+    s_obs = abs(int((2 * bits - 1).sum())) / math.sqrt(n)
+    p_frequency = math.erfc(s_obs / math.sqrt(2))
+
+    # Runs test: do runs of identical bits have the expected count?
+    pi = bits.mean()
+    if abs(pi - 0.5) >= 2 / math.sqrt(n):
+        p_runs = 0.0
+    else:
+        runs = 1 + int(np.count_nonzero(bits[1:] != bits[:-1]))
+        p_runs = math.erfc(abs(runs - 2 * n * pi * (1 - pi)) / (2 * math.sqrt(2 * n) * pi * (1 - pi)))
+
+    return {"frequency": p_frequency, "runs": p_runs, "passed": p_frequency >= alpha and p_runs >= alpha}
@@ -0,0 +1,396 @@
+"""Readout-error mitigation with cached, tensored calibrations.
+
+On a noisy device the Bell circuit of ``02_Hello_Quantum_circuits.py``
+also reads ``01`` and ``10``, because measured bits flip. Mitigation
+measures how they flip and inverts it:
+
+* `calibrate` runs calibration circuits that prepare basis states on the
+  measured qubits. Qubits are calibrated in groups (each qubit alone by
+  default), so the model is a tensor product of small assignment matrices
+  ``A_g[measured, prepared]`` and only ``2 ** max(group size)`` circuits
+  are needed, whatever the number of qubits.
+* Calibrations are cached in memory and under ``<cache_root>/calibration``,
+  keyed by backend, qubit layout, groups and shots, and expire after
+  `MAX_AGE` seconds; `CalibrationCache.stats` counts hits, misses and
+  expiries.
+* `ReadoutCalibration.mitigate` applies the inverse group by group, never
+  building the ``2**n x 2**n`` matrix: up to `DENSE_QUBITS` qubits on a
+  dense probability tensor (a whole batch at once with
+  `ReadoutCalibration.mitigate_many`), beyond that on the sparse outcomes,
+  dropping quasi-probabilities below a cutoff.
+
+::
+
+    calibration = calibrate(simulator, qubits=[0, 1])
+    mitigated = calibration.mitigate(result.get_counts())   # CountsArray
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from qiskit import QuantumCircuit
+
+from qlab.counts import CountsArray, sum_duplicates
+from qlab.transpile_cache import backend_key, cache_root
+
+# Shots per calibration circuit.
+SHOTS = 8192
+
+# Seconds a cached calibration stays valid.
+MAX_AGE = 24 * 3600
+
+# Widest outcomes mitigated on a dense probability tensor.
+DENSE_QUBITS = 20
+
+# Sparse mitigation drops quasi-probabilities smaller than this.
+CUTOFF = 1e-6
+
+
+def calibration_circuits(num_qubits, groups):
+    """Builds the circuits that prepare every basis state of every group.
+
+    Circuit ``j`` prepares, on each group, the basis state whose index is
+    ``j`` modulo the group's dimension (bit ``i`` of it on the group's
+    ``i``-th qubit), so groups are calibrated side by side.
+
+    Args:
+        num_qubits (int): Measured qubits.
+        groups (list): Lists of qubit indices (positions in the layout).
+    Returns:
+        list: ``2 ** max(group size)`` circuits measuring qubit ``i`` into
+            clbit ``i``.
+    """
+    circuits = []
+    for j in range(2 ** max(len(group) for group in groups)):
+        qc = QuantumCircuit(num_qubits, num_qubits, name=f"calibration_{j}")
+        for group in groups:
+            state = j % 2 ** len(group)
+            for i, qubit in enumerate(group):
+                if state >> i & 1:
+                    qc.x(qubit)
+        qc.measure(range(num_qubits), range(num_qubits))
+        circuits.append(qc)
+    return circuits
+
+
+def _group_state(outcomes, group):
+    # Basis-state index of a group in every uint64 outcome (bit i from the group's i-th qubit).
+    state = np.zeros(len(outcomes), dtype=np.intp)
+    for i, qubit in enumerate(group):
+        state |= ((outcomes >> np.uint64(qubit)) & np.uint64(1)).astype(np.intp) << i
+    return state
+
+
+def _group_matrices(counts, groups):
+    # Assignment matrix A[measured, prepared] of each group from the calibration counts.
+    matrices = []
+    for group in groups:
+        dim = 2 ** len(group)
+        matrix = np.zeros((dim, dim))
+        for j, circuit_counts in enumerate(counts):
+            prepared = j % dim
+            marginal = circuit_counts.marginal(group)
+            matrix[marginal.outcomes.astype(np.intp), prepared] += marginal.counts
+        matrices.append(matrix / matrix.sum(axis=0, keepdims=True))
+    return matrices
+
+
+class ReadoutCalibration:
+    """Tensored readout-assignment model of a qubit layout.
+    Attributes:
+        qubits (list): Physical qubits; qubit ``qubits[i]`` is read into
+            clbit ``i``.
+        groups (list): Qubit index groups (positions in ``qubits``).
+        matrices (list): ``A_g[measured, prepared]`` per group.
+        inverses (list): Their inverses.
+        created (float): Unix time of the calibration run.
+    """
+
+    def __init__(self, qubits, groups, matrices, created=None):
+        self.qubits = list(qubits)
+        self.groups = [list(group) for group in groups]
+        self.matrices = [np.asarray(matrix, dtype=float) for matrix in matrices]
+        self.inverses = [np.linalg.inv(matrix) for matrix in self.matrices]
+        self.created = time.time() if created is None else created
+        covered = sorted(q for group in self.groups for q in group)
+        if covered != list(range(len(self.qubits))):
+            raise ValueError("groups must cover every qubit position exactly once")
+
+    @property
+    def num_qubits(self):
+        """int: Number of calibrated qubits."""
+        return len(self.qubits)
+
+    def readout_fidelities(self):
+        """Probability of reading each qubit correctly, averaged over 0/1."""
+        fidelities = np.empty(self.num_qubits)
+        for group, matrix in zip(self.groups, self.matrices):
+            dim = len(matrix)
+            for i, qubit in enumerate(group):
+                bit = (np.arange(dim) >> i) & 1
+                correct = bit[:, None] == bit[None, :]
+                fidelities[qubit] = (matrix * correct).sum() / dim
+        return fidelities
+
+    def assignment_matrix(self):
+        """The full ``2**n x 2**n`` model ``A[measured, prepared]``, for
+        small ``n`` and checks only."""
+        outcomes = np.arange(2**self.num_qubits, dtype=np.uint64)
+        full = np.ones((len(outcomes),) * 2)
+        for group, matrix in zip(self.groups, self.matrices):
+            state = _group_state(outcomes, group)
+            full *= matrix[np.ix_(state, state)]
+        return full
+
+    def _dense(self, probabilities):
+        # probabilities: (batch, 2**n); applies each group's inverse along its qubits' axes.
+        n = self.num_qubits
+        batch = len(probabilities)
+        # Axis k + 1 of the tensor is clbit n - 1 - k (row-major, highest bit first).
+        tensor = probabilities.reshape((batch,) + (2,) * n)
+        for group, inverse in zip(self.groups, self.inverses):
+            k = len(group)
+            axes = [1 + n - 1 - q for q in reversed(group)]  # highest group bit first
+            moved = np.moveaxis(tensor, axes, range(1, k + 1))
+            shape = moved.shape
+            flat = moved.reshape(batch, 2**k, -1)
+            flat = np.matmul(inverse, flat)
+            tensor = np.moveaxis(flat.reshape(shape), range(1, k + 1), axes)
+        return tensor.reshape(batch, 2**n)
+
+    def _sparse(self, outcomes, values, cutoff):
+        for group, inverse in zip(self.groups, self.inverses):
+            k = len(group)
+            state = _group_state(outcomes, group)
+            # The outcome with the group's bits cleared.
+            base = outcomes.copy()
+            for qubit in group:
+                base &= ~np.uint64(1 << qubit)
+            # Every outcome spreads over the 2**k states of its group.
+            targets = np.arange(2**k)
+            spread = np.zeros(2**k, dtype=np.uint64)
+            for i, qubit in enumerate(group):
+                spread |= ((targets >> i) & 1).astype(np.uint64) << np.uint64(qubit)
+            new_outcomes = (base[:, None] | spread[None, :]).ravel()
+            new_values = (values[:, None] * inverse[:, state].T).ravel()
+            outcomes, values = sum_duplicates(new_outcomes, new_values)
+            keep = np.abs(values) >= cutoff * np.abs(values).sum()
+            outcomes, values = outcomes[keep], values[keep]
+        return outcomes, values
+
+    def _as_counts(self, counts):
+        if not isinstance(counts, CountsArray):
+            counts = CountsArray.from_dict(counts, num_bits=self.num_qubits)
+        if counts.num_bits != self.num_qubits:
+            raise ValueError(f"counts have {counts.num_bits} bits, calibration has {self.num_qubits} qubits")
+        return counts
+
+    def mitigate(self, counts, clip=False, cutoff=CUTOFF):
+        """Removes readout error from one distribution.
+        Args:
+            counts (CountsArray or dict): Counts with clbit ``i`` read from
+                ``qubits[i]``.
+            clip (bool): Clip negative quasi-probabilities and renormalize.
+            cutoff (float): Relative size below which sparse results are
+                dropped (more than `DENSE_QUBITS` qubits only).
+        Returns:
+            CountsArray: Mitigated quasi-probabilities (they sum to 1).
+        """
+        counts = self._as_counts(counts)
+        if self.num_qubits <= DENSE_QUBITS:
+            return self.mitigate_many([counts], clip)[0]
+        probabilities = counts.probabilities()
+        outcomes, values = self._sparse(counts.outcomes, probabilities, cutoff)
+        return _quasi(outcomes, values, counts, clip)
+
+    def mitigate_many(self, batch, clip=False):
+        """Mitigates many distributions of the same qubits in one pass.
+        Args:
+            batch (list): Counts (`CountsArray` or dicts).
+            clip (bool): See `mitigate`.
+        Returns:
+            list: One mitigated `CountsArray` per input.
+        """
+        batch = [self._as_counts(counts) for counts in batch]
+        if self.num_qubits > DENSE_QUBITS:
+            return [self.mitigate(counts, clip) for counts in batch]
+        dense = np.zeros((len(batch), 2**self.num_qubits))
+        for row, counts in zip(dense, batch):
+            row[counts.outcomes.astype(np.intp)] = counts.probabilities()
+        mitigated = self._dense(dense)
+        out = []
+        for counts, row in zip(batch, mitigated):
+            outcomes = np.flatnonzero(np.abs(row) > 1e-12)
+            out.append(_quasi(outcomes, row[outcomes], counts, clip))
+        return out
+
+    def to_dict(self):
+        """JSON-serializable form, see `from_dict`."""
+        return {"qubits": self.qubits, "groups": self.groups, "created": self.created,
+                "matrices": [matrix.tolist() for matrix in self.matrices]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a calibration saved with `to_dict`."""
+        return cls(data["qubits"], data["groups"], data["matrices"], data["created"])
+
+
+def _quasi(outcomes, values, counts, clip):
+    if clip:
+        values = np.clip(values, 0, None)
+    values = values / values.sum()
+    return CountsArray(outcomes, values, counts.num_bits, counts.registers)
+
+
+def _backend_token(backend):
+    # backend_key, plus the noise model of simulators (it decides their readout errors).
+    noise = getattr(getattr(backend, "options", None), "noise_model", None)
+    if noise is None:
+        return backend_key(backend)
+    return backend_key(backend) + json.dumps(noise.to_dict(serializable=True), sort_keys=True)
+
+
+class CalibrationCache:
+    """Memory and disk cache of calibrations, with expiry.
+    Attributes:
+        hits (int): Lookups served from memory or disk.
+        disk_hits (int): The subset of ``hits`` read from disk.
+        misses (int): Lookups with no entry.
+        expired (int): Lookups whose entry was too old.
+    """
+
+    def __init__(self, directory=None, max_age=MAX_AGE):
+        """
+        Args:
+            directory (str): Cache directory; defaults to
+                ``<cache_root>/calibration``. Pass ``False`` to keep the
+                cache in memory only.
+            max_age (float): Seconds a calibration stays valid.
+        """
+        self.max_age = max_age
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+        if directory is False:
+            self.directory = None
+            return
+        self.directory = directory or os.path.join(cache_root(), "calibration")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, backend, qubits, groups, shots):
+        """Cache key of a calibration request."""
+        raw = f"{_backend_token(backend)}|{list(qubits)}|{groups}|{shots}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _fresh(self, calibration):
+        return time.time() - calibration.created <= self.max_age
+
+    def get(self, key):
+        """Returns the calibration under ``key`` if it has not expired."""
+        with self._lock:
+            calibration = self._memory.get(key)
+            disk = False
+            if calibration is None:
+                calibration = self._load(key)
+                disk = calibration is not None
+            if calibration is None:
+                self.misses += 1
+                return None
+            if not self._fresh(calibration):
+                self.expired += 1
+                self._memory.pop(key, None)
+                return None
+            self.hits += 1
+            self.disk_hits += disk
+            self._memory[key] = calibration
+            return calibration
+
+    def put(self, key, calibration):
+        """Stores a calibration."""
+        with self._lock:
+            self._memory[key] = calibration
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, key + ".json")
+        # Write then rename, so concurrent readers never see half a file.
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(calibration.to_dict(), file)
+        os.replace(temporary, path)
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, key + ".json"), encoding="utf-8") as file:
+                return ReadoutCalibration.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def stats(self):
+        """dict: Hit, miss and expiry counters."""
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "expired": self.expired,
+                    "memory_entries": len(self._memory)}
+
+    def clear(self):
+        """Drops every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Returns the process-wide calibration cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CalibrationCache()
+    return _default_cache
+
+
+def calibrate(backend, qubits, groups=None, shots=SHOTS, cache=None, refresh=False):
+    """Returns the readout calibration of a qubit layout, running it if needed.
+    Args:
+        backend (Backend): Device or simulator (e.g. an ``AerSimulator``
+            with a noise model); the circuits are run with ``backend.run``.
+        qubits (list): Physical qubits, in clbit order.
+        groups (list): Qubit index groups calibrated jointly (correlated
+            errors); each qubit alone by default.
+        shots (int): Shots per calibration circuit.
+        cache (CalibrationCache): Defaults to `default_cache`.
+        refresh (bool): Run the calibration even when a fresh one is
+            cached.
+    Returns:
+        ReadoutCalibration: The calibration.
+    """
+    from qiskit import transpile
+
+    qubits = list(qubits)
+    groups = [list(group) for group in groups] if groups is not None else [[i] for i in range(len(qubits))]
+    cache = cache or default_cache()
+    key = cache.key(backend, qubits, groups, shots)
+    if not refresh:
+        calibration = cache.get(key)
+        if calibration is not None:
+            return calibration
+
+    circuits = calibration_circuits(len(qubits), groups)
+    compiled = transpile(circuits, backend, initial_layout=qubits, optimization_level=0)
+    result = backend.run(compiled, shots=shots).result()
+    counts = [CountsArray.from_dict(result.get_counts(i), num_bits=len(qubits)) for i in range(len(circuits))]
+    calibration = ReadoutCalibration(qubits, groups, _group_matrices(counts, groups))
+    cache.put(key, calibration)
+    return calibration
@@ -0,0 +1,329 @@
+"""Cache of circuit drawings, with a headless batch renderer.
+
+The lessons print ``circuit.draw()`` for circuits that never change (the
+four CHSH circuits, the teleportation protocol...), and ``HelloWorld.py``
+draws with Matplotlib. Every run lays them out again. `RenderCache` keys a
+drawing on:
+
+* the circuit's structural hash (`qlab.transpile_cache.structural_hash`),
+* the output format: ``"text"`` (what ``print(circuit.draw())`` shows),
+  ``"svg"`` or ``"png"`` (the ``"mpl"`` drawer, saved headless),
+* the style and any other ``draw`` options,
+
+and keeps drawings in a small in-memory LRU and a directory of ``.txt``,
+``.svg`` and ``.png`` files under ``<cache_root>/render``, versioned by
+Qiskit version like the transpilation cache. Matplotlib is only imported
+for image formats, and figures are saved through an ``Agg`` canvas of
+their own, so no window opens and the process's backend (a notebook's
+inline display, say) is left alone::
+
+    from qlab.render_cache import cached_draw
+
+    print(cached_draw(chsh_circuit(0, 1)))
+    svg = cached_draw(qc, "svg", style="clifford")
+
+`RenderCache.render_many` renders the misses of a batch in worker
+processes, and ``python -m qlab.render_cache`` pre-renders every lab
+circuit (`lab_circuits`) so later lesson runs only read files.
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import qiskit
+
+from qlab.transpile_cache import cache_root, structural_hash
+
+# Entries kept on disk and in memory.
+MAX_ENTRIES = 1024
+MEMORY_ENTRIES = 128
+
+# Output format -> file extension.
+FORMATS = {"text": "txt", "svg": "svg", "png": "png"}
+
+# Resolution of PNG renders.
+PNG_DPI = 150
+
+
+def _options_token(options):
+    return repr(sorted((name, repr(value)) for name, value in options.items()))
+
+
+def render(circuit, output="text", style=None, **options):
+    """Draws a circuit without any cache.
+    Args:
+        circuit (QuantumCircuit): The circuit.
+        output (str): ``"text"``, ``"svg"`` or ``"png"``.
+        style (str or dict): Matplotlib drawer style, e.g. ``"clifford"``.
+        **options: Passed to ``QuantumCircuit.draw``.
+    Returns:
+        str or bytes: The text drawing or SVG as ``str``, PNG as ``bytes``.
+    """
+    if output not in FORMATS:
+        raise ValueError(f"unknown output format {output!r}; expected one of {sorted(FORMATS)}")
+    if output == "text":
+        return str(circuit.draw("text", **options))
+
+    from matplotlib import pyplot
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = circuit.draw("mpl", style=style, **options)
+    FigureCanvasAgg(figure)  # save without the process's (possibly interactive) backend
+    buffer = io.BytesIO()
+    try:
+        figure.savefig(buffer, format=output, dpi=PNG_DPI, bbox_inches="tight")
+    finally:
+        pyplot.close(figure)
+    data = buffer.getvalue()
+    return data.decode("utf-8") if output == "svg" else data
+
+
+def _render_job(job):
+    # Worker entry point of render_many.
+    circuit, output, style, options = job
+    return render(circuit, output, style, **options)
+
+
+class RenderCache:
+    """Two-level (memory, disk) LRU cache of circuit drawings.
+    Attributes:
+        hits (int): Lookups served from memory or disk.
+        disk_hits (int): The subset of ``hits`` read from disk.
+        misses (int): Lookups that had to render.
+    """
+
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES, memory_entries=MEMORY_ENTRIES):
+        """
+        Args:
+            directory (str): Cache directory; a per-Qiskit-version folder is
+                created inside it. Defaults to ``<cache_root>/render``.
+                Pass ``False`` to keep the cache in memory only.
+            max_entries (int): LRU limit of the disk layer.
+            memory_entries (int): LRU limit of the memory layer.
+        """
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory is False:
+            self.directory = None
+            return
+        base = directory or os.path.join(cache_root(), "render")
+        self.directory = os.path.join(base, f"qiskit-{qiskit.__version__}")
+        os.makedirs(self.directory, exist_ok=True)
+        # Drawings made by other Qiskit versions may differ.
+        for name in os.listdir(base):
+            path = os.path.join(base, name)
+            if name.startswith("qiskit-") and path != self.directory:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def key(self, circuit, output="text", style=None, **options):
+        """Cache key of a drawing."""
+        raw = f"{structural_hash(circuit)}|{output}|{style!r}|{_options_token(options)}|{qiskit.__version__}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _lookup(self, key, output):
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return cached
+        cached = self._load(key, output)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, cached)
+        return cached
+
+    def _add(self, key, output, drawing):
+        with self._lock:
+            self.misses += 1
+            self._remember(key, drawing)
+        self._store(key, output, drawing)
+
+    def draw(self, circuit, output="text", style=None, **options):
+        """Draws a circuit, or returns the cached drawing.
+
+        See `render` for the arguments and return value.
+        """
+        if output not in FORMATS:
+            raise ValueError(f"unknown output format {output!r}; expected one of {sorted(FORMATS)}")
+        key = self.key(circuit, output, style, **options)
+        cached = self._lookup(key, output)
+        if cached is not None:
+            return cached
+        drawing = render(circuit, output, style, **options)
+        self._add(key, output, drawing)
+        return drawing
+
+    def render_many(self, circuits, output="text", style=None, processes=None, **options):
+        """Draws a batch of circuits, rendering the misses in parallel.
+
+        Structurally identical circuits are rendered once.
+
+        Args:
+            circuits (list): The circuits.
+            output (str): See `render`.
+            style (str or dict): See `render`.
+            processes (int): Worker processes; defaults to the CPU count.
+                With 1, or a single miss, everything renders here.
+            **options: See `render`.
+        Returns:
+            list: One drawing per circuit.
+        """
+        keys = [self.key(circuit, output, style, **options) for circuit in circuits]
+        drawings = {}
+        missing = {}
+        for key, circuit in zip(keys, circuits):
+            if key in drawings or key in missing:
+                continue
+            cached = self._lookup(key, output)
+            if cached is not None:
+                drawings[key] = cached
+            else:
+                missing[key] = circuit
+
+        jobs = [(circuit, output, style, options) for circuit in missing.values()]
+        processes = processes or os.cpu_count() or 1
+        if processes > 1 and len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+                rendered = list(pool.map(_render_job, jobs))
+        else:
+            rendered = [_render_job(job) for job in jobs]
+        for key, drawing in zip(missing, rendered):
+            self._add(key, output, drawing)
+            drawings[key] = drawing
+        return [drawings[key] for key in keys]
+
+    def stats(self):
+        """dict: Hit/miss counters and current sizes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._entries()),
+            }
+
+    def clear(self):
+        """Drops every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+        for path in self._entries():
+            os.remove(path)
+
+    def _remember(self, key, drawing):
+        self._memory[key] = drawing
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key, output):
+        return os.path.join(self.directory, f"{key}.{FORMATS[output]}")
+
+    def _entries(self):
+        if self.directory is None:
+            return []
+        extensions = tuple("." + extension for extension in FORMATS.values())
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(extensions)]
+
+    def _load(self, key, output):
+        if self.directory is None:
+            return None
+        path = self._path(key, output)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        # Touch the entry so the LRU sees it as recently used.
+        os.utime(path)
+        return data if output == "png" else data.decode("utf-8")
+
+    def _store(self, key, output, drawing):
+        if self.directory is None:
+            return
+        path = self._path(key, output)
+        # Write then rename, so concurrent readers never see half a file.
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(drawing if isinstance(drawing, bytes) else drawing.encode("utf-8"))
+        os.replace(temporary, path)
+
+        entries = self._entries()
+        if len(entries) > self.max_entries:
+            entries.sort(key=lambda entry: os.path.getmtime(entry))
+            for entry in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(entry)
+                except OSError:
+                    pass
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Returns the process-wide cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RenderCache()
+    return _default_cache
+
+
+def cached_draw(circuit, output="text", style=None, **options):
+    """Draws through the process-wide `RenderCache`.
+
+    See `render` for the arguments.
+    """
+    return default_cache().draw(circuit, output, style, **options)
+
+
+def lab_circuits():
+    """The fixed circuits the lessons draw.
+    Returns:
+        list: Circuits of the CHSH, teleportation, superdense coding and
+            random number generator lessons.
+    """
+    from qlab.chsh import QUESTIONS, chsh_circuit
+    from qlab.qrng import hadamard_circuit
+    from qlab.superdense import superdense_template
+    from qlab.teleportation import teleportation_protocol, teleportation_test_template
+
+    circuits = [chsh_circuit(x, y) for x, y in QUESTIONS]
+    circuits += [teleportation_protocol(), teleportation_test_template(), superdense_template(), hadamard_circuit(8)]
+    return circuits
+
+
+def main(argv=None):
+    """Pre-renders `lab_circuits` into the default cache."""
+    parser = argparse.ArgumentParser(description="Renders the lab's circuits into the drawing cache.")
+    parser.add_argument("--format", action="append", choices=sorted(FORMATS), help="output format (default text)")
+    parser.add_argument("--style", help="Matplotlib drawer style, e.g. clifford")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    cache = default_cache()
+    circuits = lab_circuits()
+    for output in args.format or ["text"]:
+        cache.render_many(circuits, output, args.style if output != "text" else None, processes=args.jobs)
+    print(cache.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
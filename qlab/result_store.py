@@ -0,0 +1,397 @@
+"""Append-only, memory-mapped store of experiment results.
+
+The lab scripts print their counts and drop them, so comparing two runs
+means simulating again. `ResultStore` keeps every experiment on disk:
+
+* ``index.jsonl`` holds one line of metadata per experiment: circuit hash
+  (`qlab.transpile_cache.structural_hash`), parameters, seed, backend,
+  shots, classical registers, timings and where its data lives,
+* the data itself goes to raw little-endian columns shared by all
+  experiments: ``samples.uint64`` (one integer outcome per shot, e.g. QRNG
+  output), ``outcomes.uint64`` with ``counts.int64`` (counts), or
+  ``quasi_outcomes.uint64`` with ``quasi.float64`` (quasi-probabilities).
+  Each pair is appended together, so one offset addresses both.
+
+Columns are only ever appended to, and an experiment's index line is
+written after its data is flushed, so an interrupted run leaves at most
+unreferenced bytes at the end of a column, which the next writer cuts off
+before appending. Reads map the columns with
+``numpy.memmap``: `ResultStore.samples` and `ResultStore.counts` return
+views of the file, and `ResultStore.aggregate` sums marginals over many
+experiments a chunk at a time, without loading an archive into memory::
+
+    with ResultStore("runs/chsh") as store:
+        store.append(counts, circuit=qc, parameters={"x": 0, "y": 1})
+        records = store.select(parameters={"x": 0})
+        alice = store.aggregate(records, registers=["Alice"])
+
+One process writes a store at a time; any number may read it.
+"""
+
+import json
+import os
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+import numpy as np
+
+from qlab.counts import CountsArray, _gather_bits, _parse_bitstrings
+from qlab.transpile_cache import cache_root, structural_hash
+
+# Index lines kept in memory before `ResultStore.flush` writes them (close and garbage collection flush too).
+FLUSH_RECORDS = 1024
+
+# Shots read per pass when aggregating sample columns.
+CHUNK_SIZE = 2**22
+
+COLUMNS = {
+    "samples": np.dtype("<u8"),
+    "outcomes": np.dtype("<u8"),
+    "counts": np.dtype("<i8"),
+    "quasi_outcomes": np.dtype("<u8"),
+    "quasi": np.dtype("<f8"),
+}
+
+# Outcome and value columns of each record kind, and the kind each column belongs to.
+_PAIRS = {"counts": ("outcomes", "counts"), "quasi": ("quasi_outcomes", "quasi")}
+_KINDS = {"samples": "samples", **{name: kind for kind, pair in _PAIRS.items() for name in pair}}
+
+Record = namedtuple(
+    "Record",
+    ["id", "kind", "circuit_hash", "parameters", "seed", "backend", "shots", "num_bits", "registers", "timings",
+     "created", "offset", "length", "metadata"],
+)
+Record.__doc__ = """Index entry of one experiment.
+    Attributes:
+        id (int): Position in the store.
+        kind (str): ``"samples"``, ``"counts"`` or ``"quasi"``.
+        circuit_hash (str): Structural hash of the circuit, or None.
+        parameters (dict): Parameter values by name.
+        seed (int): Simulator seed, or None.
+        backend (str): Backend name, or None.
+        shots (int): Number of shots, or None for exact distributions.
+        num_bits (int): Width of an outcome.
+        registers (list): ``(name, size)`` pairs, clbit 0 first.
+        timings (dict): Seconds by phase, e.g. ``{"run": 0.12}``.
+        created (float): Unix time of the append.
+        offset (int): First row in the data columns.
+        length (int): Number of rows.
+        metadata (dict): Anything else passed to `ResultStore.append`.
+    """
+
+
+def default_directory():
+    """Default store location, under `qlab.transpile_cache.cache_root`."""
+    return os.path.join(cache_root(), "results")
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "name") and not isinstance(value, str):
+        return value.name
+    return value
+
+
+def _backend_name(backend):
+    if backend is None or isinstance(backend, str):
+        return backend
+    name = getattr(backend, "name", None)
+    name = name() if callable(name) else name
+    return name or type(backend).__name__
+
+
+def _as_samples(samples):
+    # Integer outcome per shot, and its width when known, from ints, a packed BitArray or bitstrings.
+    if hasattr(samples, "num_bits") and hasattr(samples, "array"):
+        packed = np.asarray(samples.array, dtype=np.uint8).reshape(-1, samples.array.shape[-1])
+        if packed.shape[1] > 8:
+            raise ValueError("outcomes wider than 64 bits are not supported")
+        padded = np.zeros((len(packed), 8), dtype=np.uint8)
+        padded[:, 8 - packed.shape[1]:] = packed
+        return padded.view(">u8").ravel().astype(np.uint64), samples.num_bits
+    samples = list(samples) if not hasattr(samples, "dtype") else samples
+    if len(samples) and isinstance(samples[0], str):
+        outcomes, sizes = _parse_bitstrings(samples)
+        return outcomes, sum(sizes)
+    return np.asarray(samples, dtype=np.uint64).ravel(), None
+
+
+def _write_pending(handles, pending, index_path):
+    # Data first, then the index lines that point at it.
+    for handle in handles.values():
+        if not handle.closed:
+            handle.flush()
+    if pending:
+        with open(index_path, "a", encoding="utf-8") as index:
+            for record in pending:
+                index.write(json.dumps(record._asdict()) + "\n")
+        pending.clear()
+
+
+class ResultStore:
+    """Experiment results in memory-mapped columns with a JSON-lines index."""
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str): Store directory, created if needed. Defaults to
+                `default_directory`.
+        """
+        self.directory = directory or default_directory()
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._handles = {}
+        self._maps = {}
+        self._pending = []
+        self._records = self._load_index()
+        # A store dropped without close() still writes its buffered records.
+        self._finalizer = weakref.finalize(self, _write_pending, self._handles, self._pending,
+                                           self._path("index.jsonl"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.{COLUMNS[name].name}" if name in COLUMNS else name)
+
+    def _load_index(self):
+        records = []
+        path = self._path("index.jsonl")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:  # line cut short by an interrupted write
+                        continue
+                    entry["registers"] = [tuple(register) for register in entry["registers"]]
+                    records.append(Record(**entry))
+        return records
+
+    @property
+    def records(self):
+        """list: Every `Record`, oldest first."""
+        return list(self._records)
+
+    # -- writing -----------------------------------------------------------------------------------------------
+
+    def _write(self, name, values):
+        handle = self._handles.get(name)
+        if handle is None:
+            # Cut off rows no record references, left by an interrupted writer; otherwise a pair's two columns
+            # could differ in length and one offset would no longer address both.
+            path = self._path(name)
+            end = max((r.offset + r.length for r in self._records if r.kind == _KINDS[name]), default=0)
+            if os.path.exists(path) and os.path.getsize(path) > end * COLUMNS[name].itemsize:
+                self._maps.pop(name, None)
+                os.truncate(path, end * COLUMNS[name].itemsize)
+            handle = self._handles[name] = open(path, "ab")
+        offset = handle.tell() // COLUMNS[name].itemsize
+        handle.write(np.ascontiguousarray(values, dtype=COLUMNS[name]).data)
+        return offset
+
+    def append(self, counts=None, samples=None, circuit=None, parameters=None, seed=None, backend=None, shots=None,
+               registers=None, num_bits=None, timings=None, **metadata):
+        """Adds one experiment.
+        Args:
+            counts (CountsArray or dict): Outcome counts, or quasi-
+                probabilities (any dict `CountsArray.from_dict` reads).
+            samples (array_like): Per-shot outcomes instead of counts:
+                integers, bitstrings or a ``BitArray``.
+            circuit (QuantumCircuit or str): The circuit, or its hash.
+            parameters (dict): Parameter values by name (or by
+                ``Parameter``); arrays are stored as lists.
+            seed (int): Simulator seed; other seeds (e.g. a
+                ``numpy.random.Generator``) are recorded as None.
+            backend: Backend or its name.
+            shots (int): Shots; taken from the data when None (and None for
+                quasi-probabilities).
+            registers (list): ``(name, size)`` pairs, clbit 0 first.
+            num_bits (int): Width of an outcome.
+            timings (dict): Seconds by phase.
+            **metadata: Extra JSON-serializable fields.
+        Returns:
+            Record: The new index entry.
+        """
+        if (counts is None) == (samples is None):
+            raise ValueError("pass either counts or samples")
+        if samples is not None:
+            values, width = _as_samples(samples)
+            num_bits = num_bits or width or (int(values.max()).bit_length() if len(values) else 0)
+            registers = registers or [("c", num_bits)]
+            kind = "samples"
+            shots = len(values) if shots is None else shots
+        else:
+            if not isinstance(counts, CountsArray):
+                counts = CountsArray.from_dict(counts, registers=registers, num_bits=num_bits)
+            registers, num_bits = registers or counts.registers, counts.num_bits
+            kind = "quasi" if counts.counts.dtype.kind == "f" else "counts"
+            if shots is None and kind == "counts":
+                shots = int(counts.shots)
+
+        with self._lock:
+            if kind == "samples":
+                offset = self._write("samples", values)
+                length = len(values)
+            else:
+                outcomes, values = _PAIRS[kind]
+                offset = self._write(outcomes, counts.outcomes)
+                self._write(values, counts.counts)
+                length = len(counts)
+            if circuit is not None and not isinstance(circuit, str):
+                circuit = structural_hash(circuit)
+            record = Record(
+                id=len(self._records),
+                kind=kind,
+                circuit_hash=circuit,
+                parameters=_jsonable(parameters or {}),
+                seed=int(seed) if isinstance(seed, (int, np.integer)) else None,
+                backend=_backend_name(backend),
+                shots=shots,
+                num_bits=int(num_bits),
+                registers=[(str(name), int(size)) for name, size in registers],
+                timings=_jsonable(timings or {}),
+                created=time.time(),
+                offset=int(offset),
+                length=int(length),
+                metadata=_jsonable(metadata),
+            )
+            self._records.append(record)
+            self._pending.append(record)
+            if len(self._pending) >= FLUSH_RECORDS:
+                self._flush()
+        return record
+
+    def _flush(self):
+        _write_pending(self._handles, self._pending, self._path("index.jsonl"))
+
+    def flush(self):
+        """Writes buffered data and index lines to disk."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Flushes and closes the column files."""
+        with self._lock:
+            self._flush()
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+            self._maps = {}
+
+    # -- reading -----------------------------------------------------------------------------------------------
+
+    def _column(self, name, end):
+        # Read-only map of a column covering rows [0, end), remapped when the file has grown.
+        column = self._maps.get(name)
+        if column is None or len(column) < end:
+            handle = self._handles.get(name)
+            if handle is not None:
+                handle.flush()
+            if end == 0:
+                return np.empty(0, dtype=COLUMNS[name])
+            column = self._maps[name] = np.memmap(self._path(name), dtype=COLUMNS[name], mode="r")
+        return column
+
+    def _rows(self, name, record):
+        end = record.offset + record.length
+        return self._column(name, end)[record.offset:end]
+
+    def samples(self, record):
+        """Per-shot outcomes of a ``"samples"`` record, as a read-only view
+        of the file."""
+        if record.kind != "samples":
+            raise ValueError(f"record {record.id} holds {record.kind}, not samples")
+        return self._rows("samples", record)
+
+    def counts(self, record):
+        """Counts of a record as a `CountsArray`; for ``"counts"`` and
+        ``"quasi"`` records its arrays are views of the file."""
+        if record.kind == "samples":
+            return self.aggregate([record])
+        outcomes, values = _PAIRS[record.kind]
+        return CountsArray(self._rows(outcomes, record), self._rows(values, record), record.num_bits, record.registers)
+
+    def select(self, where=None, parameters=None, **fields):
+        """Finds records.
+        Args:
+            where (callable): Takes a `Record`, returns whether to keep it.
+            parameters (dict): Required parameter values.
+            **fields: Required `Record` field values, e.g.
+                ``backend="aer_simulator"`` or ``circuit_hash=...``.
+        Returns:
+            list: Matching records, oldest first.
+        """
+        parameters = _jsonable(parameters or {})
+        selected = []
+        for record in self._records:
+            if any(getattr(record, name) != value for name, value in fields.items()):
+                continue
+            if any(record.parameters.get(name) != value for name, value in parameters.items()):
+                continue
+            if where is None or where(record):
+                selected.append(record)
+        return selected
+
+    def aggregate(self, records=None, bits=None, registers=None):
+        """Sums the counts of many records, optionally marginalized.
+        Args:
+            records (list): Records with the same bit layout; all by default.
+            bits (list): Clbit indices to keep.
+            registers (list): Register names to keep, instead of ``bits``.
+        Returns:
+            CountsArray: Total counts (summed quasi-probabilities when the
+                records hold quasi-distributions).
+        """
+        records = self._records if records is None else records
+        if not records:
+            raise ValueError("no records to aggregate")
+        layout = records[0].registers
+        if any(record.registers != layout for record in records):
+            raise ValueError("records have different registers")
+
+        if registers is not None:
+            # Resolve register names once; every record has the same layout.
+            probe = CountsArray([], [], records[0].num_bits, layout)
+            bits = [bit for name in registers for bit in probe.register_bits(name)]
+            layout = [(name, len(probe.register_bits(name))) for name in registers]
+        elif bits is not None:
+            bits, layout = list(bits), None
+        num_bits = records[0].num_bits if bits is None else len(bits)
+
+        parts = []
+        outcomes, values = [], []
+        for record in records:
+            if record.kind != "samples":
+                pair = _PAIRS[record.kind]
+                outcomes.append(self._rows(pair[0], record))
+                values.append(self._rows(pair[1], record))
+                continue
+            column = self.samples(record)
+            for begin in range(0, len(column), CHUNK_SIZE):
+                chunk = column[begin:begin + CHUNK_SIZE]
+                if bits is not None:
+                    chunk = _gather_bits(chunk, bits)
+                parts.append(CountsArray.from_samples(chunk, num_bits, layout))
+        if outcomes:
+            # All counts records at once: one concatenation, one marginal.
+            counts = CountsArray(np.concatenate(outcomes), np.concatenate(values), records[0].num_bits,
+                                 records[0].registers)
+            parts.append(counts if bits is None else counts.marginal(bits, layout))
+        return parts[0].merge(*parts[1:]) if len(parts) > 1 else parts[0]
@@ -0,0 +1,285 @@
+"""Runs the lab's lessons in one warmed interpreter, or a pool of them.
+
+Every lesson is a standalone script, so running the lab meant one Python
+start-up, one ``import qiskit`` / ``import qiskit_aer`` and one
+``os.system('cls')`` subprocess per lesson. The runner:
+
+* discovers the lessons (``*.py`` under ``PCH.IBM.LEARNING`` by default),
+* imports Qiskit and Aer once and warms the shared execution contexts
+  (`qlab.execution.get_context`), then executes each lesson as
+  ``__main__`` in the same interpreter, so later lessons pay no import cost,
+* optionally spreads the lessons over a process pool, each worker warmed
+  once,
+* keeps Matplotlib headless unless drawing is asked for,
+* reports per-lesson import, build (read and compile) and run times.
+
+From the repository root::
+
+    python run_lab.py                    # every lesson, in order
+    python run_lab.py CHSH teleport -q   # lessons whose path matches, quietly
+    python run_lab.py -j 4               # four worker processes
+
+Lessons call `clear_screen` instead of ``os.system('cls')``; it writes an
+ANSI escape and does nothing when output is not a terminal or when the
+runner is in charge.
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import sys
+import time
+import traceback
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directories searched for lessons, relative to the repository root.
+LESSON_ROOTS = ("PCH.IBM.LEARNING",)
+
+# Imported once before the first lesson.
+WARM_MODULES = ("numpy", "qiskit", "qiskit.quantum_info", "qiskit_aer", "qiskit_aer.primitives", "qiskit.primitives")
+
+# Execution contexts created before the first lesson.
+WARM_KINDS = ("reference_sampler", "sampler", "simulator")
+
+# Set while the runner executes lessons; `clear_screen` then leaves the terminal alone.
+RUNNER_ENV = "QLAB_RUNNER"
+
+Lesson = namedtuple("Lesson", ["name", "path"])
+Lesson.__doc__ = """A lesson script.
+    Attributes:
+        name (str): Path relative to the repository root.
+        path (str): Absolute path.
+    """
+
+LessonReport = namedtuple("LessonReport", ["lesson", "import_seconds", "build_seconds", "run_seconds", "output",
+                                           "error"])
+LessonReport.__doc__ = """Outcome of one lesson.
+    Attributes:
+        lesson (Lesson): The lesson.
+        import_seconds (float): Time spent in the lesson's imports.
+        build_seconds (float): Reading and compiling the script.
+        run_seconds (float): Executing it, imports excluded.
+        output (str): Captured output, or None when it went to the terminal.
+        error (str): Formatted traceback, or None on success.
+    """
+
+
+def clear_screen():
+    """Clears the terminal, like ``os.system('cls')`` without the subprocess."""
+    if os.environ.get(RUNNER_ENV) or not sys.stdout.isatty():
+        return
+    sys.stdout.write("\033[2J\033[H")
+    sys.stdout.flush()
+
+
+def discover(patterns=(), roots=LESSON_ROOTS):
+    """Finds the lessons.
+    Args:
+        patterns (list): Keep lessons whose relative path contains one of
+            these (case-insensitive); all lessons when empty.
+        roots (list): Directories to search, relative to the repository
+            root.
+    Returns:
+        list: `Lesson` tuples in path order.
+    """
+    lessons = []
+    for root in roots:
+        for directory, subdirectories, files in os.walk(os.path.join(ROOT, root)):
+            subdirectories[:] = [d for d in subdirectories if not d.startswith((".", "__"))]
+            for file in files:
+                if file.endswith(".py"):
+                    path = os.path.join(directory, file)
+                    lessons.append(Lesson(os.path.relpath(path, ROOT).replace(os.sep, "/"), path))
+    lessons.sort()
+    patterns = [pattern.lower() for pattern in patterns]
+    if patterns:
+        lessons = [lesson for lesson in lessons if any(pattern in lesson.name.lower() for pattern in patterns)]
+    return lessons
+
+
+def warm_up(draw=False, kinds=WARM_KINDS):
+    """Prepares the interpreter for lessons.
+    Args:
+        draw (bool): Leave Matplotlib's backend alone, so figures can open.
+            Otherwise the headless ``Agg`` backend is selected.
+        kinds (list): Execution contexts to create ahead of time.
+    """
+    os.environ[RUNNER_ENV] = "1"
+    if not draw:
+        os.environ.setdefault("MPLBACKEND", "Agg")
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import importlib
+
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+    from qlab.execution import get_context
+
+    for kind in kinds:
+        get_context(kind)
+
+
+class _ImportTimer:
+    # Wraps builtins.__import__ and adds up the time of outermost imports.
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._depth = 0
+        self._original = builtins.__import__
+
+    def __call__(self, *args, **kwargs):
+        if self._depth:
+            return self._original(*args, **kwargs)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self._depth -= 1
+
+    def __enter__(self):
+        builtins.__import__ = self
+        return self
+
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self._original
+
+
+def run_lesson(lesson, capture=False):
+    """Runs one lesson in this interpreter.
+    Args:
+        lesson (Lesson): The lesson.
+        capture (bool): Return its output instead of printing it.
+    Returns:
+        LessonReport: Timings, output and error.
+    """
+    start = time.perf_counter()
+    with open(lesson.path, "rb") as handle:
+        code = compile(handle.read(), lesson.path, "exec")
+    build_seconds = time.perf_counter() - start
+
+    output = io.StringIO() if capture else None
+    error = None
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if capture:
+            stack.enter_context(contextlib.redirect_stdout(output))
+        timer = stack.enter_context(_ImportTimer())
+        try:
+            exec(code, {"__name__": "__main__", "__file__": lesson.path, "__builtins__": builtins})
+        except SystemExit as exit_:
+            if exit_.code not in (None, 0):
+                error = f"SystemExit: {exit_.code}"
+        except Exception:
+            error = traceback.format_exc()
+    total = time.perf_counter() - start
+    return LessonReport(lesson, timer.seconds, build_seconds, total - timer.seconds,
+                        output.getvalue() if capture else None, error)
+
+
+def _pool_initializer(draw):
+    warm_up(draw)
+
+
+def _run_captured(lesson):
+    return run_lesson(lesson, capture=True)
+
+
+def run_lessons(lessons, jobs=1, capture=False, draw=False, on_start=None, on_report=None):
+    """Runs lessons in one warmed interpreter or in a process pool.
+    Args:
+        lessons (list): `Lesson` tuples.
+        jobs (int): Worker processes; 1 runs everything here, in order.
+        capture (bool): Capture output (always done with a pool, where it
+            is returned in the reports).
+        draw (bool): See `warm_up`.
+        on_start (callable): Called with each `Lesson` before it runs
+            (sequential runs only).
+        on_report (callable): Called with each `LessonReport` as it
+            finishes.
+    Returns:
+        list: `LessonReport` tuples in lesson order.
+    """
+    reports = []
+    if jobs <= 1:
+        warm_up(draw)
+        for lesson in lessons:
+            if on_start is not None:
+                on_start(lesson)
+            report = run_lesson(lesson, capture)
+            if on_report is not None:
+                on_report(report)
+            reports.append(report)
+        return reports
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_pool_initializer, initargs=(draw,)) as pool:
+        for report in pool.map(_run_captured, lessons):
+            if on_report is not None:
+                on_report(report)
+            reports.append(report)
+    return reports
+
+
+def format_report(reports, seconds):
+    """Formats the timing table printed by `main`."""
+    width = max([len(report.lesson.name) for report in reports] + [6])
+    lines = [f"{'lesson':<{width}}{'import':>10}{'build':>10}{'run':>11}  status"]
+    for report in reports:
+        status = "ok" if report.error is None else "FAILED"
+        lines.append(f"{report.lesson.name:<{width}}{report.import_seconds * 1000:7.1f} ms"
+                     f"{report.build_seconds * 1000:7.1f} ms{report.run_seconds * 1000:8.1f} ms  {status}")
+    failed = sum(report.error is not None for report in reports)
+    lines.append(f"{len(reports)} lessons, {failed} failed, {seconds:.2f} s wall time")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Command-line entry point; returns the exit status."""
+    parser = argparse.ArgumentParser(description="Runs the Qiskit lab lessons in a warmed interpreter.")
+    parser.add_argument("patterns", nargs="*", help="run lessons whose path contains one of these")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="hide lesson output")
+    parser.add_argument("-l", "--list", action="store_true", help="list the lessons and exit")
+    parser.add_argument("--draw", action="store_true", help="let lessons open Matplotlib windows")
+    parser.add_argument("--root", action="append", help="directory to search instead of PCH.IBM.LEARNING")
+    args = parser.parse_args(argv)
+
+    lessons = discover(args.patterns, args.root or LESSON_ROOTS)
+    if args.list:
+        print("\n".join(lesson.name for lesson in lessons))
+        return 0
+    if not lessons:
+        print("no lessons match", file=sys.stderr)
+        return 1
+
+    capture = args.quiet or args.jobs > 1
+
+    def on_start(lesson):
+        # Output streams straight through, so the header goes first.
+        if not capture:
+            print(f"==== {lesson.name}", flush=True)
+
+    def on_report(report):
+        if report.output is not None and not args.quiet:
+            print(f"==== {report.lesson.name}")
+            print(report.output, end="")
+        if report.error is not None:
+            print(f"==== {report.lesson.name} failed\n{report.error}", file=sys.stderr)
+
+    start = time.perf_counter()
+    reports = run_lessons(lessons, args.jobs, capture, args.draw, on_start, on_report)
+    seconds = time.perf_counter() - start
+    print()
+    print(format_report(reports, seconds))
+    return int(any(report.error is not None for report in reports))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Bulk measurement sampling of a state with Walker alias tables.
+
+``v.measure()`` and ``v.sample_counts(4000)`` recompute the probability
+vector of the state at every call, and ``sample_memory`` draws with an
+``O(log 2**n)`` search per shot. A `StateSampler` is built once per state:
+
+* the outcome probabilities are computed once, and the marginal of any
+  subset of qubits once per subset (``qargs`` as in ``Statevector``,
+  ``qargs[0]`` the lowest bit);
+* each distribution gets an `AliasTable`, so every draw costs one uniform
+  index and one comparison, whatever the number of outcomes;
+* outcomes come back as integer arrays (`StateSampler.sample`, or
+  `StateSampler.sample_chunks` for memory-bounded streams), counts
+  (`StateSampler.sample_counts`, drawn multinomially, or a `CountsArray`)
+  or memory strings (`StateSampler.sample_memory`);
+* randomness comes from a seedable ``numpy.random.Generator``.
+
+`state_sampler` keeps the samplers of recently used states, keyed by
+content, so repeated calls on the same state reuse the tables::
+
+    counts = state_sampler(v).sample_counts(4000)
+    outcome, collapsed = state_sampler(v).measure()
+"""
+
+import copy
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+from qiskit.quantum_info import DensityMatrix, Statevector
+
+from qlab.counts import CountsArray
+
+# Samples drawn at a time by `StateSampler.sample_chunks` and `StateSampler.sample_memory`.
+CHUNK_SIZE = 2**22
+
+# Memory strings of at most this many bits are looked up in a table of all labels.
+LOOKUP_BITS = 16
+
+# Samplers kept by `state_sampler`.
+CACHE_SIZE = 16
+
+
+class AliasTable:
+    """Walker alias table of a discrete distribution.
+
+    Outcome ``i`` is drawn by picking a column ``j`` uniformly and keeping it
+    with probability ``prob[j]``, otherwise taking ``alias[j]``.
+
+    Attributes:
+        prob (numpy.ndarray): Keep probability of each column.
+        alias (numpy.ndarray): Replacement outcome of each column.
+    """
+
+    def __init__(self, probabilities):
+        """
+        Args:
+            probabilities (array_like): Non-negative weights; normalized here.
+        """
+        weights = np.asarray(probabilities, dtype=float)
+        n = len(weights)
+        scaled = weights * (n / weights.sum())
+        self.prob = np.ones(n)
+        self.alias = np.arange(n, dtype=np.int64 if n > 2**31 else np.int32)
+
+        # Vose's method, a round at a time: every small column takes its alias from the large column
+        # whose excess covers where its deficit starts, and large columns pushed below 1 become small.
+        small = np.flatnonzero(scaled < 1)
+        large = np.flatnonzero(scaled >= 1)
+        while len(small) and len(large):
+            deficits = 1 - scaled[small]
+            excess = np.cumsum(scaled[large] - 1)
+            starts = np.concatenate(([0.0], np.cumsum(deficits)[:-1]))
+            owner = np.searchsorted(excess, starts, side="right")
+            served = owner < len(large)
+            if not served.any():
+                # No excess left to hand out: the remaining columns are 1 up to rounding. Any other round settles
+                # at least one small column for good, so the loop ends after at most n rounds.
+                break
+            donors = large[owner[served]]
+            self.prob[small[served]] = scaled[small[served]]
+            self.alias[small[served]] = donors
+            scaled[large] -= np.bincount(owner[served], weights=deficits[served], minlength=len(large))[:len(large)]
+            touched = np.zeros(len(large), dtype=bool)
+            touched[owner[served]] = True
+            drop = touched & (scaled[large] < 1)
+            small = np.concatenate((small[~served], large[drop]))
+            large = large[~drop]
+        # Whatever is left is 1 up to rounding.
+        self.prob[small] = 1.0
+        self.prob[large] = 1.0
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, size, rng):
+        """Draws ``size`` outcomes.
+        Args:
+            size (int): Number of draws.
+            rng (numpy.random.Generator): Source of randomness.
+        Returns:
+            numpy.ndarray: uint64 outcomes.
+        """
+        columns = rng.integers(0, len(self.prob), size=size)
+        keep = rng.random(size) < self.prob[columns]
+        return np.where(keep, columns, self.alias[columns]).astype(np.uint64)
+
+
+def _marginal(probabilities, num_qubits, qargs):
+    # Probabilities of the qubits in qargs, qargs[0] the lowest bit, like Statevector.probabilities(qargs).
+    tensor = probabilities.reshape((2,) * num_qubits)  # axis j is qubit num_qubits - 1 - j
+    axes = [num_qubits - 1 - q for q in qargs]
+    others = tuple(axis for axis in range(num_qubits) if axis not in axes)
+    reduced = tensor.sum(axis=others)
+    # Remaining axes are in increasing axis order; put qargs[-1] first (the highest bit).
+    kept = sorted(axes)
+    return np.transpose(reduced, [kept.index(axis) for axis in reversed(axes)]).ravel()
+
+
+def _bitstrings(outcomes, num_bits):
+    # uint64 outcomes -> array of '0'/'1' strings, highest bit first.
+    shifts = np.arange(num_bits - 1, -1, -1, dtype=np.uint64)
+    digits = ((outcomes[:, None] >> shifts) & np.uint64(1)).astype(np.uint8) + ord("0")
+    return digits.view(f"S{num_bits}").ravel().astype(str)
+
+
+class StateSampler:
+    """Measurement sampler of one state, built once and reused."""
+
+    def __init__(self, state, seed=None):
+        """
+        Args:
+            state (Statevector, DensityMatrix or array_like): The state, or
+                a probability vector over ``2**n`` outcomes.
+            seed (int or numpy.random.Generator): Default source of
+                randomness.
+        """
+        self.state = state if isinstance(state, (Statevector, DensityMatrix)) else None
+        if self.state is not None:
+            probabilities = self.state.probabilities()
+        else:
+            probabilities = np.asarray(state, dtype=float)
+        self.num_qubits = int(len(probabilities)).bit_length() - 1
+        if 2**self.num_qubits != len(probabilities):
+            raise ValueError("probability vector length must be a power of two")
+        self.probabilities = probabilities / probabilities.sum()
+        self._rng = np.random.default_rng(seed)
+        self._marginals = {}
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _qargs(self, qargs):
+        if qargs is None:
+            return tuple(range(self.num_qubits))
+        qargs = tuple(int(q) for q in qargs)
+        if len(set(qargs)) != len(qargs) or not all(0 <= q < self.num_qubits for q in qargs):
+            raise ValueError(f"qargs must be distinct qubits of a {self.num_qubits}-qubit state")
+        return qargs
+
+    def _generator(self, seed):
+        return self._rng if seed is None else np.random.default_rng(seed)
+
+    def marginal(self, qargs=None):
+        """Outcome probabilities of ``qargs`` (all qubits by default), cached."""
+        qargs = self._qargs(qargs)
+        with self._lock:
+            probabilities = self._marginals.get(qargs)
+            if probabilities is None:
+                if qargs == tuple(range(self.num_qubits)):
+                    probabilities = self.probabilities
+                else:
+                    probabilities = _marginal(self.probabilities, self.num_qubits, qargs)
+                self._marginals[qargs] = probabilities
+            return probabilities
+
+    def table(self, qargs=None):
+        """The `AliasTable` of ``qargs``, built on first use."""
+        qargs = self._qargs(qargs)
+        probabilities = self.marginal(qargs)
+        with self._lock:
+            table = self._tables.get(qargs)
+            if table is None:
+                table = self._tables[qargs] = AliasTable(probabilities)
+            return table
+
+    def sample(self, shots, qargs=None, seed=None):
+        """Draws integer outcomes.
+        Args:
+            shots (int): Number of samples.
+            qargs (list): Qubits measured, ``qargs[0]`` the lowest bit; all
+                by default.
+            seed (int or numpy.random.Generator): Overrides the sampler's
+                generator for this call.
+        Returns:
+            numpy.ndarray: ``(shots,)`` uint64 outcomes.
+        """
+        return self.table(qargs).sample(shots, self._generator(seed))
+
+    def sample_chunks(self, shots, qargs=None, seed=None, chunk_size=CHUNK_SIZE):
+        """Yields `sample` results in chunks, so memory stays bounded.
+        Yields:
+            numpy.ndarray: Up to ``chunk_size`` uint64 outcomes.
+        """
+        table = self.table(qargs)
+        rng = self._generator(seed)
+        for begin in range(0, shots, chunk_size):
+            yield table.sample(min(chunk_size, shots - begin), rng)
+
+    def sample_counts(self, shots, qargs=None, seed=None):
+        """Counts of ``shots`` measurements, like ``Statevector.sample_counts``.
+
+        Counts are drawn in one multinomial draw over the (cached) marginal,
+        which costs ``O(2**len(qargs))`` whatever the number of shots.
+
+        Returns:
+            dict: Counts keyed by bitstring.
+        """
+        return self.sample_counts_array(shots, qargs, seed).to_counts()
+
+    def sample_counts_array(self, shots, qargs=None, seed=None):
+        """`sample_counts` as a `CountsArray`."""
+        qargs = self._qargs(qargs)
+        counts = self._generator(seed).multinomial(shots, self.marginal(qargs))
+        outcomes = np.flatnonzero(counts)
+        return CountsArray(outcomes, counts[outcomes], num_bits=len(qargs))
+
+    def sample_memory(self, shots, qargs=None, seed=None):
+        """Per-shot bitstrings, like ``Statevector.sample_memory``.
+        Returns:
+            numpy.ndarray: ``(shots,)`` strings, highest bit first.
+        """
+        num_bits = len(self._qargs(qargs))
+        if num_bits <= LOOKUP_BITS:
+            # Index a table of every label rather than formatting each shot.
+            labels = _bitstrings(np.arange(2**num_bits, dtype=np.uint64), num_bits)
+            return labels[self.sample(shots, qargs, seed).astype(np.intp)]
+        return np.concatenate([_bitstrings(chunk, num_bits) for chunk in self.sample_chunks(shots, qargs, seed)]
+                              or [np.empty(0, dtype=str)])
+
+    def measure(self, qargs=None, seed=None):
+        """One measurement and the collapsed state, like ``Statevector.measure``.
+        Returns:
+            tuple: ``(outcome, state)``; the outcome is a bitstring.
+        Raises:
+            TypeError: If the sampler was built from probabilities only.
+        """
+        if not isinstance(self.state, Statevector):
+            raise TypeError("measure needs a Statevector")
+        qargs = self._qargs(qargs)
+        outcome = int(self.sample(1, qargs, seed)[0])
+        # Zero the amplitudes that disagree with the outcome, one qubit axis at a time.
+        tensor = self.state.data.reshape((2,) * self.num_qubits).copy()
+        for i, qubit in enumerate(qargs):
+            index = [slice(None)] * self.num_qubits
+            index[self.num_qubits - 1 - qubit] = 1 - (outcome >> i & 1)
+            tensor[tuple(index)] = 0
+        scale = np.sqrt(self.marginal(qargs)[outcome])
+        collapsed = Statevector(tensor.ravel() / scale, dims=self.state.dims())
+        return format(outcome, f"0{len(qargs)}b"), collapsed
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+_keys = {}
+
+
+def _state_key(state):
+    qiskit_state = isinstance(state, (Statevector, DensityMatrix))
+    data = state.data if qiskit_state else np.asarray(state)
+    # Qiskit states are immutable in practice, so their data array keeps its key and is not hashed again. Plain
+    # arrays may be changed in place by the caller and are hashed on every call.
+    known = _keys.get(id(data)) if qiskit_state else None
+    if known is not None and known[0]() is data:
+        return known[1]
+    contiguous = np.ascontiguousarray(data)
+    digest = hashlib.blake2b(memoryview(contiguous).cast("B"), digest_size=16).hexdigest()
+    key = type(state).__name__, data.shape, str(data.dtype), digest
+    if qiskit_state:
+        _keys[id(data)] = weakref.ref(data, lambda _, address=id(data): _keys.pop(address, None)), key
+    return key
+
+
+def state_sampler(state, seed=None):
+    """Returns the cached `StateSampler` of a state, building it on first use.
+    Args:
+        state (Statevector, DensityMatrix or array_like): See `StateSampler`.
+            Arrays are hashed on every call, so changing one in place is
+            seen; a Qiskit state must not be changed in place.
+        seed (int): Seeds a sampler of its own, sharing the cached tables;
+            the cached sampler's generator is left alone.
+    Returns:
+        StateSampler: The sampler; equal states share one (and its tables).
+    """
+    key = _state_key(state)
+    with _cache_lock:
+        sampler = _cache.get(key)
+        if sampler is not None:
+            _cache.move_to_end(key)
+    if sampler is None:
+        sampler = StateSampler(state)
+        with _cache_lock:
+            _cache[key] = sampler
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    if seed is not None:
+        sampler = copy.copy(sampler)
+        sampler._rng = np.random.default_rng(seed)
+    return sampler
@@ -0,0 +1,366 @@
+"""Lightweight in-process statevector simulator for small lab circuits.
+
+The lab circuits have 1-3 qubits, yet every run goes through the full
+``Sampler``/``AerSimulator`` stack, whose fixed overhead is far larger than
+the arithmetic. This engine applies gate matrices directly to a NumPy state:
+
+* gate matrices come from ``to_matrix()`` and are cached per gate name and
+  parameters,
+* a k-qubit gate is one ``matmul`` on the state, reshaped (k = 1) or
+  transposed so the gate's qubits come first,
+* mid-circuit ``measure``, ``reset`` and ``if_test`` branch the simulation:
+  each branch carries its probability, its state and its classical bits,
+  so the output distribution is exact,
+* measurements at the end of the circuit do not branch; their outcome
+  distribution is read off the final states.
+
+`FastSampler` wraps it in the interface of ``Sampler().run(...).result()``,
+with exact quasi-distributions by default and multinomial sampling when
+``shots`` is given. Circuits are limited to `MAX_QUBITS` qubits.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from qiskit.circuit import Clbit, IfElseOp
+from qiskit.circuit.classical import expr
+from qiskit.primitives import SamplerResult
+from qiskit.result import QuasiDistribution
+
+MAX_QUBITS = 24
+
+# Branches below this probability are dropped.
+TOLERANCE = 1e-14
+
+_SKIPPED = frozenset(["barrier", "delay", "id"])
+
+Branch = namedtuple("Branch", ["probability", "state", "clbits"])
+Branch.__doc__ = """One outcome path of a circuit with mid-circuit measurements.
+    Attributes:
+        probability (float): Probability of reaching this branch.
+        state (numpy.ndarray): Normalized state, shape ``(2,) * n``.
+        clbits (int): Classical bits so far, clbit ``i`` is bit ``i``.
+    """
+
+
+# Matrices of gates with numeric parameters, keyed by ``(name, params)``.
+_MATRICES = {}
+MATRIX_CACHE_SIZE = 4096
+
+
+def gate_matrix(operation):
+    """Matrix of a gate, cached for gates with plain numeric parameters.
+    Args:
+        operation (Gate): The gate.
+    Returns:
+        numpy.ndarray or None: The matrix, or None if the gate has none
+            (then its ``definition`` is simulated instead).
+    """
+    try:
+        params = tuple(float(p) for p in operation.params)
+    except (TypeError, ValueError):
+        params = None
+    key = None if params is None else (operation.name, operation.num_qubits, params)
+    matrix = _MATRICES.get(key)
+    if matrix is not None:
+        return matrix
+    try:
+        matrix = np.asarray(operation.to_matrix(), dtype=complex)
+    except Exception:  # CircuitError, or no to_matrix at all
+        return None
+    if key is not None and len(_MATRICES) < MATRIX_CACHE_SIZE:
+        _MATRICES[key] = matrix
+    return matrix
+
+
+def _apply(state, matrix, axes):
+    # axes: tensor axes of the gate's qubits, highest qubit first.
+    k = len(axes)
+    n = state.ndim
+    if k == 1:
+        axis = axes[0]
+        shape = state.shape
+        flat = state.reshape(2**axis, 2, 2 ** (n - axis - 1))
+        return np.matmul(matrix, flat).reshape(shape)
+    # Bring the gate's axes to the front, multiply, and put them back.
+    order = list(axes) + [axis for axis in range(n) if axis not in axes]
+    moved = state.transpose(order).reshape(2**k, -1)
+    result = np.matmul(matrix, moved).reshape(state.shape)
+    return result.transpose(np.argsort(order))
+
+
+def _one_probability(state, axis):
+    n = state.ndim
+    flat = state.reshape(2**axis, 2, 2 ** (n - axis - 1))
+    return float(np.vdot(flat[:, 1, :], flat[:, 1, :]).real)
+
+
+def _project(state, axis, outcome, probability):
+    n = state.ndim
+    projected = state.reshape(2**axis, 2, 2 ** (n - axis - 1)).copy()
+    projected[:, 1 - outcome, :] = 0
+    return (projected / np.sqrt(probability)).reshape(state.shape)
+
+
+def _split_terminal(circuit):
+    # Splits off the trailing measurements (and barriers), which are sampled from the final state instead of
+    # branching. Returns the other instructions and the ``(qubit, clbit)`` pairs measured at the end.
+    data = list(circuit.data)
+    end = len(data)
+    while end and data[end - 1].operation.name in ("measure", "barrier"):
+        end -= 1
+    terminal = [
+        (circuit.find_bit(i.qubits[0]).index, circuit.find_bit(i.clbits[0]).index)
+        for i in data[end:]
+        if i.operation.name == "measure"
+    ]
+    return data[:end], terminal
+
+
+class StatevectorEngine:
+    """Exact simulator for circuits up to `MAX_QUBITS` qubits."""
+
+    def branches(self, circuit):
+        """Simulates a circuit, keeping every measurement branch.
+        Args:
+            circuit (QuantumCircuit): Circuit with bound parameters.
+        Returns:
+            tuple: ``(branches, terminal)`` where ``terminal`` lists the
+                ``(qubit, clbit)`` measurements left to sample.
+        Raises:
+            ValueError: If the circuit is too wide.
+            NotImplementedError: For unsupported instructions.
+        """
+        if circuit.num_qubits > MAX_QUBITS:
+            raise ValueError(f"circuit has {circuit.num_qubits} qubits, the engine supports {MAX_QUBITS}")
+        body, terminal = _split_terminal(circuit)
+        n = circuit.num_qubits
+        state = np.zeros(2**n, dtype=complex)
+        state[0] = 1
+        start = Branch(1.0, state.reshape((2,) * n) if n else state, 0)
+
+        qubit_map = [n - 1 - i for i in range(n)]  # qubit index -> tensor axis
+        clbit_map = list(range(circuit.num_clbits))
+        branches = self._run(circuit, body, [start], qubit_map, clbit_map)
+        return branches, terminal
+
+    def _run(self, circuit, instructions, branches, qubit_map, clbit_map):
+        for instruction in instructions:
+            operation = instruction.operation
+            name = operation.name
+            if name in _SKIPPED:
+                continue
+            axes = [qubit_map[circuit.find_bit(q).index] for q in instruction.qubits]
+            clbits = [clbit_map[circuit.find_bit(c).index] for c in instruction.clbits]
+
+            if name == "measure":
+                branches = self._measure(branches, axes[0], clbits[0])
+            elif name == "reset":
+                branches = self._reset(branches, axes[0])
+            elif isinstance(operation, IfElseOp):
+                branches = self._if_else(circuit, instruction, branches, axes, clbits, qubit_map, clbit_map)
+            elif getattr(operation, "blocks", None):
+                raise NotImplementedError(f"control flow '{name}' is not supported")
+            else:
+                matrix = gate_matrix(operation)
+                if matrix is not None:
+                    # Matrix bit 0 is the first qubit argument: highest qubit first on the tensor.
+                    branches = [b._replace(state=_apply(b.state, matrix, axes[::-1])) for b in branches]
+                elif operation.definition is not None:
+                    sub_map = axes
+                    definition = operation.definition
+                    inner_qubits = [sub_map[definition.find_bit(q).index] for q in definition.qubits]
+                    inner_clbits = [clbits[definition.find_bit(c).index] for c in definition.clbits]
+                    branches = self._run(definition, definition.data, branches, inner_qubits, inner_clbits)
+                else:
+                    raise NotImplementedError(f"instruction '{name}' is not supported")
+        return branches
+
+    def _measure(self, branches, axis, clbit):
+        out = []
+        for branch in branches:
+            p1 = _one_probability(branch.state, axis)
+            for outcome, p in ((0, 1 - p1), (1, p1)):
+                if p > TOLERANCE:
+                    bits = (branch.clbits & ~(1 << clbit)) | (outcome << clbit)
+                    out.append(Branch(branch.probability * p, _project(branch.state, axis, outcome, p), bits))
+        return out
+
+    def _reset(self, branches, axis):
+        x = np.array([[0, 1], [1, 0]], dtype=complex)
+        out = []
+        for branch in branches:
+            p1 = _one_probability(branch.state, axis)
+            for outcome, p in ((0, 1 - p1), (1, p1)):
+                if p > TOLERANCE:
+                    state = _project(branch.state, axis, outcome, p)
+                    if outcome:
+                        state = _apply(state, x, [axis])
+                    out.append(Branch(branch.probability * p, state, branch.clbits))
+        return out
+
+    def _if_else(self, circuit, instruction, branches, axes, clbits, qubit_map, clbit_map):
+        operation = instruction.operation
+        if isinstance(operation.condition, expr.Expr):
+            raise NotImplementedError("classical expressions in if_test are not supported")
+        target, value = operation.condition
+        if isinstance(target, Clbit):
+            indices = [clbit_map[circuit.find_bit(target).index]]
+        else:
+            indices = [clbit_map[circuit.find_bit(bit).index] for bit in target]
+
+        true_body = operation.blocks[0]
+        false_body = operation.blocks[1] if len(operation.blocks) > 1 else None
+        out = []
+        for branch in branches:
+            read = sum(((branch.clbits >> index) & 1) << i for i, index in enumerate(indices))
+            body = true_body if read == int(value) else false_body
+            if body is None:
+                out.append(branch)
+                continue
+            inner_qubits = [axes[body.find_bit(q).index] for q in body.qubits]
+            inner_clbits = [clbits[body.find_bit(c).index] for c in body.clbits]
+            out.extend(self._run(body, body.data, [branch], inner_qubits, inner_clbits))
+        return out
+
+    def probabilities(self, circuit):
+        """Exact distribution of the classical bits.
+        Args:
+            circuit (QuantumCircuit): Circuit with bound parameters.
+        Returns:
+            dict: ``{clbits as int: probability}``.
+        """
+        branches, terminal = self.branches(circuit)
+        mask, contribution, traced, distinct = _terminal_layout(tuple(terminal), circuit.num_qubits)
+
+        keys = []
+        weights = []
+        for branch in branches:
+            probs = np.abs(branch.state) ** 2
+            if traced:
+                probs = probs.sum(axis=traced)
+            # Remaining axes run from the highest measured qubit down; flatten is little-endian over them.
+            probs = np.asarray(probs).reshape(-1)
+            keys.append((branch.clbits & ~mask) | contribution)
+            weights.append(branch.probability * probs)
+
+        if len(branches) == 1 and distinct:
+            unique, totals = keys[0], weights[0]
+        else:
+            unique, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate(weights))
+        return {int(k): float(p) for k, p in zip(unique, totals) if p > TOLERANCE}
+
+
+_LAYOUTS = {}
+
+
+def _terminal_layout(terminal, num_qubits):
+    # Cached per measurement layout: clbit mask, clbit value of each outcome of the measured qubits, axes to
+    # trace out and whether every outcome lands on a different clbit value.
+    key = (terminal, num_qubits)
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        qubits = sorted({qubit for qubit, _ in terminal})
+        mask = 0
+        outcomes = np.arange(2 ** len(qubits))
+        contribution = np.zeros(len(outcomes), dtype=np.int64)
+        for qubit, clbit in terminal:
+            mask |= 1 << clbit
+            contribution = (contribution & ~(1 << clbit)) | (((outcomes >> qubits.index(qubit)) & 1) << clbit)
+        traced = tuple(num_qubits - 1 - q for q in range(num_qubits) if q not in qubits)
+        distinct = len(np.unique(contribution)) == len(contribution)
+        layout = (mask, contribution, traced, distinct)
+        if len(_LAYOUTS) < MATRIX_CACHE_SIZE:
+            _LAYOUTS[key] = layout
+    return layout
+
+
+class _DoneJob:
+    # Already finished job, mirroring ``PrimitiveJob.result()``.
+
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+    def cancel(self):
+        return False
+
+
+def _has_measure(circuit):
+    return any(
+        instruction.operation.name == "measure"
+        or any(_has_measure(block) for block in getattr(instruction.operation, "blocks", ()))
+        for instruction in circuit.data
+    )
+
+
+class FastSampler:
+    """Drop-in for ``Sampler()`` on small circuits.
+
+    ``FastSampler().run(circuit).result().quasi_dists`` matches
+    ``Sampler().run(circuit).result().quasi_dists``, computed in process.
+    """
+
+    def __init__(self, shots=None, seed=None):
+        """
+        Args:
+            shots (int): Default shots; None returns exact probabilities.
+            seed (int or numpy.random.Generator): Seed for sampling.
+        """
+        self.shots = shots
+        self.engine = StatevectorEngine()
+        self._rng = np.random.default_rng(seed)
+
+    def run(self, circuits, parameter_values=None, shots=None, seed=None):
+        """Runs circuits and returns a finished job.
+        Args:
+            circuits (QuantumCircuit or list): Circuits to run.
+            parameter_values (list): Values to bind, one sequence per circuit.
+            shots (int): Overrides the default shots.
+            seed (int): Reseeds the sampler for this call.
+        Returns:
+            object: Job whose ``result()`` is a ``SamplerResult``.
+        Raises:
+            ValueError: If a circuit has no classical bits or no measurement.
+        """
+        if not isinstance(circuits, (list, tuple)):
+            circuits = [circuits]
+            if parameter_values is not None and np.ndim(parameter_values) == 1:
+                parameter_values = [parameter_values]
+        shots = self.shots if shots is None else shots
+        rng = self._rng if seed is None else np.random.default_rng(seed)
+
+        # Same contract as the reference Sampler: only measured circuits can be sampled.
+        for i, circuit in enumerate(circuits):
+            if circuit.num_clbits == 0:
+                raise ValueError(
+                    f"The {i}-th circuit does not have any classical bit. Sampler requires classical bits, plus "
+                    "measurements on the desired qubits."
+                )
+            if not _has_measure(circuit):
+                raise ValueError(
+                    f"The {i}-th circuit does not have Measure instruction. Without measurements, the circuit "
+                    "cannot be sampled from."
+                )
+
+        quasi_dists = []
+        metadata = []
+        for i, circuit in enumerate(circuits):
+            if parameter_values is not None and len(parameter_values[i]):
+                circuit = circuit.assign_parameters(parameter_values[i])
+            probabilities = self.engine.probabilities(circuit)
+            if shots is None:
+                quasi_dists.append(QuasiDistribution(probabilities))
+                metadata.append({})
+                continue
+            keys = list(probabilities)
+            values = np.array([probabilities[k] for k in keys])
+            counts = rng.multinomial(shots, values / values.sum())
+            quasi_dists.append(
+                QuasiDistribution({k: int(c) / shots for k, c in zip(keys, counts) if c}, shots=shots)
+            )
+            metadata.append({"shots": shots})
+        return _DoneJob(SamplerResult(quasi_dists, metadata))
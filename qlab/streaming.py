@@ -0,0 +1,254 @@
+"""Streaming shots for very large shot counts.
+
+``v.sample_counts(4000)`` and ``get_counts()`` materialize a dictionary,
+and ``memory=True`` a list of strings. At 10^9 shots neither is viable.
+`stream_shots` instead yields the shots in fixed-size chunks of packed bits
+(the layout of Qiskit's ``BitArray``: one row per shot, big-endian bytes,
+bit 0 is the lowest bit of the last byte), and the aggregators below fold
+each chunk into constant-size state:
+
+* `RunningCounts`: counts per outcome,
+* `RunningMarginals`: how often each bit reads 1,
+* `RunningHistogram`: histogram of a per-shot statistic over fixed bins,
+* `MemmapSpill`: writes the raw shots to a memory-mapped file.
+
+Example::
+
+    counts, ones = RunningCounts(1), RunningMarginals(1)
+    consume(stream_shots(v, 10**9), counts, ones)
+"""
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+
+from qlab.state_sampler import AliasTable
+
+# Shots per chunk.
+CHUNK_SIZE = 2**20
+
+# Widest register `RunningCounts` keeps as a dense array (2 ** 24 int64 = 128 MiB).
+DENSE_BITS = 24
+
+
+def outcome_probabilities(source):
+    """Outcome distribution of a state or circuit.
+    Args:
+        source (Statevector, QuantumCircuit or array_like): A state, a
+            circuit (its final measurements select and order the bits,
+            otherwise every qubit is read), or a probability vector.
+    Returns:
+        tuple: ``(probabilities, num_bits)``.
+    """
+    if isinstance(source, QuantumCircuit):
+        measured = {}
+        for instruction in source.data:
+            if instruction.operation.name == "measure":
+                clbit = source.find_bit(instruction.clbits[0]).index
+                measured[clbit] = source.find_bit(instruction.qubits[0]).index
+        state = Statevector(source.remove_final_measurements(inplace=False))
+        if measured:
+            qargs = [measured[clbit] for clbit in sorted(measured)]
+            return state.probabilities(qargs), len(qargs)
+        return state.probabilities(), state.num_qubits
+    if isinstance(source, Statevector):
+        return source.probabilities(), source.num_qubits
+
+    probabilities = np.asarray(source, dtype=float)
+    num_bits = int(np.log2(len(probabilities)))
+    if 2**num_bits != len(probabilities):
+        raise ValueError("probability vector length must be a power of two")
+    return probabilities, num_bits
+
+
+def num_bytes(num_bits):
+    """Bytes per shot in the packed layout."""
+    return max(1, (num_bits + 7) // 8)
+
+
+def ints_to_packed(outcomes, num_bits):
+    """Packs integer outcomes into ``BitArray``-style rows.
+    Args:
+        outcomes (numpy.ndarray): Integer outcomes, at most 64 bits.
+        num_bits (int): Bits per shot.
+    Returns:
+        numpy.ndarray: ``(shots, num_bytes(num_bits))`` uint8.
+    """
+    width = num_bytes(num_bits)
+    big_endian = np.ascontiguousarray(outcomes, dtype=">u8")
+    return big_endian.view(np.uint8).reshape(-1, 8)[:, 8 - width:]
+
+
+def packed_to_ints(packed, num_bits):
+    """Inverse of `ints_to_packed`.
+    Returns:
+        numpy.ndarray: uint64 outcomes.
+    """
+    shots, width = packed.shape
+    padded = np.zeros((shots, 8), dtype=np.uint8)
+    padded[:, 8 - width:] = packed
+    return padded.view(">u8").ravel().astype(np.uint64)
+
+
+def stream_shots(source, shots, chunk_size=CHUNK_SIZE, seed=None):
+    """Yields ``shots`` samples in packed chunks.
+
+    Memory use is bounded by ``chunk_size`` whatever the number of shots.
+
+    Args:
+        source: Anything `outcome_probabilities` accepts.
+        shots (int): Total number of shots.
+        chunk_size (int): Shots per chunk (the last one may be shorter).
+        seed (int or numpy.random.Generator): Makes the stream reproducible.
+    Yields:
+        numpy.ndarray: ``(n, num_bytes)`` uint8 chunk of shots.
+    """
+    probabilities, num_bits = outcome_probabilities(source)
+    # One alias table for the whole stream: each chunk then costs O(chunk_size), not a CDF search per shot.
+    table = AliasTable(probabilities)
+    rng = np.random.default_rng(seed)
+    remaining = shots
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        outcomes = table.sample(size, rng)
+        yield ints_to_packed(outcomes, num_bits)
+        remaining -= size
+
+
+class RunningCounts:
+    """Counts per outcome, accumulated chunk by chunk.
+
+    Registers up to `DENSE_BITS` wide use a dense array; wider ones keep
+    sorted ``(outcome, count)`` arrays, whose size grows with the number of
+    distinct outcomes only.
+    """
+
+    def __init__(self, num_bits):
+        self.num_bits = num_bits
+        self.shots = 0
+        if num_bits <= DENSE_BITS:
+            self._dense = np.zeros(2**num_bits, dtype=np.int64)
+        else:
+            self._dense = None
+            self._keys = np.empty(0, dtype=np.uint64)
+            self._counts = np.empty(0, dtype=np.int64)
+
+    def update(self, packed):
+        outcomes = packed_to_ints(packed, self.num_bits)
+        self.shots += len(outcomes)
+        if self._dense is not None:
+            self._dense += np.bincount(outcomes, minlength=len(self._dense))
+            return
+        keys, counts = np.unique(outcomes, return_counts=True)
+        keys = np.concatenate([self._keys, keys])
+        counts = np.concatenate([self._counts, counts])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        self._counts = np.bincount(inverse, weights=counts, minlength=len(self._keys)).astype(np.int64)
+
+    def arrays(self):
+        """Returns ``(outcomes, counts)`` for the outcomes seen."""
+        if self._dense is not None:
+            outcomes = np.flatnonzero(self._dense)
+            return outcomes.astype(np.uint64), self._dense[outcomes]
+        return self._keys, self._counts
+
+    def to_dict(self):
+        """Counts keyed by bitstring, like ``get_counts()``."""
+        outcomes, counts = self.arrays()
+        return {format(int(o), f"0{self.num_bits}b"): int(c) for o, c in zip(outcomes, counts)}
+
+
+class RunningMarginals:
+    """How often each bit reads 1."""
+
+    def __init__(self, num_bits):
+        self.num_bits = num_bits
+        self.shots = 0
+        self.ones = np.zeros(num_bits, dtype=np.int64)
+
+    def update(self, packed):
+        self.shots += len(packed)
+        # unpackbits is big-endian: reverse so index i is bit i.
+        bits = np.unpackbits(packed, axis=1)[:, ::-1][:, :self.num_bits]
+        self.ones += bits.sum(axis=0, dtype=np.int64)
+
+    def probabilities(self):
+        """numpy.ndarray: P(bit i = 1)."""
+        return self.ones / max(self.shots, 1)
+
+
+class RunningHistogram:
+    """Histogram of a per-shot statistic over fixed bins."""
+
+    def __init__(self, num_bits, bins, range, statistic=None):
+        """
+        Args:
+            num_bits (int): Bits per shot.
+            bins (int): Number of bins.
+            range (tuple): ``(low, high)``; fixed so memory stays constant.
+            statistic (callable): Maps a uint64 array of outcomes to values;
+                defaults to the outcome itself.
+        """
+        self.num_bits = num_bits
+        self.edges = np.linspace(range[0], range[1], bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.statistic = statistic
+
+    def update(self, packed):
+        values = packed_to_ints(packed, self.num_bits)
+        if self.statistic is not None:
+            values = self.statistic(values)
+        self.counts += np.histogram(values, bins=self.edges)[0]
+
+
+def hamming_weight(outcomes):
+    """Number of ones in each outcome (a `RunningHistogram` statistic)."""
+    bits = outcomes.astype(">u8").view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(bits, axis=1).sum(axis=1)
+
+
+class MemmapSpill:
+    """Writes packed shots to a memory-mapped file as they stream by.
+
+    The file is raw uint8 rows; `load_spill` maps it back without reading
+    it into memory.
+    """
+
+    def __init__(self, path, num_bits, shots):
+        self.path = path
+        self.num_bits = num_bits
+        self.offset = 0
+        self._map = np.memmap(path, dtype=np.uint8, mode="w+", shape=(shots, num_bytes(num_bits)))
+
+    def update(self, packed):
+        self._map[self.offset:self.offset + len(packed)] = packed
+        self.offset += len(packed)
+
+    def close(self):
+        """Flushes the file."""
+        self._map.flush()
+
+
+def load_spill(path, num_bits):
+    """Maps a `MemmapSpill` file read-only.
+    Returns:
+        numpy.memmap: ``(shots, num_bytes)`` uint8.
+    """
+    return np.memmap(path, dtype=np.uint8, mode="r").reshape(-1, num_bytes(num_bits))
+
+
+def consume(stream, *aggregators):
+    """Feeds every chunk of a stream to each aggregator.
+    Returns:
+        int: Number of shots consumed.
+    """
+    shots = 0
+    for packed in stream:
+        for aggregator in aggregators:
+            aggregator.update(packed)
+        shots += len(packed)
+    for aggregator in aggregators:
+        close = getattr(aggregator, "close", None)
+        if close is not None:
+            close()
+    return shots
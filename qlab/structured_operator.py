@@ -0,0 +1,318 @@
+"""Compact operators: Pauli strings, diagonals, permutations and CSR.
+
+The lab's ``X, Y, Z, S, T`` are dense ``Operator`` objects, and their tensor
+products are dense ``2**n x 2**n`` matrices. Most of them have one nonzero
+entry per row and column (X is a permutation, Z, S and T are diagonal,
+every Pauli is a permutation times phases), and so do their products and
+tensor products. This module keeps them compact:
+
+* `MonomialOperator`: tensor product of small factors, each stored as a
+  permutation and one phase per column. Pauli strings, diagonal and
+  permutation gates and their products use ``O(n)`` memory, and applying
+  one to a state is a few ``O(2**n)`` vectorized gathers per factor, never
+  a ``4**n`` matrix.
+* `SparseOperator`: SciPy CSR matrix for everything else (``H`` and
+  friends), used when a product leaves the monomial family.
+
+`structured` picks the representation::
+
+    op = structured(T).tensor(structured(X)).tensor(structured(Pauli("ZZ")))
+    v = op.evolve(Statevector.from_label("0000"))
+"""
+
+from functools import reduce
+
+import numpy as np
+from qiskit.quantum_info import Operator, Pauli, Statevector
+
+from qlab.lazy_tensor import LazyOperator, _common_blocks
+
+# Entries below this magnitude count as zero when detecting structure.
+TOLERANCE = 1e-12
+
+# Adjacent factors are merged into blocks of up to this many qubits before being applied, so a state is
+# traversed once per block rather than once per qubit.
+BLOCK_QUBITS = 8
+
+_PAULI_FACTORS = {
+    "I": (np.array([0, 1]), np.array([1, 1], dtype=complex)),
+    "X": (np.array([1, 0]), np.array([1, 1], dtype=complex)),
+    "Y": (np.array([1, 0]), np.array([1j, -1j])),
+    "Z": (np.array([0, 1]), np.array([1, -1], dtype=complex)),
+}
+
+_LABEL_PHASES = {"": 1, "-": -1, "i": 1j, "-i": -1j}
+
+
+def _num_qubits(dim):
+    n = int(dim).bit_length() - 1
+    if 2**n != dim:
+        raise ValueError("structured operators act on qubits only")
+    return n
+
+
+class Monomial:
+    """One factor: ``M[perm[j], j] = phases[j]``, every other entry zero."""
+
+    __slots__ = ("perm", "phases")
+
+    def __init__(self, perm, phases):
+        self.perm = np.asarray(perm, dtype=np.int64)
+        self.phases = np.asarray(phases, dtype=complex)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """Monomial form of a matrix, or None if it is not monomial."""
+        matrix = np.asarray(matrix)
+        nonzero = np.abs(matrix) > TOLERANCE
+        if not (np.all(nonzero.sum(axis=0) == 1) and np.all(nonzero.sum(axis=1) == 1)):
+            return None
+        perm = np.argmax(nonzero, axis=0)
+        return cls(perm, matrix[perm, np.arange(len(perm))])
+
+    @property
+    def dim(self):
+        return len(self.perm)
+
+    def is_identity(self):
+        return np.array_equal(self.perm, np.arange(self.dim)) and np.allclose(self.phases, 1)
+
+    def kron(self, other):
+        """``self ⊗ other``."""
+        perm = np.add.outer(self.perm * other.dim, other.perm).ravel()
+        return Monomial(perm, np.multiply.outer(self.phases, other.phases).ravel())
+
+    def then(self, other):
+        """``other @ self``: apply ``self``, then ``other``."""
+        return Monomial(other.perm[self.perm], self.phases * other.phases[self.perm])
+
+    def adjoint(self):
+        inverse = np.empty_like(self.perm)
+        inverse[self.perm] = np.arange(self.dim)
+        return Monomial(inverse, np.conj(self.phases[inverse]))
+
+    def to_matrix(self):
+        matrix = np.zeros((self.dim, self.dim), dtype=complex)
+        matrix[self.perm, np.arange(self.dim)] = self.phases
+        return matrix
+
+    def apply(self, tensor, axis):
+        # out[perm[j]] = phases[j] * v[j] along ``axis``; diagonal factors need no gather.
+        shape = [1] * tensor.ndim
+        shape[axis] = self.dim
+        if np.array_equal(self.perm, np.arange(self.dim)):
+            return tensor * self.phases.reshape(shape)
+        inverse = np.empty_like(self.perm)
+        inverse[self.perm] = np.arange(self.dim)
+        return np.take(tensor, inverse, axis=axis) * self.phases[inverse].reshape(shape)
+
+
+class MonomialOperator:
+    """Tensor product of `Monomial` factors, in tensor order (last factor
+    holds qubit 0), times a global phase."""
+
+    def __init__(self, factors, phase=1.0):
+        """
+        Args:
+            factors (list): `Monomial` factors, in tensor order.
+            phase (complex): Global phase.
+        """
+        self.factors = list(factors)
+        self.phase = complex(phase)
+        self._sizes = [_num_qubits(f.dim) for f in self.factors]
+        self._blocks = None
+
+    @classmethod
+    def from_pauli(cls, pauli):
+        """Pauli string in ``O(n)`` memory."""
+        label = Pauli(pauli).to_label()
+        letters = label.lstrip("-i")
+        factors = [Monomial(*_PAULI_FACTORS[letter]) for letter in letters]
+        return cls(factors, _LABEL_PHASES[label[:len(label) - len(letters)]])
+
+    @property
+    def num_qubits(self):
+        """int: Number of qubits."""
+        return sum(self._sizes)
+
+    @property
+    def nbytes(self):
+        """int: Memory held by the factors."""
+        return sum(f.perm.nbytes + f.phases.nbytes for f in self.factors)
+
+    def is_diagonal(self):
+        """bool: True if every factor is diagonal."""
+        return all(np.array_equal(f.perm, np.arange(f.dim)) for f in self.factors)
+
+    def is_permutation(self):
+        """bool: True if every phase is 1 (global phase included)."""
+        return np.isclose(self.phase, 1) and all(np.allclose(f.phases, 1) for f in self.factors)
+
+    def __repr__(self):
+        return f"MonomialOperator({self.num_qubits} qubits, {len(self.factors)} factors)"
+
+    def tensor(self, other):
+        """``self ⊗ other``; stays monomial if ``other`` is."""
+        other = structured(other)
+        if isinstance(other, MonomialOperator):
+            return MonomialOperator(self.factors + other.factors, self.phase * other.phase)
+        return self.to_sparse().tensor(other)
+
+    def expand(self, other):
+        """``other ⊗ self``."""
+        return structured(other).tensor(self)
+
+    def compose(self, other):
+        """``other`` applied after ``self``, as in ``Operator.compose``."""
+        other = structured(other)
+        if not isinstance(other, MonomialOperator):
+            return self.to_sparse().compose(other)
+        factors = []
+        i = j = 0
+        for count_self, count_other in _common_blocks(self._sizes, other._sizes):
+            mine = reduce(Monomial.kron, self.factors[i:i + count_self])
+            theirs = reduce(Monomial.kron, other.factors[j:j + count_other])
+            factors.append(mine.then(theirs))
+            i += count_self
+            j += count_other
+        return MonomialOperator(factors, self.phase * other.phase)
+
+    def adjoint(self):
+        """Factor-wise adjoint."""
+        return MonomialOperator([f.adjoint() for f in self.factors], np.conj(self.phase))
+
+    def apply(self, states):
+        """Applies the operator to one state or a batch of states (rows).
+        Args:
+            states (numpy.ndarray): ``(2**n,)`` or ``(batch, 2**n)``.
+        Returns:
+            numpy.ndarray: The transformed states, same shape.
+        """
+        states = np.asarray(states, dtype=complex)
+        lead = states.shape[:-1]
+        blocks = self._merged_blocks()
+        tensor = states.reshape(lead + tuple(f.dim for f in blocks))
+        for axis, factor in enumerate(blocks, start=len(lead)):
+            if not factor.is_identity():
+                tensor = factor.apply(tensor, axis)
+        return self.phase * tensor.reshape(states.shape)
+
+    def _merged_blocks(self):
+        if self._blocks is None:
+            blocks = []
+            size = BLOCK_QUBITS
+            for factor, qubits in zip(self.factors, self._sizes):
+                if blocks and size + qubits <= BLOCK_QUBITS:
+                    blocks[-1] = blocks[-1].kron(factor)
+                    size += qubits
+                else:
+                    blocks.append(factor)
+                    size = qubits
+            self._blocks = blocks
+        return self._blocks
+
+    def evolve(self, state):
+        """Like ``Statevector.evolve`` on the whole register."""
+        state = state if isinstance(state, Statevector) else Statevector(state)
+        return Statevector(self.apply(state.data), dims=state.dims())
+
+    def to_sparse(self):
+        """The operator as a `SparseOperator`."""
+        from scipy import sparse
+
+        dim = 2**self.num_qubits
+        merged = reduce(Monomial.kron, self.factors)
+        matrix = sparse.csr_matrix((merged.phases * self.phase, (merged.perm, np.arange(dim))), shape=(dim, dim))
+        return SparseOperator(matrix)
+
+    def to_operator(self):
+        """Materializes the dense ``Operator``."""
+        return Operator(self.phase * reduce(Monomial.kron, self.factors).to_matrix())
+
+
+class SparseOperator:
+    """Operator stored as a SciPy CSR matrix."""
+
+    def __init__(self, matrix):
+        """
+        Args:
+            matrix (scipy.sparse matrix or array_like): The operator.
+        """
+        from scipy import sparse
+
+        self.matrix = sparse.csr_matrix(matrix, dtype=complex)
+        if self.matrix.shape[0] != self.matrix.shape[1]:
+            raise ValueError("operators must be square")
+        self.num_qubits = _num_qubits(self.matrix.shape[0])
+
+    @property
+    def nbytes(self):
+        """int: Memory held by the CSR arrays."""
+        m = self.matrix
+        return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+
+    def __repr__(self):
+        return f"SparseOperator({self.num_qubits} qubits, {self.matrix.nnz} nonzeros)"
+
+    def _other(self, other):
+        other = structured(other)
+        return other.to_sparse().matrix if isinstance(other, MonomialOperator) else other.matrix
+
+    def to_sparse(self):
+        return self
+
+    def tensor(self, other):
+        """``self ⊗ other``."""
+        from scipy import sparse
+
+        return SparseOperator(sparse.kron(self.matrix, self._other(other), format="csr"))
+
+    def expand(self, other):
+        """``other ⊗ self``."""
+        return structured(other).tensor(self)
+
+    def compose(self, other):
+        """``other`` applied after ``self``, as in ``Operator.compose``."""
+        return SparseOperator(self._other(other) @ self.matrix)
+
+    def adjoint(self):
+        return SparseOperator(self.matrix.conj().T)
+
+    def apply(self, states):
+        """Applies the operator to one state or a batch of states (rows)."""
+        states = np.asarray(states, dtype=complex)
+        if states.ndim == 1:
+            return self.matrix @ states
+        return (self.matrix @ states.T).T
+
+    def evolve(self, state):
+        """Like ``Statevector.evolve`` on the whole register."""
+        state = state if isinstance(state, Statevector) else Statevector(state)
+        return Statevector(self.apply(state.data), dims=state.dims())
+
+    def to_operator(self):
+        """Materializes the dense ``Operator``."""
+        return Operator(self.matrix.toarray())
+
+
+def structured(operator):
+    """Compact form of an operator.
+    Args:
+        operator: A ``Pauli`` or Pauli label, ``Operator``, gate, array,
+            `LazyOperator` (converted factor by factor) or an operator of
+            this module.
+    Returns:
+        MonomialOperator or SparseOperator: `MonomialOperator` when every
+            factor is monomial, `SparseOperator` otherwise.
+    """
+    if isinstance(operator, (MonomialOperator, SparseOperator)):
+        return operator
+    if isinstance(operator, (Pauli, str)):
+        return MonomialOperator.from_pauli(operator)
+    if isinstance(operator, LazyOperator):
+        return reduce(lambda a, b: a.tensor(b), [structured(f) for f in operator.factors])
+    matrix = operator.data if isinstance(operator, Operator) else np.asarray(Operator(operator).data)
+    monomial = Monomial.from_matrix(matrix)
+    if monomial is not None:
+        return MonomialOperator([monomial])
+    return SparseOperator(matrix)
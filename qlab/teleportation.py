@@ -0,0 +1,278 @@
+"""Teleportation benchmark harness over batches of random unitaries.
+
+``02_Teleportation_Protocol_RandomGate.py`` checks one random ``UGate``: it
+builds the test circuit, composes the protocol, appends the inverse gate and
+runs it once. Here the gate's ``theta``, ``phi`` and ``lam`` are circuit
+parameters, so the test circuit is built and transpiled once and every
+random unitary is just one more set of parameter values in an Aer job.
+
+The fidelity of a run is the probability that the ``Result`` bit reads 0,
+i.e. that ``U^-1`` applied to Bob's qubit undid ``U`` applied to Alice's.
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+from numpy import pi
+from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+from qiskit.circuit import Parameter
+from qiskit.result import marginal_distribution
+
+from qlab.counts import CountsArray
+from qlab.deferred_measurement import defer_measurements
+from qlab.transpile_cache import cached_transpile, structural_hash
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Unitaries per Aer job.
+BATCH_SIZE = 1000
+
+
+def teleportation_protocol():
+    """Builds the teleportation protocol of the lesson.
+    Returns:
+        QuantumCircuit: Protocol on qubits ``Q``, ``A``, ``B`` with Alice's
+            measurement results in ``a`` and ``b``.
+    """
+    qubit = QuantumRegister(1, "Q")
+    ebit0 = QuantumRegister(1, "A")
+    ebit1 = QuantumRegister(1, "B")
+    a = ClassicalRegister(1, "a")
+    b = ClassicalRegister(1, "b")
+
+    protocol = QuantumCircuit(qubit, ebit0, ebit1, a, b)
+
+    # Prepare ebit used for teleportation
+    protocol.h(ebit0)
+    protocol.cx(ebit0, ebit1)
+    protocol.barrier()
+
+    # Alice's operations
+    protocol.cx(qubit, ebit0)
+    protocol.h(qubit)
+    protocol.barrier()
+
+    # Alice measures and sends classical bits to Bob
+    protocol.measure(ebit0, a)
+    protocol.measure(qubit, b)
+    protocol.barrier()
+
+    # Bob uses the classical bits to conditionally apply gates
+    with protocol.if_test((a, 1)):
+        protocol.x(ebit1)
+    with protocol.if_test((b, 1)):
+        protocol.z(ebit1)
+
+    return protocol
+
+
+def teleportation_test_template():
+    """Builds the random-gate test with ``theta``, ``phi``, ``lam`` unbound.
+    Returns:
+        QuantumCircuit: ``U`` on ``Q``, the protocol, ``U^-1`` on ``B`` and a
+            measurement of ``B`` into ``Result`` (clbit 2).
+    """
+    theta, phi, lam = Parameter("theta"), Parameter("phi"), Parameter("lam")
+    protocol = teleportation_protocol()
+    qubit, _, ebit1 = protocol.qregs
+
+    test = QuantumCircuit(*protocol.qregs, *protocol.cregs)
+    test.u(theta, phi, lam, qubit)
+    test.barrier()
+    test.compose(protocol, inplace=True)
+    test.barrier()
+
+    # U(theta, phi, lam)^-1 = U(-theta, -lam, -phi)
+    test.u(-theta, -lam, -phi, ebit1)
+
+    result = ClassicalRegister(1, "Result")
+    test.add_register(result)
+    test.measure(ebit1, result)
+    return test
+
+
+# Preparations of the six single-qubit stabilizer states from |0>.
+STABILIZER_PREPARATIONS = [[], ["x"], ["h"], ["x", "h"], ["h", "s"], ["x", "h", "s"]]
+
+_INVERSE_GATES = {"x": "x", "h": "h", "s": "sdg"}
+
+
+def parallel_teleportation_circuit(copies, seed=None):
+    """Runs ``copies`` teleportations side by side, on Clifford states only.
+
+    Copy ``i`` prepares a random stabilizer state on ``Q[i]``, teleports it to
+    ``B[i]`` through ``A[i]`` (corrections by ``if_test``), undoes the
+    preparation on ``B[i]`` and measures it into ``Result[i]``. The circuit is
+    Clifford, so it runs on the stabilizer simulator at any width, and every
+    ``Result`` bit reads 0 when teleportation works.
+
+    Args:
+        copies (int): Number of teleportations (``3 * copies`` qubits).
+        seed (int): Seeds the choice of states.
+    Returns:
+        QuantumCircuit: The test circuit.
+    """
+    rng = np.random.default_rng(seed)
+    qubit = QuantumRegister(copies, "Q")
+    ebit0 = QuantumRegister(copies, "A")
+    ebit1 = QuantumRegister(copies, "B")
+    a = ClassicalRegister(copies, "a")
+    b = ClassicalRegister(copies, "b")
+    result = ClassicalRegister(copies, "Result")
+    test = QuantumCircuit(qubit, ebit0, ebit1, a, b, result)
+
+    preparations = [STABILIZER_PREPARATIONS[k] for k in rng.integers(len(STABILIZER_PREPARATIONS), size=copies)]
+    for i, gates in enumerate(preparations):
+        for gate in gates:
+            getattr(test, gate)(qubit[i])
+    test.h(ebit0)
+    test.cx(ebit0, ebit1)
+    test.cx(qubit, ebit0)
+    test.h(qubit)
+    test.measure(ebit0, a)
+    test.measure(qubit, b)
+    for i in range(copies):
+        with test.if_test((a[i], 1)):
+            test.x(ebit1[i])
+        with test.if_test((b[i], 1)):
+            test.z(ebit1[i])
+    for i, gates in enumerate(preparations):
+        for gate in reversed(gates):
+            getattr(test, _INVERSE_GATES[gate])(ebit1[i])
+    test.measure(ebit1, result)
+    return test
+
+
+def random_unitary_angles(num_unitaries, rng):
+    """Draws ``UGate`` angles the way the lesson does.
+    Args:
+        num_unitaries (int): Number of gates.
+        rng (numpy.random.Generator): Source of randomness.
+    Returns:
+        numpy.ndarray: ``(num_unitaries, 3)`` rows of ``(theta, phi, lam)``,
+            each uniform in ``[0, 2 pi)``.
+    """
+    return rng.random((num_unitaries, 3)) * 2 * pi
+
+
+TeleportationReport = namedtuple(
+    "TeleportationReport", ["angles", "fidelities", "shots", "seconds", "unitaries_per_second", "max_rss_mb"]
+)
+TeleportationReport.__doc__ = """Outcome of `run_teleportation_benchmark`.
+    Attributes:
+        angles (numpy.ndarray): ``(n, 3)`` gate angles.
+        fidelities (numpy.ndarray): ``(n,)`` fraction of shots with
+            ``Result`` = 0.
+        shots (int): Shots per unitary.
+        seconds (float): Wall time, transpilation included.
+        unitaries_per_second (float): Throughput.
+        max_rss_mb (float): Peak resident memory of the process, or None
+            where the platform does not report it.
+    """
+
+
+def max_rss_mb():
+    """Peak resident memory of the process in MiB, or None where the
+    ``resource`` module is missing (Windows)."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_teleportation_benchmark(num_unitaries, shots=64, batch_size=BATCH_SIZE, seed=None, simulator=None,
+                                defer=False, store=None):
+    """Teleports ``num_unitaries`` random states and measures the fidelity.
+    Args:
+        num_unitaries (int): Number of random unitaries.
+        shots (int): Shots per unitary.
+        batch_size (int): Unitaries per Aer job.
+        seed (int): Seeds both the angles and the simulator.
+        simulator (AerSimulator): Defaults to a new ``AerSimulator()``.
+        defer (bool): Replace Bob's ``if_test`` corrections by controlled
+            gates (see `qlab.deferred_measurement`), so shots are sampled
+            rather than simulated one by one.
+        store (ResultStore): Archives the counts of every unitary, with its
+            angles as parameters (see `qlab.result_store`).
+    Returns:
+        TeleportationReport: Fidelity distribution, throughput and memory.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    if simulator is None:
+        from qiskit_aer import AerSimulator
+
+        simulator = AerSimulator()
+
+    template = teleportation_test_template()
+    if defer:
+        template = defer_measurements(template)[0]
+    template = cached_transpile(template, simulator)
+    parameters = {parameter.name: parameter for parameter in template.parameters}
+    theta, phi, lam = parameters["theta"], parameters["phi"], parameters["lam"]
+
+    circuit_hash = structural_hash(template) if store is not None else None
+    angles = random_unitary_angles(num_unitaries, rng)
+    fidelities = np.empty(num_unitaries)
+    for begin in range(0, num_unitaries, batch_size):
+        batch = angles[begin:begin + batch_size]
+        binds = {theta: batch[:, 0], phi: batch[:, 1], lam: batch[:, 2]}
+        batch_seed = None if seed is None else seed + begin
+        run_start = time.perf_counter()
+        result = simulator.run(template, parameter_binds=[binds], shots=shots, seed_simulator=batch_seed).result()
+        run_seconds = time.perf_counter() - run_start
+        for i in range(len(batch)):
+            # Keep only the Result bit, as in the lesson.
+            counts = marginal_distribution(result.get_counts(i), [2])
+            fidelities[begin + i] = counts.get("0", 0) / shots
+            if store is not None:
+                store.append(
+                    CountsArray.from_result(result, i), circuit=circuit_hash, seed=batch_seed, backend=simulator,
+                    parameters=dict(zip(("theta", "phi", "lam"), batch[i])), timings={"batch_run": run_seconds},
+                    batch=begin // batch_size,
+                )
+
+    if store is not None:
+        store.flush()
+    seconds = time.perf_counter() - start
+    return TeleportationReport(angles, fidelities, shots, seconds, num_unitaries / seconds, max_rss_mb())
+
+
+def teleportation_fidelities(angles, protocol=None):
+    """Exact fidelities of teleporting ``U(theta, phi, lam)|0>``, in one pass.
+
+    The protocol's corrections are deferred (`qlab.deferred_measurement`),
+    its unitary is applied to every input state with one matrix product,
+    and Bob's Bloch vectors come from one `qlab.estimator.pauli_expectations`
+    call. The fidelity with the input, whose Bloch vector is ``n``, is
+    ``(1 + n . r) / 2``.
+
+    Args:
+        angles (numpy.ndarray): ``(n, 3)`` rows of ``(theta, phi, lam)``,
+            e.g. from `random_unitary_angles`.
+        protocol (QuantumCircuit): Defaults to `teleportation_protocol`;
+            qubit 0 is teleported to qubit 2.
+    Returns:
+        numpy.ndarray: ``(n,)`` fidelities, 1 for the ideal protocol.
+    """
+    from qiskit.quantum_info import Operator
+
+    from qlab.estimator import pauli_expectations
+
+    angles = np.asarray(angles, dtype=float).reshape(-1, 3)
+    protocol = teleportation_protocol() if protocol is None else protocol
+    unitary = Operator(defer_measurements(protocol)[0].remove_final_measurements(inplace=False)).data
+
+    theta, phi = angles[:, 0], angles[:, 1]
+    states = np.zeros((len(angles), 2**protocol.num_qubits), dtype=complex)
+    states[:, 0] = np.cos(theta / 2)
+    states[:, 1] = np.exp(1j * phi) * np.sin(theta / 2)
+    states = states @ unitary.T
+
+    bloch = pauli_expectations(states, ["XII", "YII", "ZII"])
+    inputs = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], axis=1)
+    return (1 + np.sum(inputs * bloch, axis=1)) / 2
@@ -0,0 +1,366 @@
+"""On-disk transpilation cache keyed by circuit structure.
+
+The lessons rebuild structurally identical circuits on every run (and the
+CHSH loop on every round), and each one is transpiled again. This module
+keys transpiled circuits on:
+
+* a canonical structural hash of the input circuit: registers, gates,
+  qubit/clbit arguments, gate parameters (unbound ``Parameter`` objects by
+  name), the definitions of non-standard gates, control-flow blocks,
+  conditions and switch cases,
+* the backend (name, version, number of qubits, supported operations),
+* the optimization level,
+
+and keeps them in two layers: a small in-memory LRU for inner loops and a
+directory of pickles that survives between runs. The directory is versioned
+by Qiskit version and `CACHE_VERSION`, so upgrading Qiskit (or changing the
+key) drops the old entries. Pickle is
+used rather than QPY because QPY loses simulator instructions such as
+``save_probabilities``.
+
+Set ``QLAB_CACHE_DIR`` to move the cache (default ``~/.cache/qlab``).
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+import weakref
+from collections import OrderedDict
+
+import qiskit
+from qiskit import transpile
+from qiskit.circuit import ParameterExpression, SwitchCaseOp
+from qiskit.circuit.classical import expr
+from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+
+# Entries kept on disk and in memory.
+MAX_ENTRIES = 256
+MEMORY_ENTRIES = 64
+
+# Bumped when the structural hash changes, so entries keyed by the old one are dropped.
+CACHE_VERSION = 2
+
+_STANDARD_GATES = {name: type(gate) for name, gate in get_standard_gate_name_mapping().items()}
+
+
+def cache_root():
+    """Returns the root directory of the lab's on-disk caches."""
+    return os.environ.get("QLAB_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "qlab")
+
+
+def _param_token(value):
+    if isinstance(value, ParameterExpression):
+        # Unbound parameters hash by name, so rebinding does not miss.
+        return "P:" + str(value)
+    if isinstance(value, qiskit.QuantumCircuit):
+        return "C:" + structural_hash(value)
+    if hasattr(value, "tolist"):
+        return "A:" + repr(value.tolist())
+    return repr(value)
+
+
+def _bit_token(circuit, bit):
+    return circuit.find_bit(bit).index
+
+
+def _expr_token(circuit, node):
+    # The repr of an expression names loose clbits by memory address; use bit indices instead.
+    if isinstance(node, expr.Var):
+        if isinstance(node.var, qiskit.circuit.Clbit):
+            target = ("bit", _bit_token(circuit, node.var))
+        elif isinstance(node.var, qiskit.ClassicalRegister):
+            target = ("reg", node.var.name, node.var.size)
+        else:
+            target = ("var", node.name)
+        return ("Var", target, repr(node.type))
+    if isinstance(node, expr.Value):
+        return ("Value", repr(node.value), repr(node.type))
+    fields = (getattr(node, name) for name in node.__slots__)
+    return (type(node).__name__, repr(node.type)) + tuple(
+        _expr_token(circuit, field) if isinstance(field, expr.Expr) else repr(field) for field in fields
+    )
+
+
+def _condition_token(circuit, condition):
+    if condition is None:
+        return None
+    if isinstance(condition, expr.Expr):
+        return ("expr", _expr_token(circuit, condition))
+    target, value = condition
+    if isinstance(target, qiskit.ClassicalRegister):
+        return ("reg", target.name, target.size, value)
+    return ("bit", _bit_token(circuit, target), value)
+
+
+def _definition_token(operation):
+    # Standard gates are fixed by name and parameters. Any other operation may share its name with a different
+    # body (two custom gates called "prep"), so its class and, when it has one, its definition are hashed too.
+    # Library gates that build their definition lazily are fixed by class and parameters.
+    if _STANDARD_GATES.get(operation.name) is type(operation):
+        return None
+    base = getattr(operation, "base_gate", None)
+    definition = getattr(operation, "_definition", None)
+    return (
+        f"{type(operation).__module__}.{type(operation).__qualname__}",
+        None if base is None else (base.name, tuple(_param_token(p) for p in base.params), _definition_token(base)),
+        None if definition is None else _structure(definition),
+    )
+
+
+def _switch_token(circuit, operation):
+    if not isinstance(operation, SwitchCaseOp):
+        return None
+    target = operation.target
+    target = _condition_token(circuit, target if isinstance(target, expr.Expr) else (target, None))
+    return target, tuple(tuple(repr(value) for value in values) for values, _ in operation.cases_specifier())
+
+
+def _structure(circuit):
+    tokens = [
+        ("qregs", tuple((reg.name, reg.size) for reg in circuit.qregs)),
+        ("cregs", tuple((reg.name, reg.size) for reg in circuit.cregs)),
+        ("bits", circuit.num_qubits, circuit.num_clbits),
+        ("phase", _param_token(circuit.global_phase)),
+    ]
+    for instruction in circuit.data:
+        operation = instruction.operation
+        blocks = getattr(operation, "blocks", ())
+        tokens.append(
+            (
+                operation.name,
+                tuple(_param_token(p) for p in operation.params if not isinstance(p, qiskit.QuantumCircuit)),
+                tuple(_bit_token(circuit, q) for q in instruction.qubits),
+                tuple(_bit_token(circuit, c) for c in instruction.clbits),
+                # Only control flow carries a condition (``Gate.condition`` is deprecated).
+                _condition_token(circuit, getattr(operation, "condition", None)) if blocks else None,
+                getattr(operation, "label", None),
+                getattr(operation, "ctrl_state", None),
+                _switch_token(circuit, operation),
+                _definition_token(operation),
+                tuple(_structure(block) for block in blocks),
+            )
+        )
+    return tuple(tokens)
+
+
+def structural_hash(circuit):
+    """Canonical hash of a circuit's structure.
+
+    Two circuits built by the same code hash the same, whatever their Python
+    identity. The circuit name and metadata are ignored.
+
+    Args:
+        circuit (QuantumCircuit): Circuit to hash.
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    return hashlib.sha256(repr(_structure(circuit)).encode()).hexdigest()
+
+
+def backend_key(backend):
+    """Identifies a transpilation target.
+    Args:
+        backend (Backend): Target backend.
+    Returns:
+        str: Name, version, size and supported operations.
+    """
+    target = getattr(backend, "target", None)
+    operations = tuple(sorted(target.operation_names)) if target is not None else ()
+    return repr(
+        (
+            getattr(backend, "name", type(backend).__name__),
+            getattr(backend, "backend_version", None),
+            getattr(backend, "num_qubits", None),
+            operations,
+        )
+    )
+
+
+def _rebind(compiled, circuit):
+    # Parameters are keyed by name, so a hit may carry another circuit's Parameter objects (same name, different
+    # UUID); swap in the caller's so they can be bound.
+    if not compiled.parameters:
+        return compiled
+    own = {parameter.name: parameter for parameter in circuit.parameters}
+    mapping = {
+        parameter: own[parameter.name]
+        for parameter in compiled.parameters
+        if parameter.name in own and parameter != own[parameter.name]
+    }
+    if mapping:
+        compiled.assign_parameters(mapping, inplace=True, strict=False)
+    return compiled
+
+
+class TranspileCache:
+    """Two-level (memory, disk) LRU cache of transpiled circuits.
+    Attributes:
+        hits (int): Lookups served from memory or disk.
+        disk_hits (int): The subset of ``hits`` read from disk.
+        misses (int): Lookups that had to transpile.
+    """
+
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES, memory_entries=MEMORY_ENTRIES):
+        """
+        Args:
+            directory (str): Cache directory; a per-version folder is
+                created inside it. Defaults to ``<cache_root>/transpile``.
+                Pass ``False`` to keep the cache in memory only.
+            max_entries (int): LRU limit of the disk layer.
+            memory_entries (int): LRU limit of the memory layer.
+        """
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        # Building a backend's target can take milliseconds; remember its key.
+        self._backend_keys = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+        if directory is False:
+            self.directory = None
+            return
+        base = directory or os.path.join(cache_root(), "transpile")
+        self.directory = os.path.join(base, f"qiskit-{qiskit.__version__}-v{CACHE_VERSION}")
+        os.makedirs(self.directory, exist_ok=True)
+        # Entries written by other Qiskit or cache versions are stale.
+        for name in os.listdir(base):
+            path = os.path.join(base, name)
+            if name.startswith("qiskit-") and path != self.directory:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def key(self, circuit, backend, optimization_level):
+        """Cache key of a transpilation request."""
+        try:
+            backend_id = self._backend_keys.get(backend)
+        except TypeError:  # not weak-referenceable
+            backend_id = None
+        if backend_id is None:
+            backend_id = backend_key(backend)
+            try:
+                self._backend_keys[backend] = backend_id
+            except TypeError:
+                pass
+        raw = f"{structural_hash(circuit)}|{backend_id}|{optimization_level}|{qiskit.__version__}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def transpile(self, circuit, backend, optimization_level=1):
+        """Transpiles a circuit, or returns the cached result.
+        Args:
+            circuit (QuantumCircuit): Circuit to transpile.
+            backend (Backend): Target backend.
+            optimization_level (int): Passed to ``transpile``.
+        Returns:
+            QuantumCircuit: A copy of the transpiled circuit, safe to modify;
+                its unbound parameters are ``circuit``'s own.
+        """
+        key = self.key(circuit, backend, optimization_level)
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return _rebind(cached.copy(), circuit)
+
+        cached = self._load(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, cached)
+            return _rebind(cached.copy(), circuit)
+
+        compiled = transpile(circuit, backend, optimization_level=optimization_level)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, compiled)
+        self._store(key, compiled)
+        return compiled.copy()
+
+    def stats(self):
+        """dict: Hit/miss counters and current sizes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._entries()),
+            }
+
+    def clear(self):
+        """Drops every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+        for path in self._entries():
+            os.remove(path)
+
+    def _remember(self, key, circuit):
+        self._memory[key] = circuit
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def _entries(self):
+        if self.directory is None:
+            return []
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".pickle")]
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                circuit = pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ImportError):
+            return None
+        # Touch the entry so the LRU sees it as recently used.
+        os.utime(path)
+        return circuit
+
+    def _store(self, key, circuit):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        # Write then rename, so concurrent readers never see half a file.
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as file:
+            pickle.dump(circuit, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+        entries = self._entries()
+        if len(entries) > self.max_entries:
+            entries.sort(key=lambda entry: os.path.getmtime(entry))
+            for entry in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(entry)
+                except OSError:
+                    pass
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Returns the process-wide cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TranspileCache()
+    return _default_cache
+
+
+def cached_transpile(circuit, backend, optimization_level=1):
+    """Transpiles through the process-wide `TranspileCache`.
+
+    See `TranspileCache.transpile` for the arguments.
+    """
+    return default_cache().transpile(circuit, backend, optimization_level)
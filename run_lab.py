@@ -0,0 +1,8 @@
+"""Runs the lab's lessons; see `qlab.runner` (``python run_lab.py --help``)."""
+
+import sys
+
+from qlab.runner import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from qlab.async_jobs import AsyncRunner
+
+
+class SlowJob:
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def result(self):
+        self.cancelled.wait(5)
+        return "done"
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class SlowTarget:
+    def __init__(self, submit_seconds):
+        self.submit_seconds = submit_seconds
+        self.jobs = []
+
+    def run(self, circuits, **options):
+        time.sleep(self.submit_seconds)
+        job = SlowJob()
+        self.jobs.append(job)
+        return job
+
+
+@pytest.mark.parametrize("submit_seconds", [0.3, 0.0])
+def test_timeout_cancels_the_job_even_while_it_is_being_submitted(submit_seconds):
+    target = SlowTarget(submit_seconds)
+    runner = AsyncRunner(target, timeout=0.1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(runner.run([]))
+    time.sleep(submit_seconds + 0.2)
+    assert len(target.jobs) == 1 and target.jobs[0].cancelled.is_set()
@@ -0,0 +1,44 @@
+import pytest
+from qiskit import QuantumCircuit
+from qiskit.circuit.classical import expr
+from qiskit.quantum_info import Statevector
+
+from qlab.deferred_measurement import defer_measurements
+
+
+def test_single_bit_feed_forward_is_rewritten():
+    qc = QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.measure(0, 0)
+    with qc.if_test((qc.clbits[0], 1)):
+        qc.x(1)
+    qc.measure(1, 1)
+    rewritten, report = defer_measurements(qc)
+    assert len(report.rewritten) == 1 and not report.kept
+    probabilities = Statevector(rewritten.remove_final_measurements(inplace=False)).probabilities()
+    assert probabilities == pytest.approx([0.5, 0, 0, 0.5])
+    assert not any(instruction.operation.name == "if_else" for instruction in rewritten.data)
+
+
+def test_expr_condition_is_kept_with_a_reason():
+    qc = QuantumCircuit(2, 1)
+    qc.h(0)
+    qc.measure(0, 0)
+    with qc.if_test(expr.logic_not(qc.clbits[0])):
+        qc.x(1)
+    _, report = defer_measurements(qc)
+    assert report.rewritten == []
+    assert report.kept == [(2, "condition is not a single clbit")]
+
+
+def test_measurement_read_by_a_later_expr_is_not_deferred():
+    qc = QuantumCircuit(3, 1)
+    qc.h(0)
+    qc.measure(0, 0)
+    with qc.if_test((qc.clbits[0], 1)):
+        qc.x(1)
+    with qc.if_test(expr.logic_not(qc.clbits[0])):
+        qc.x(2)
+    _, report = defer_measurements(qc)
+    assert report.rewritten == []
+    assert (2, "measured qubit or clbit is used again") in report.kept
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+
+from qlab.execution import ExecutionContext, register_kind
+
+
+def parameterized_circuit():
+    t = Parameter("t")
+    qc = QuantumCircuit(1)
+    qc.ry(t, 0)
+    qc.measure_all()
+    return qc
+
+
+def test_merged_submissions_keep_their_parameter_values():
+    qc = parameterized_circuit()
+    with ExecutionContext("reference_sampler", pool_size=1) as context:
+        futures = [context.submit(qc, parameter_values=[[angle]]) for angle in (0.0, 3.14159265, 0.0)]
+        ones = [future.result(timeout=60).quasi_dists[0].get(1, 0) for future in futures]
+    assert ones == pytest.approx([0, 1, 0], abs=1e-6)
+
+
+def test_failing_split_resolves_every_future():
+    def execute(instance, circuits, run_options):
+        time.sleep(0.1)
+        return circuits
+
+    def split(result, part):
+        raise RuntimeError("split failed")
+
+    register_kind("test_failing_split", lambda **options: object(), execute, split)
+    with ExecutionContext("test_failing_split", pool_size=1) as context:
+        futures = [context.submit([i]) for i in range(4)]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=10)
+
+
+def test_submissions_racing_shutdown_resolve_or_are_refused():
+    qc = parameterized_circuit()
+    context = ExecutionContext("reference_sampler", pool_size=1)
+    futures = []
+
+    def submit_many():
+        for _ in range(100):
+            try:
+                futures.append(context.submit(qc, parameter_values=[[0.1]]))
+            except RuntimeError:
+                pass
+
+    threads = [threading.Thread(target=submit_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    context.shutdown()
+    for thread in threads:
+        thread.join()
+    for future in futures:
+        future.result(timeout=60)
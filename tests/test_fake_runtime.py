@@ -0,0 +1,34 @@
+import threading
+import time
+
+from qiskit import QuantumCircuit
+
+from qlab.fake_runtime import FakeRuntimeService, Sampler, Session
+
+
+def bell():
+    qc = QuantumCircuit(2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure_all()
+    return qc
+
+
+def test_jobs_without_a_session_do_not_leak_threads():
+    service = FakeRuntimeService(time_scale=0.001, seed=1)
+    Sampler(backend=service.backend()).run(bell()).result()
+    time.sleep(0.1)
+    before = threading.active_count()
+    for _ in range(20):
+        Sampler(backend=service.backend()).run(bell()).result()
+    time.sleep(0.2)
+    assert threading.active_count() <= before + 1
+
+
+def test_jobs_in_a_session_share_it():
+    service = FakeRuntimeService(time_scale=0.001, seed=1)
+    with Session(service=service) as session:
+        sampler = Sampler()
+        jobs = [sampler.run(bell()) for _ in range(5)]
+        assert all(job.session is session for job in jobs)
+        assert all(set(job.result().quasi_dists[0]) <= {0, 3} for job in jobs)
@@ -0,0 +1,27 @@
+import numpy as np
+from qiskit import QuantumCircuit
+
+from qlab.noise_sweep import NoiseSweep, noise_model
+
+
+def toffoli_protocol():
+    # Nothing but a Toffoli, so any error comes from it.
+    qc = QuantumCircuit(3)
+    qc.ccx(0, 1, 2)
+    qc.measure_all()
+    return qc
+
+
+def test_wide_gates_get_noise():
+    model = noise_model(depolarizing=0.1, gates_1q=["x"], gates_2q=[], gates_wide={3: ["ccx"]})
+    assert "ccx" in model.noise_instructions
+
+
+def test_sweep_of_a_toffoli_protocol_degrades_with_noise():
+    def all_zeros(counts):
+        return counts[0].to_counts().get("000", 0) / 4096
+
+    with NoiseSweep([toffoli_protocol()], all_zeros, shots=4096, max_workers=1, seed=1) as sweep:
+        curves = sweep.run(depolarizing=[0.0, 0.2])
+    assert curves.values[0] == 1.0
+    assert curves.values[1] < 0.9
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from qiskit.circuit.library import HGate, XGate
+from qiskit.quantum_info import Operator
+
+from qlab.operator_chain import fuse
+
+
+def test_single_operator_chain_leaves_the_callers_array_writable():
+    operator = Operator(np.eye(2))
+    array = np.eye(2, dtype=complex)
+    fuse([operator])
+    fuse([array])
+    operator.data[0, 0] = 2
+    array[0, 0] = 3
+    assert fuse([np.eye(2)])[0, 0] == 1
+
+
+def test_fused_matrix_is_read_only_and_in_application_order():
+    matrix = fuse([HGate(), XGate()])
+    assert np.allclose(matrix, Operator(XGate()).data @ Operator(HGate()).data)
+    with pytest.raises(ValueError):
+        matrix[0, 0] = 0
@@ -0,0 +1,38 @@
+import gc
+import os
+
+import numpy as np
+
+from qlab.chsh import BatchedCHSH
+from qlab.result_store import ResultStore
+
+
+def test_rows_left_by_an_interrupted_writer_are_cut_before_appending(tmp_path):
+    with ResultStore(str(tmp_path)) as store:
+        store.append({"00": 3, "11": 5})
+    # A writer that stopped after the outcomes of a record and part of a counts row, before its index line.
+    with open(os.path.join(tmp_path, "outcomes.uint64"), "ab") as column:
+        column.write(np.arange(3, dtype="<u8").tobytes())
+    with open(os.path.join(tmp_path, "counts.int64"), "ab") as column:
+        column.write(b"\x01\x02\x03")
+
+    with ResultStore(str(tmp_path)) as store:
+        store.append({"01": 7, "10": 1})
+    with ResultStore(str(tmp_path)) as store:
+        assert [store.counts(record).to_counts() for record in store] == [{"00": 3, "11": 5}, {"01": 7, "10": 1}]
+
+
+def test_records_of_a_store_dropped_without_close_are_written(tmp_path):
+    store = ResultStore(str(tmp_path))
+    for shots in range(1, 6):
+        store.append({"0": shots})
+    del store
+    gc.collect()
+    assert len(ResultStore(str(tmp_path))) == 5
+
+
+def test_helpers_flush_what_they_archive(tmp_path):
+    store = ResultStore(str(tmp_path))
+    BatchedCHSH().play(1000, seed=1, store=store)
+    assert len(ResultStore(str(tmp_path))) == 4
+    store.close()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from qiskit import QuantumCircuit
+from qiskit.circuit.library import QFT
+from qiskit.quantum_info import Statevector, random_clifford
+
+from qlab.state_sampler import AliasTable, state_sampler
+
+
+def table_distribution(table):
+    # The distribution an alias table draws from: column j keeps prob[j] / n and passes the rest to alias[j].
+    distribution = table.prob / len(table)
+    np.add.at(distribution, table.alias, (1 - table.prob) / len(table))
+    return distribution
+
+
+def qft_state(num_qubits, basis_state):
+    qc = QuantumCircuit(num_qubits)
+    for qubit in range(num_qubits):
+        if basis_state >> qubit & 1:
+            qc.x(qubit)
+    qc.compose(QFT(num_qubits), inplace=True)
+    return Statevector(qc)
+
+
+@pytest.mark.parametrize("num_qubits", range(1, 12))
+def test_tables_of_uniform_and_qft_states_build_and_match(num_qubits):
+    # Rounding leaves every column of these at exactly 1, which used to loop forever.
+    for probabilities in (np.ones(2**num_qubits), qft_state(num_qubits, 9).probabilities(),
+                          Statevector(random_clifford(num_qubits, seed=num_qubits).to_circuit()).probabilities()):
+        table = AliasTable(probabilities)
+        assert table_distribution(table) == pytest.approx(probabilities / probabilities.sum())
+
+
+def test_near_uniform_weights():
+    weights = 1 + 1e-15 * np.random.default_rng(0).random(4096)
+    assert table_distribution(AliasTable(weights)) == pytest.approx(weights / weights.sum())
+
+
+def test_sample_memory_of_a_qft_state():
+    assert len(state_sampler(qft_state(6, 9)).sample_memory(10)) == 10
+
+
+def test_arrays_changed_in_place_are_seen():
+    probabilities = np.array([1.0, 0, 0, 0])
+    state_sampler(probabilities)
+    probabilities[:] = [0, 0, 0, 1]
+    assert state_sampler(probabilities).sample_counts(10) == {"11": 10}
+
+
+def test_seed_does_not_reseed_the_shared_sampler():
+    state = Statevector.from_label("++")
+    shared = state_sampler(state)
+    seeded = state_sampler(state, seed=1)
+    assert seeded is not shared and seeded.table() is shared.table()
+    assert np.array_equal(seeded.sample(100), state_sampler(state, seed=1).sample(100))
@@ -0,0 +1,33 @@
+import pytest
+from qiskit import QuantumCircuit
+from qiskit.circuit.classical import expr
+
+from qlab.statevector_engine import FastSampler, StatevectorEngine
+
+
+def test_unmeasured_circuits_are_rejected_like_the_reference_sampler():
+    no_clbits = QuantumCircuit(1)
+    no_clbits.h(0)
+    no_measure = QuantumCircuit(1, 1)
+    no_measure.h(0)
+    for circuit in (no_clbits, no_measure):
+        with pytest.raises(ValueError):
+            FastSampler().run(circuit)
+
+
+def test_measured_circuit_is_sampled_exactly():
+    qc = QuantumCircuit(1)
+    qc.h(0)
+    qc.measure_all()
+    assert FastSampler().run(qc).result().quasi_dists[0] == pytest.approx({0: 0.5, 1: 0.5})
+
+
+def test_expr_condition_is_reported_as_unsupported():
+    qc = QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.measure(0, 0)
+    with qc.if_test(expr.logic_not(qc.clbits[0])):
+        qc.x(1)
+    qc.measure(1, 1)
+    with pytest.raises(NotImplementedError):
+        StatevectorEngine().probabilities(qc)
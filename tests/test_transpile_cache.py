@@ -0,0 +1,74 @@
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+from qiskit.circuit.classical import expr
+from qiskit_aer import AerSimulator
+
+from qlab.transpile_cache import TranspileCache, structural_hash
+
+
+def prep_circuit(gate):
+    body = QuantumCircuit(1)
+    getattr(body, gate)(0)
+    prep = body.to_gate()
+    prep.name = "prep"
+    qc = QuantumCircuit(1)
+    qc.append(prep, [0])
+    qc.measure_all()
+    return qc
+
+
+def switch_circuit(value):
+    qc = QuantumCircuit(1, 1)
+    qc.measure(0, 0)
+    with qc.switch(qc.clbits[0]) as case:
+        with case(value):
+            qc.x(0)
+    return qc
+
+
+def test_custom_gates_with_one_name_hash_by_definition():
+    assert structural_hash(prep_circuit("h")) == structural_hash(prep_circuit("h"))
+    assert structural_hash(prep_circuit("h")) != structural_hash(prep_circuit("x"))
+
+
+def test_cache_does_not_serve_another_definition():
+    cache, simulator = TranspileCache(False), AerSimulator()
+    cache.transpile(prep_circuit("h"), simulator)
+    compiled = cache.transpile(prep_circuit("x"), simulator)
+    assert simulator.run(compiled, shots=100, seed_simulator=1).result().get_counts() == {"1": 100}
+
+
+def test_switch_cases_and_control_states_are_hashed():
+    assert structural_hash(switch_circuit(0)) != structural_hash(switch_circuit(1))
+    open_control, closed_control = QuantumCircuit(2), QuantumCircuit(2)
+    open_control.cx(0, 1, ctrl_state=0)
+    closed_control.cx(0, 1)
+    assert structural_hash(open_control) != structural_hash(closed_control)
+
+
+def test_expr_conditions_hash_by_bit_index():
+    def build():
+        qc = QuantumCircuit(2, 1)
+        qc.measure(0, 0)
+        with qc.if_test(expr.logic_not(qc.clbits[0])):
+            qc.x(1)
+        return qc
+
+    assert structural_hash(build()) == structural_hash(build())
+
+
+def test_hit_returns_the_callers_parameters():
+    cache, simulator = TranspileCache(False), AerSimulator()
+
+    def build():
+        t = Parameter("t")
+        qc = QuantumCircuit(1)
+        qc.rx(t, 0)
+        qc.measure_all()
+        return qc, t
+
+    cache.transpile(build()[0], simulator)
+    circuit, t = build()
+    compiled = cache.transpile(circuit, simulator)
+    assert cache.hits == 1
+    assert not compiled.assign_parameters({t: 1.0}).parameters